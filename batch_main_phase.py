@@ -0,0 +1,118 @@
+import numpy as np
+from card_constants import *
+
+# 手札の枚数を数えるカードの種類（それ以外のカードはOTHER_CARDとして数えない）
+BATCH_CARD_TYPES = [
+    GEMSTONE_MINE, UNDISCOVERED_PARADISE, VAULT_OF_WHISPERS,
+    LOTUS_PETAL, CHROME_MOX,
+    ELVISH_SPIRIT_GUIDE, SIMIAN_SPIRIT_GUIDE, SUMMONERS_PACT,
+    WILD_CANTOR, MANAMORPHOSE,
+    DARK_RITUAL, CABAL_RITUAL,
+    NECRODOMINANCE, BESEECH_MIRROR
+]
+OTHER_CARD = len(BATCH_CARD_TYPES)
+(GEMSTONE_MINE_ID, UNDISCOVERED_PARADISE_ID, VAULT_OF_WHISPERS_ID,
+ LOTUS_PETAL_ID, CHROME_MOX_ID,
+ ELVISH_SPIRIT_GUIDE_ID, SIMIAN_SPIRIT_GUIDE_ID, SUMMONERS_PACT_ID,
+ WILD_CANTOR_ID, MANAMORPHOSE_ID,
+ DARK_RITUAL_ID, CABAL_RITUAL_ID,
+ NECRODOMINANCE_ID, BESEECH_MIRROR_ID) = range(OTHER_CARD)
+
+def get_card_type_indices(deck: list[str]) -> np.ndarray:
+    """deckの各位置のカードのBATCH_CARD_TYPESでのインデックス（含まれなければOTHER_CARD）"""
+    return np.array([BATCH_CARD_TYPES.index(card) if card in BATCH_CARD_TYPES else OTHER_CARD for card in deck], dtype=np.int8)
+
+def count_hand_cards(card_type_indices: np.ndarray, permutations: np.ndarray, hand_size: int = 7) -> np.ndarray:
+    """
+    手札と、Manamorphoseで続けて引けるカードを種類ごとに数える
+    
+    Manamorphoseは1枚引くので、手札のManamorphoseの枚数だけデッキの続きのカードも数える
+    （引いたカードがManamorphoseならさらに続きも数える）。
+    
+    Args:
+        card_type_indices: get_card_type_indicesの結果
+        permutations: 並べ替えの配列（ゲーム数, デッキ枚数）
+        hand_size: 手札の枚数
+    
+    Returns:
+        カードの種類ごとの枚数の配列（ゲーム数, len(BATCH_CARD_TYPES)）
+    """
+    max_draw_count = int((card_type_indices == MANAMORPHOSE_ID).sum())
+    card_types = card_type_indices[permutations[:, :hand_size + max_draw_count]]
+    is_manamorphose = card_types == MANAMORPHOSE_ID
+    # 各位置のカードを引くかどうか
+    drawn = np.zeros(card_types.shape, dtype=bool)
+    drawn[:, :hand_size] = True
+    manamorphose_counts = is_manamorphose[:, :hand_size].sum(axis=1)
+    for i in range(max_draw_count):
+        # i + 1枚目を引けるのは、それまでに引いたカードのManamorphoseがi + 1枚以上ある場合
+        drawn[:, hand_size + i] = manamorphose_counts > i
+        manamorphose_counts += is_manamorphose[:, hand_size + i] & drawn[:, hand_size + i]
+    
+    is_card_type = (card_types[:, :, None] == np.arange(OTHER_CARD, dtype=np.int8)) & drawn[:, :, None]
+    return is_card_type.sum(axis=1, dtype=np.int16)
+
+def may_cast_necro(counts: np.ndarray, cantor_count_in_deck: int) -> np.ndarray:
+    """
+    main phaseでNecroを唱えられる可能性があるかを、マナの上限からまとめて判定する
+    
+    土地1枚、Lotus Petal、Chrome Mox（刻印できるかは見ない）を任意の色のマナ源、
+    Spirit GuideとSummoner's Pactを赤か緑のマナとして数え、Dark Ritualは+2、Cabal Ritualは+1の黒マナとする。
+    赤と緑のマナを黒マナにできるのは、Manamorphose（2マナ）、Wild Cantor（1マナ）、Cabal Ritualの不特定マナだけとする。
+    どれも実際のGameStateより多めに数えるので、Falseのゲームは確実にNecroを唱えられない（Trueでも唱えられるとは限らない）。
+    Summoner's Pactでシャッフルした後のManamorphoseは何を引くか分からないので、両方あればTrueとする。
+    
+    Args:
+        counts: count_hand_cardsの結果
+        cantor_count_in_deck: デッキのWild Cantorの枚数（Summoner's Pact1枚につき1枚サーチできる）
+    
+    Returns:
+        ゲームごとにNecroを唱えられる可能性があるかの配列
+    """
+    lands = counts[:, GEMSTONE_MINE_ID] + counts[:, UNDISCOVERED_PARADISE_ID] + counts[:, VAULT_OF_WHISPERS_ID]
+    # 黒マナも出せるマナ源
+    any_mana_sources = np.minimum(lands, 1) + counts[:, LOTUS_PETAL_ID] + counts[:, CHROME_MOX_ID]
+    # 赤か緑しか出せないマナ
+    red_green_mana = counts[:, ELVISH_SPIRIT_GUIDE_ID] + counts[:, SIMIAN_SPIRIT_GUIDE_ID] + counts[:, SUMMONERS_PACT_ID]
+    cantor_count = counts[:, WILD_CANTOR_ID]
+    # Summoner's Pactはそれぞれ別のWild Cantorをサーチできる
+    cantor_count = cantor_count + np.minimum(counts[:, SUMMONERS_PACT_ID], cantor_count_in_deck)
+    # 赤か緑のマナを黒マナに変えられる量
+    convertible_mana = counts[:, MANAMORPHOSE_ID] * 2 + cantor_count + counts[:, CABAL_RITUAL_ID]
+    ritual_mana = counts[:, DARK_RITUAL_ID] * 2 + counts[:, CABAL_RITUAL_ID]
+    
+    max_black_mana = any_mana_sources + ritual_mana + np.minimum(red_green_mana, convertible_mana)
+    # 最初の黒マナがなければRitualも唱えられない
+    max_black_mana[(any_mana_sources == 0) & (convertible_mana == 0)] = 0
+    max_total_mana = any_mana_sources + red_green_mana + ritual_mana
+    # Necroを唱えるにはBBB、BeseechならさらにGeneric 1マナが必要
+    required_generic = (counts[:, NECRODOMINANCE_ID] == 0).astype(np.int16)
+    
+    may_cast = (max_black_mana >= 3) & (max_total_mana >= 3 + required_generic)
+    may_cast |= (counts[:, SUMMONERS_PACT_ID] > 0) & (counts[:, MANAMORPHOSE_ID] > 0)
+    return may_cast
+
+def find_first_castable_hands(card_type_indices: np.ndarray, permutations: np.ndarray, attempt_count: int, cantor_count_in_deck: int, hand_size: int = 7) -> np.ndarray:
+    """
+    ゲームごとに、Necroを唱えられる可能性がある最初の手札のマリガン回数を求める
+    
+    手札にNecroかBeseechがあり、may_cast_necroがTrueの手札をprefilter.find_first_playable_handsと同じように探す。
+    
+    Args:
+        card_type_indices: get_card_type_indicesの結果
+        permutations: 並べ替えの配列（ゲーム数 * attempt_count, デッキ枚数）。ゲームiのm回目の手札はi * attempt_count + m行目の先頭hand_size枚
+        attempt_count: 1ゲームで引く手札の最大数（最大マリガン回数 + 1）
+        cantor_count_in_deck: デッキのWild Cantorの枚数
+        hand_size: 手札の枚数
+    
+    Returns:
+        ゲームごとのマリガン回数の配列（どの手札でも唱えられなければ-1）
+    """
+    hand_types = card_type_indices[permutations[:, :hand_size]]
+    has_key_card = ((hand_types == NECRODOMINANCE_ID) | (hand_types == BESEECH_MIRROR_ID)).any(axis=1)
+    castable = has_key_card.copy()
+    castable[has_key_card] = may_cast_necro(count_hand_cards(card_type_indices, permutations[has_key_card], hand_size), cantor_count_in_deck)
+    castable = castable.reshape(-1, attempt_count)
+    first_attempts = castable.argmax(axis=1)
+    first_attempts[~castable.any(axis=1)] = -1
+    return first_attempts
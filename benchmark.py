@@ -0,0 +1,282 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+from game_state import *
+from mana_pool import ManaPool
+from hard_hand_corpus import HardHandCorpus, replay_corpus, summarize_elapsed
+
+TEST_DECKS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tests', 'decks')
+DEFAULT_BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+BASELINE_FORMAT_VERSION = 1
+# ベースラインより何割遅くなったら回帰とみなすか
+DEFAULT_TOLERANCE = 0.2
+DEFAULT_REPEAT = 5
+DEFAULT_SEED = 12345
+
+# tests/decksのデッキごとの初期手札（tests/test_run_game.pyと同じ。ここにないデッキはDEFAULT_HAND）
+DEFAULT_HAND = [GEMSTONE_MINE, DARK_RITUAL, NECRODOMINANCE]
+FIXED_HANDS = {
+    'Petal_Wind_Win': [GEMSTONE_MINE, DARK_RITUAL, NECRODOMINANCE, LOTUS_PETAL],
+    'Chrome_Wind_Win': [GEMSTONE_MINE, DARK_RITUAL, NECRODOMINANCE, NECRODOMINANCE, CHROME_MOX],
+    'Cantor_Wind_Win': [GEMSTONE_MINE, DARK_RITUAL, NECRODOMINANCE, ELVISH_SPIRIT_GUIDE, WILD_CANTOR],
+    'Chrome_Imprint_Wind_Lose': [GEMSTONE_MINE, DARK_RITUAL, NECRODOMINANCE, CHROME_MOX, BORNE_UPON_WIND],
+    'Chrome_Imprint_Wind_Win': [GEMSTONE_MINE, DARK_RITUAL, NECRODOMINANCE, CHROME_MOX, BORNE_UPON_WIND, BORNE_UPON_WIND],
+}
+
+def load_fixed_games() -> list[tuple[str, list[str], list[str]]]:
+    """
+    tests/decksの60枚のデッキと初期手札を読み込む
+    
+    Returns:
+        (デッキ名, デッキ, 初期手札) のリスト（デッキ名の順）
+    """
+    games = []
+    for filename in sorted(os.listdir(TEST_DECKS_PATH)):
+        name, extension = os.path.splitext(filename)
+        if extension != '.txt':
+            continue
+        with open(os.path.join(TEST_DECKS_PATH, filename), 'r') as f:
+            deck = [line.strip() for line in f if line.strip()]
+        if len(deck) != 60:
+            continue
+        games.append((name, deck, FIXED_HANDS.get(name, DEFAULT_HAND)))
+    return games
+
+def create_game(shuffle_enabled: bool = False) -> GameState:
+    game = GameState()
+    game.debug_print = False
+    game.shuffle_enabled = shuffle_enabled
+    return game
+
+def setup_game(game: GameState, deck: list[str], initial_hand: list[str]) -> None:
+    """run_with_initial_handと同じようにmain phase直前の状態を作る（シャッフルしない）"""
+    game.reset_game()
+    game.mulligan_count = 0
+    game.deck = deck.copy()
+    game.hand = initial_hand.copy()
+    for card in game.hand:
+        game.deck.remove(card)
+
+def bench_pay_mana(number: int) -> float:
+    pool = ManaPool()
+    start = time.perf_counter_ns()
+    for _ in range(number):
+        pool.add_mana('B', 3)
+        pool.add_mana('U')
+        pool.add_mana('G')
+        pool.pay_mana('1UBB')
+        pool.pay_mana('B')
+    return time.perf_counter_ns() - start
+
+def bench_can_generate_mana_pattern(number: int) -> float:
+    game = create_game()
+    elapsed = 0
+    for name, deck, initial_hand in load_fixed_games():
+        setup_game(game, deck, initial_hand)
+        if GEMSTONE_MINE in game.hand:
+            game.set_land(GEMSTONE_MINE)
+        required, generic = game.mana_pool.analyze_mana_pattern('BBB')
+        cards_to_imprint = game.get_cards_to_imprint([NECRODOMINANCE])
+        for _ in range(number):
+            state = game.create_mana_generation_state(cards_to_imprint)
+            start = time.perf_counter_ns()
+            state.can_generate_mana_pattern(required, generic)
+            elapsed += time.perf_counter_ns() - start
+    return elapsed
+
+def bench_main_phase(number: int) -> float:
+    game = create_game()
+    elapsed = 0
+    for name, deck, initial_hand in load_fixed_games():
+        for _ in range(number):
+            setup_game(game, deck, initial_hand)
+            start = time.perf_counter_ns()
+            game.main_phase(False)
+            elapsed += time.perf_counter_ns() - start
+    return elapsed
+
+def bench_end_step(number: int) -> float:
+    game = create_game()
+    elapsed = 0
+    for name, deck, initial_hand in load_fixed_games():
+        setup_game(game, deck, initial_hand)
+        if not game.main_phase(False):
+            continue
+        game.cast_spells_after_necro_resolved(SummonersPactStrategy.NEVER_CAST)
+        for _ in range(number):
+            end_step_game = game.copy()
+            start = time.perf_counter_ns()
+            end_step_game.end_step(19, SummonersPactStrategy.NEVER_CAST)
+            elapsed += time.perf_counter_ns() - start
+    return elapsed
+
+def bench_run_without_initial_hand(number: int) -> float:
+    game = create_game(shuffle_enabled=True)
+    elapsed = 0
+    for name, deck, initial_hand in load_fixed_games():
+        for _ in range(number):
+            start = time.perf_counter_ns()
+            game.run_without_initial_hand(deck, 19, True, SummonersPactStrategy.AUTO)
+            elapsed += time.perf_counter_ns() - start
+    return elapsed
+
+# 名前: (計測する関数, 1ラウンドの回数, 1回あたりの操作数を返す関数)
+BENCHMARKS = {
+    'mana_pool.pay_mana': (bench_pay_mana, 20000, lambda number: number * 2),
+    'can_generate_mana_pattern': (bench_can_generate_mana_pattern, 200, lambda number: number * len(load_fixed_games())),
+    'main_phase': (bench_main_phase, 50, lambda number: number * len(load_fixed_games())),
+    'end_step': (bench_end_step, 50, None),
+    'run_without_initial_hand': (bench_run_without_initial_hand, 30, lambda number: number * len(load_fixed_games())),
+}
+
+def count_end_step_games() -> int:
+    """main phaseでNecroを唱えられてend stepまで進む固定手札の数"""
+    game = create_game()
+    count = 0
+    for name, deck, initial_hand in load_fixed_games():
+        setup_game(game, deck, initial_hand)
+        if game.main_phase(False):
+            count += 1
+    return count
+
+def run_benchmarks(names: list[str] = None, repeat: int = DEFAULT_REPEAT, scale: float = 1.0, seed: int = DEFAULT_SEED) -> dict:
+    """
+    ベンチマークを実行する
+    
+    各ベンチマークをrepeatラウンド実行し、1操作あたりの時間の最小値を結果とする。
+    ラウンドごとに乱数のシードを固定するので、毎回同じゲームを計測する。
+    
+    Args:
+        names: 実行するベンチマーク名（NoneならすべてのBENCHMARKS）
+        repeat: ラウンド数
+        scale: 1ラウンドの回数の倍率
+        seed: 乱数のシード
+    
+    Returns:
+        {ベンチマーク名: 1操作あたりの時間(us)} の辞書
+    """
+    results = {}
+    for name in names if names is not None else BENCHMARKS:
+        func, number, get_operation_count = BENCHMARKS[name]
+        number = max(1, int(number * scale))
+        if get_operation_count is None:
+            operation_count = number * count_end_step_games()
+        else:
+            operation_count = get_operation_count(number)
+        best = None
+        for _ in range(repeat):
+            random.seed(seed)
+            elapsed = func(number) / 1e3 / operation_count
+            if best is None or elapsed < best:
+                best = elapsed
+        results[name] = best
+    return results
+
+def run_corpus_benchmarks(path: str, repeat: int = DEFAULT_REPEAT) -> dict:
+    """
+    hard_hand_corpus.pyで集めた重いゲームを再実行し、実行時間の平均と裾をベンチマーク結果にする
+    
+    Args:
+        path: コーパスファイルのパス
+        repeat: 各ゲームを実行する回数
+    
+    Returns:
+        {'hard_hands.mean': ..., 'hard_hands.p90': ..., ...} の辞書（us）
+    """
+    corpus = HardHandCorpus(path)
+    corpus.load()
+    summary = summarize_elapsed(replay_corpus(corpus, repeat))
+    return {f'hard_hands.{name}': value for name, value in summary.items()}
+
+def load_baseline(path: str) -> dict:
+    with open(path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    if baseline.get('version') != BASELINE_FORMAT_VERSION:
+        raise ValueError(f"ERROR: unsupported benchmark baseline version {baseline.get('version')} in {path}")
+    return baseline
+
+def save_baseline(path: str, results: dict, tolerance: float = DEFAULT_TOLERANCE) -> None:
+    """
+    ベンチマーク結果をベースラインとして保存する
+    
+    ベンチマークごとの許容値はtolerancesを書き換えて調整できる。
+    """
+    baseline = {
+        'version': BASELINE_FORMAT_VERSION,
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'results_us': results,
+        'tolerances': {name: tolerance for name in results}
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(baseline, f, indent=2)
+        f.write('\n')
+
+def compare_with_baseline(results: dict, baseline: dict, tolerance: float = None) -> list[tuple[str, float, float, float, bool]]:
+    """
+    ベンチマーク結果をベースラインと比べる
+    
+    Args:
+        results: run_benchmarksの結果
+        baseline: load_baselineのベースライン
+        tolerance: 許容値（Noneならベースラインのtolerances、それもなければDEFAULT_TOLERANCE）
+    
+    Returns:
+        (ベンチマーク名, 結果(us), ベースライン(us), 比, 回帰したかどうか) のリスト
+    """
+    comparisons = []
+    tolerances = baseline.get('tolerances', {})
+    for name, elapsed in results.items():
+        baseline_elapsed = baseline['results_us'].get(name)
+        if baseline_elapsed is None:
+            continue
+        ratio = elapsed / baseline_elapsed
+        if tolerance is not None:
+            allowed = tolerance
+        else:
+            allowed = tolerances.get(name, DEFAULT_TOLERANCE)
+        comparisons.append((name, elapsed, baseline_elapsed, ratio, ratio > 1 + allowed))
+    return comparisons
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ゲームエンジンのマイクロベンチマーク")
+    parser.add_argument('names', nargs='*', help=f"実行するベンチマーク（省略時はすべて）: {', '.join(BENCHMARKS)}")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE_PATH, help="ベースラインのJSONファイルのパス")
+    parser.add_argument('--save-baseline', action='store_true', help="結果をベースラインとして保存する")
+    parser.add_argument('--tolerance', type=float, default=None, help=f"ベースラインより何割遅くなったら回帰とみなすか（省略時はベースラインの値、保存時は{DEFAULT_TOLERANCE}）")
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help="ラウンド数（最小値を使う）")
+    parser.add_argument('--scale', type=float, default=1.0, help="1ラウンドの回数の倍率")
+    parser.add_argument('--corpus', help="hard_hand_corpus.pyで集めたコーパスの再実行もベンチマークに含める")
+    args = parser.parse_args()
+    for name in args.names:
+        if name not in BENCHMARKS:
+            parser.error(f"unknown benchmark: {name}")
+    
+    results = run_benchmarks(args.names or None, args.repeat, args.scale)
+    if args.corpus:
+        results.update(run_corpus_benchmarks(args.corpus, args.repeat))
+    
+    if args.save_baseline:
+        save_baseline(args.baseline, results, args.tolerance if args.tolerance is not None else DEFAULT_TOLERANCE)
+        for name, elapsed in results.items():
+            print(f"{name:<28} {elapsed:10.2f} us")
+        print(f"\nBaseline saved to {args.baseline}")
+        sys.exit(0)
+    
+    if not os.path.exists(args.baseline):
+        for name, elapsed in results.items():
+            print(f"{name:<28} {elapsed:10.2f} us")
+        print(f"\nNo baseline at {args.baseline}. Run with --save-baseline to create one.")
+        sys.exit(0)
+    
+    regressed = False
+    print(f"{'benchmark':<28} {'now(us)':>10} {'base(us)':>10} {'ratio':>7}")
+    for name, elapsed, baseline_elapsed, ratio, is_regression in compare_with_baseline(results, load_baseline(args.baseline), args.tolerance):
+        mark = "  REGRESSION" if is_regression else ""
+        print(f"{name:<28} {elapsed:10.2f} {baseline_elapsed:10.2f} {ratio:7.2f}{mark}")
+        regressed = regressed or is_regression
+    sys.exit(1 if regressed else 0)
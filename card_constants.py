@@ -44,6 +44,66 @@ FAILED_CAST_BOTH_WITH_WIND_WITHOUT_VALAKUT = "Failed to cast both Valakut and Bo
 FAILED_CAST_BOTH_WITHOUT_WIND_WITH_VALAKUT = "Failed to cast both Valakut and Borne Upon a Wind without Wind but with Valakut"
 FAILED_CAST_BOTH_WITHOUT_WIND_AND_VALAKUT = "Failed to cast both Valakut and Borne Upon a Wind without both"
 
+# デッキが60枚でない場合
+INVALID_DECK_SIZE = "Invalid deck size"
+
+# すべてのloss_reason（順序を変えると記録済みのloss_reasonのコードが変わるので、追加は末尾に行う）
+ALL_LOSS_REASONS = [
+    FALIED_NECRO,
+    FAILED_NECRO_COUNTERED,
+    FAILED_CAST_BOTH,
+    CAST_VALAKUT_FAILED_WIND,
+    CAST_WIND_FAILED_TENDRILS,
+    CAST_WIND_FAILED_TENDRILS_WITH_BESEECH_OR_TENDRILS,
+    CAST_WIND_FAILED_TENDRILS_WITHOUT_BESEECH_OR_TENDRILS,
+    CAST_VALAKUT_FAILED_WIND_WITH_WIND,
+    CAST_VALAKUT_FAILED_WIND_WITHOUT_WIND,
+    FAILED_CAST_BOTH_WITH_WIND_AND_VALAKUT,
+    FAILED_CAST_BOTH_WITH_WIND_WITHOUT_VALAKUT,
+    FAILED_CAST_BOTH_WITHOUT_WIND_WITH_VALAKUT,
+    FAILED_CAST_BOTH_WITHOUT_WIND_AND_VALAKUT,
+    INVALID_DECK_SIZE
+]
+
+# loss_reasonの整数コード（0は負けていない、ALL_LOSS_REASONSにないものはUNKNOWN_LOSS_REASON_CODE）
+LOSS_REASON_CODES = {reason: i + 1 for i, reason in enumerate(ALL_LOSS_REASONS)}
+UNKNOWN_LOSS_REASON_CODE = 255
+
+# ゲームの結果コード（0は勝ち、それ以外は負けた理由のloss_reasonのコード）
+OUTCOME_WIN = 0
+OUTCOME_CODE_COUNT = 256
+
+# 詳細なloss_reasonから単純化されたloss_reasonへの対応
+SIMPLIFIED_LOSS_REASONS = {
+    FAILED_CAST_BOTH_WITH_WIND_AND_VALAKUT: FAILED_CAST_BOTH,
+    FAILED_CAST_BOTH_WITH_WIND_WITHOUT_VALAKUT: FAILED_CAST_BOTH,
+    FAILED_CAST_BOTH_WITHOUT_WIND_WITH_VALAKUT: FAILED_CAST_BOTH,
+    FAILED_CAST_BOTH_WITHOUT_WIND_AND_VALAKUT: FAILED_CAST_BOTH,
+    CAST_VALAKUT_FAILED_WIND_WITH_WIND: CAST_VALAKUT_FAILED_WIND,
+    CAST_VALAKUT_FAILED_WIND_WITHOUT_WIND: CAST_VALAKUT_FAILED_WIND,
+    CAST_WIND_FAILED_TENDRILS_WITH_BESEECH_OR_TENDRILS: CAST_WIND_FAILED_TENDRILS,
+    CAST_WIND_FAILED_TENDRILS_WITHOUT_BESEECH_OR_TENDRILS: CAST_WIND_FAILED_TENDRILS
+}
+
+def get_loss_reason_code(loss_reason: str) -> int:
+    if not loss_reason:
+        return 0
+    return LOSS_REASON_CODES.get(loss_reason, UNKNOWN_LOSS_REASON_CODE)
+
+def get_loss_reason_from_code(code: int) -> str:
+    if code == 0:
+        return ''
+    if code == UNKNOWN_LOSS_REASON_CODE:
+        return "Unknown"
+    return ALL_LOSS_REASONS[code - 1]
+
+def get_simplified_loss_reason_code(code: int) -> int:
+    """詳細なloss_reasonのコードを単純化されたloss_reasonのコードに変換する"""
+    if code == 0 or code > len(ALL_LOSS_REASONS):
+        return code
+    reason = ALL_LOSS_REASONS[code - 1]
+    return LOSS_REASON_CODES[SIMPLIFIED_LOSS_REASONS.get(reason, reason)]
+
 ALL_CARDS = [
     GEMSTONE_MINE,
     UNDISCOVERED_PARADISE,
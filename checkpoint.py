@@ -0,0 +1,121 @@
+import os
+import json
+import time
+import base64
+import random
+from simulation_tally import SimulationTally
+
+CHECKPOINT_FORMAT_VERSION = 1
+DEFAULT_CHECKPOINT_PATH = os.path.join('results', 'checkpoint.json')
+# 途中経過を保存する間隔（秒）
+DEFAULT_CHECKPOINT_INTERVAL = 60.0
+# 1パターンを何ゲームずつに分けて実行するか
+DEFAULT_CHUNK_SIZE = 10000
+
+class SimulationCheckpoint:
+    """
+    長いシミュレーションの途中経過を保存するクラス
+    
+    パターンごとの集計値（SimulationTally）、終了したパターン、乱数の状態をJSONファイルに保存する。
+    run_test_patternsはDeckAnalyzer.checkpointが設定されていると、パターンをchunk_sizeゲームずつ実行し、
+    interval秒ごとにここへ保存する。resumeで読み込むと、終了したパターンは集計値から結果を作り、
+    途中のパターンは保存されたゲーム数から続きを実行する。
+    """
+    
+    def __init__(self, path: str = DEFAULT_CHECKPOINT_PATH, interval: float = DEFAULT_CHECKPOINT_INTERVAL,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE):
+        """
+        Args:
+            path: 保存先のファイルパス
+            interval: 保存する間隔（秒）。0なら1チャンクごとに保存する
+            chunk_size: 1パターンを何ゲームずつに分けて実行するか
+        """
+        self.path = path
+        self.interval = interval
+        self.chunk_size = chunk_size
+        # パターンのキーごとの集計値
+        self.tallies = {}
+        # 終了したパターンのキー
+        self.completed = set()
+        # top_upで始めたパターンのキーごとの目標のゲーム数
+        self.targets = {}
+        self.last_save_time = time.time()
+    
+    @staticmethod
+    def get_key(filename: str, pattern_name: str) -> str:
+        """パターン名は実験をまたいで重複するので、結果のファイル名と組み合わせる"""
+        return f"{filename}/{pattern_name}"
+    
+    def get_tally(self, key: str) -> SimulationTally:
+        """保存されている集計値（なければNone）"""
+        return self.tallies.get(key)
+    
+    def is_completed(self, key: str) -> bool:
+        return key in self.completed
+    
+    def get_target(self, key: str) -> int:
+        """top_upで始めたときに記録した目標のゲーム数（なければNone）"""
+        return self.targets.get(key)
+    
+    def set_target(self, key: str, target: int) -> None:
+        """
+        パターンの目標のゲーム数を記録する（次にupdateかcompleteで保存するときに一緒に保存される）
+        
+        top_upで終わったパターンはキャッシュのゲーム数が増えているので、再開するときに
+        キャッシュから数え直さずにここに記録した目標を使う。
+        
+        Args:
+            key: パターンのキー
+            target: 目標のゲーム数
+        """
+        self.targets[key] = target
+    
+    def update(self, key: str, tally: SimulationTally) -> None:
+        """
+        パターンの途中経過を記録し、前回の保存からinterval秒経っていればファイルに保存する
+        
+        Args:
+            key: パターンのキー
+            tally: そのパターンのこれまでの集計値
+        """
+        self.tallies[key] = tally
+        if time.time() - self.last_save_time >= self.interval:
+            self.save()
+    
+    def complete(self, key: str, tally: SimulationTally) -> None:
+        """パターンの終了を記録する"""
+        self.tallies[key] = tally
+        self.completed.add(key)
+        if time.time() - self.last_save_time >= self.interval:
+            self.save()
+    
+    def save(self) -> None:
+        """一時ファイルに書いてから置き換えるので、保存中に止まっても前回の内容は壊れない"""
+        state = {
+            'version': CHECKPOINT_FORMAT_VERSION,
+            'tallies': {key: base64.b64encode(tally.to_bytes()).decode('ascii') for key, tally in self.tallies.items()},
+            'completed': sorted(self.completed),
+            'targets': self.targets,
+            'rng_state': random.getstate()
+        }
+        folder_path = os.path.dirname(self.path)
+        if folder_path and not os.path.exists(folder_path):
+            os.makedirs(folder_path)
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(temp_path, self.path)
+        self.last_save_time = time.time()
+    
+    def load(self) -> None:
+        """保存された状態を読み込み、乱数の状態も復元する"""
+        with open(self.path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        if state.get('version') != CHECKPOINT_FORMAT_VERSION:
+            raise ValueError(f"ERROR: unsupported checkpoint version {state.get('version')} in {self.path}")
+        self.tallies = {key: SimulationTally.from_bytes(base64.b64decode(data)) for key, data in state['tallies'].items()}
+        self.completed = set(state['completed'])
+        self.targets = state.get('targets', {})
+        version, internal_state, gauss_next = state['rng_state']
+        random.setstate((version, tuple(internal_state), gauss_next))
+        self.last_save_time = time.time()
@@ -1,84 +1,82 @@
 import random
-from collections import defaultdict
+import itertools
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 from game_state import *
 from card_constants import *
+from simulation_tally import SimulationTally, MAX_MULLIGAN_COUNT, FAILED_NECRO_CODE, remove_unnecessary_fields
+from prefilter import get_key_card_mask, find_first_playable_hands, DEFAULT_PREFILTER_BLOCK_SIZE
+from batch_main_phase import get_card_type_indices, find_first_castable_hands
+from shuffle_provider import ShuffleProvider
+from shared_scenarios import SharedScenarioArea
+
+# プロセスで実行するときの1タスクのゲーム数
+DEFAULT_GAMES_PER_TASK = 10000
 
 class DeckAnalyzer:
-    def __init__(self, detailed_loss_reason=False):
+    def __init__(self, detailed_loss_reason=False, recorder=None, outcome_log=None, checkpoint=None, cache=None, progress=None, instrumentation=None, shuffle_provider=None, prefilter=False, batch_main_phase=False, thread_count=1, seed=None, process_count=1):
+        if recorder is not None and shuffle_provider is not None:
+            # 記録したゲームはrandomのシードで再現するので、randomを使わないシャッフルとは併用できない
+            raise ValueError("ERROR: recorder cannot be used with shuffle_provider")
+        if (prefilter or batch_main_phase) and (shuffle_provider is None or outcome_log is not None):
+            # まとめて集計したゲームはGameStateで実行しないので、1ゲームごとの記録はできない
+            raise ValueError("ERROR: prefilter and batch_main_phase require shuffle_provider and cannot be used with outcome_log")
+        if thread_count > 1 and (recorder is not None or outcome_log is not None or instrumentation is not None):
+            # 記録と計測はグローバルな乱数や1つのGameStateを前提にしているので、スレッドごとには実行できない
+            raise ValueError("ERROR: thread_count > 1 cannot be used with recorder, outcome_log or instrumentation")
+        if process_count > 1 and (recorder is not None or outcome_log is not None or instrumentation is not None
+                                  or prefilter or batch_main_phase or thread_count > 1):
+            # ワーカープロセスは共有メモリの並べ替えでGameStateを実行し、集計値だけを返す
+            raise ValueError("ERROR: process_count > 1 cannot be used with recorder, outcome_log, instrumentation, prefilter, batch_main_phase or thread_count > 1")
         self.game = GameState()
         self.detailed_loss_reason = detailed_loss_reason
+        # 抽出したゲームを記録するGameRecorder（Noneなら記録しない）
+        self.recorder = recorder
+        # 1ゲームごとの結果を記録するOutcomeLog（Noneなら記録しない）
+        self.outcome_log = outcome_log
+        # run_test_patternsの途中経過を保存するSimulationCheckpoint（Noneなら保存しない）
+        self.checkpoint = checkpoint
+        # run_test_patternsが集計値を再利用するResultsCache（Noneなら使わない）
+        self.cache = cache
+        # 進捗を表示するProgressReporter（Noneなら表示しない）
+        self.progress = progress
+        # 処理ごとの時間と回数を集計するInstrumentation（Noneなら集計しない）
+        self.instrumentation = instrumentation
+        if instrumentation is not None:
+            instrumentation.attach(self.game)
+        # デッキのシャッフルに使うShuffleProvider（Noneならrandom.shuffle）
+        self.shuffle_provider = shuffle_provider
+        self.game.shuffle_provider = shuffle_provider
+        # run_tally_without_initial_handでNecroもBeseechもない手札をまとめて判定するか
+        self.prefilter = prefilter
+        # prefilterに加えて、マナが足りずNecroを唱えられない手札もまとめて判定するか
+        self.batch_main_phase = batch_main_phase
+        # run_tally_*のゲームを分けて実行するスレッド数（1なら呼び出したスレッドでself.gameを使う）
+        self.thread_count = thread_count
+        # スレッドごとのGameStateとShuffleProviderのシードを作る乱数
+        self.random = random.Random(seed)
+        # run_tally_*のゲームを分けて実行するプロセス数（1ならプロセスを使わない）
+        self.process_count = process_count
+        # 最初にプロセスで実行するときに作るProcessPoolExecutor
+        self.executor = None
+        # run_tally_without_initial_handの各ゲームの最初の手札に使う並べ替え（ワーカープロセスが共有メモリのビューを設定する）
+        self.shared_permutations = None
     
-    def _calculate_statistics(self, wins, losses, cast_necro_count, failed_necro_count, loss_reasons, draw_count, iterations, mulligan_until_necro=False):
+    def print_statistics(self, tally: SimulationTally) -> None:
         """
-        シミュレーション結果から統計情報を計算する内部関数
+        集計値から統計情報を表示する関数
         
         Args:
-            wins: マリガン回数ごとの勝利回数
-            losses: マリガン回数ごとの敗北回数
-            cast_necro_count: マリガン回数ごとのNecro唱えた回数
-            failed_necro_count: Necroを唱えられず負けた回数
-            loss_reasons: 負けた理由の辞書
-            draw_count: ドロー数
-            iterations: シミュレーション回数
-            mulligan_until_necro: マリガン戦略（Necroを唱えるまでマリガンするかどうか）
-            
-        Returns:
-            統計情報を含む辞書
+            tally: シミュレーションの集計値
         """
-        # Calculate statistics
-        total_wins = sum(wins.values())
-        total_losses = sum(losses.values())
-        total_cast_necro = sum(cast_necro_count.values())
-        
-        # 基本的な統計情報
-        stats = {
-            'draw_count': draw_count,
-            'total_games': iterations,
-            'total_wins': total_wins,
-            'win_rate': total_wins/iterations*100,
-            'total_losses': total_losses,
-            'failed_necro_count': failed_necro_count,
-            'total_cast_necro': total_cast_necro,
-            'cast_necro_rate': total_cast_necro/iterations*100
-        }
-        
-        # 各loss_reasonごとに欄を作成
-        if self.detailed_loss_reason:
-            # 詳細なloss_reasonを使用する場合
-            for reason in [
-                FALIED_NECRO, FAILED_NECRO_COUNTERED, 
-                FAILED_CAST_BOTH_WITH_WIND_AND_VALAKUT, FAILED_CAST_BOTH_WITH_WIND_WITHOUT_VALAKUT, 
-                FAILED_CAST_BOTH_WITHOUT_WIND_WITH_VALAKUT, FAILED_CAST_BOTH_WITHOUT_WIND_AND_VALAKUT,
-                CAST_VALAKUT_FAILED_WIND_WITH_WIND, CAST_VALAKUT_FAILED_WIND_WITHOUT_WIND,
-                CAST_WIND_FAILED_TENDRILS_WITH_BESEECH_OR_TENDRILS, CAST_WIND_FAILED_TENDRILS_WITHOUT_BESEECH_OR_TENDRILS
-            ]:
-                stats[reason] = loss_reasons[reason]
-        else:
-            # 単純化されたloss_reasonを使用する場合
-            for reason in [
-                FALIED_NECRO, FAILED_NECRO_COUNTERED, 
-                FAILED_CAST_BOTH, CAST_VALAKUT_FAILED_WIND, CAST_WIND_FAILED_TENDRILS
-            ]:
-                stats[reason] = loss_reasons[reason]
-        
-        # マリガン回数ごとの統計情報を展開して追加
-        for m in range(5):
-            stats[f'wins_mull{m}'] = wins[m]
-            stats[f'losses_mull{m}'] = losses[m]
-            stats[f'cast_necro_mull{m}'] = cast_necro_count[m]
-            if cast_necro_count[m] > 0:
-                stats[f'win_rate_mull{m}'] = wins[m]/cast_necro_count[m]*100
-            else:
-                stats[f'win_rate_mull{m}'] = 0.0
+        wins, losses, cast_necro_count, failed_necro_count, necro_countered_count, loss_reasons = tally.get_counters(self.detailed_loss_reason)
+        stats = tally.calculate_statistics(self.detailed_loss_reason)
+        iterations = stats['total_games']
+        total_wins = stats['total_wins']
+        total_losses = stats['total_losses']
+        total_cast_necro = stats['total_cast_necro']
         
-        # Necroを唱えたあと、勝利する条件付き確率
-        if total_cast_necro > 0:
-            stats['win_after_necro_resolve_rate'] = total_wins/total_cast_necro*100
-        else:
-            stats['win_after_necro_resolve_rate'] = 0.0
-
         # Print results
-        print(f"\nTest Results ({iterations} iterations, draw_count={draw_count}):")
+        print(f"\nTest Results ({iterations} iterations, draw_count={tally.draw_count}):")
         print(f"Total Wins: {total_wins} ({stats['win_rate']:.1f}%)")
         print(f"Total Losses: {total_losses} ({total_losses/iterations*100:.1f}%)")
         print(f"Failed to Cast Necro: {failed_necro_count} ({failed_necro_count/iterations*100:.1f}%)")
@@ -86,9 +84,9 @@ class DeckAnalyzer:
         print(f"Win After Cast Necro: {stats['win_after_necro_resolve_rate']:.1f}%")
         
         # マリガン回数ごとの統計を表示
-        if mulligan_until_necro:
+        if not tally.with_initial_hand and tally.mulligan_until_necro:
             print("\nMulligan Statistics:")
-            for m in range(5):
+            for m in range(MAX_MULLIGAN_COUNT + 1):
                 if cast_necro_count[m] > 0:
                     win_rate = wins[m]/cast_necro_count[m]*100
                     print(f"  Mulligan {m}:")
@@ -102,11 +100,38 @@ class DeckAnalyzer:
                 percent = count/(total_losses + failed_necro_count)*100
                 print(f"  {reason}: {count} ({percent:.1f}% of losses)")
         
-        return stats
+        if tally.with_initial_hand:
+            return
+        
+        # 初期手札が指定されていない場合の追加の統計情報
+        necro_resolve_count = total_cast_necro - necro_countered_count
+        if necro_resolve_count > 0:
+            win_after_necro_resolve_rate = total_wins / necro_resolve_count * 100
+        else:
+            win_after_necro_resolve_rate = 0.0
+        
+        print(f"Cast Necro Rate: {stats['cast_necro_rate']:.1f}%")
+        print(f"Necro Cast Count: {total_cast_necro}")
+        
+        if tally.opponent_has_forces:
+            if total_cast_necro > 0:
+                necro_resolve_rate = necro_resolve_count / total_cast_necro * 100
+            else:
+                necro_resolve_rate = 0.0
+            print(f"Necro Resolve Count: {necro_resolve_count}")
+            print(f"Necro Countered Count: {necro_countered_count}")
+            print(f"Necro Resolve Rate: {necro_resolve_rate:.1f}%")
+            if total_cast_necro > 0:
+                print(f"Failed Necro Countered: {necro_countered_count} ({necro_countered_count/total_cast_necro*100:.1f}% of cast Necro)")
+            else:
+                print(f"Failed Necro Countered: {necro_countered_count} (0.0% of cast Necro)")
+            print(f"Win After Necro Resolve Rate: {win_after_necro_resolve_rate:.1f}%")
+        else:
+            print(f"Win After Necro Cast Rate: {win_after_necro_resolve_rate:.1f}%")
     
-    def run_multiple_simulations_with_initial_hand(self, deck: list[str], initial_hand: list[str], bottom_list: list[str] = [], draw_count: int = 19, summoners_pact_strategy = SummonersPactStrategy.AUTO, iterations: int = 10000) -> dict:
+    def run_tally_with_initial_hand(self, deck: list[str], initial_hand: list[str], bottom_list: list[str] = [], draw_count: int = 19, summoners_pact_strategy = SummonersPactStrategy.AUTO, iterations: int = 10000, tally: SimulationTally = None) -> SimulationTally:
         """
-        初期手札が指定されている場合のシミュレーションを実行する関数
+        初期手札が指定されている場合のシミュレーションを実行し、集計値を返す関数
         
         Args:
             deck: デッキ（カード名のリスト）
@@ -114,255 +139,346 @@ class DeckAnalyzer:
             bottom_list: デッキボトムに戻すカードのリスト
             draw_count: ドロー数
             iterations: シミュレーション回数
-            cast_summoners_pact: ネクロ設置後にSummoner's Pactを唱えてデッキをシャッフルするか？
-            
+            tally: 集計値を追加するSimulationTally（Noneなら新しく作る）
+        
         Returns:
-            シミュレーション結果の統計情報を含む辞書
+            シミュレーションの集計値
         """
-        # Statistics
-        # Necroを唱えて勝った回数
-        wins = defaultdict(int)
-        # Necroを唱えて負けた回数
-        losses = defaultdict(int)
-        # Necroを唱えた回数
-        cast_necro_count = defaultdict(int)
-        # Necroを唱えられず負けた回数
-        failed_necro_count = 0
-        # 負けた理由
-        loss_reasons = defaultdict(int)
+        if tally is None:
+            tally = SimulationTally(draw_count, with_initial_hand=True, mulligan_until_necro=False)
+        if self.thread_count > 1:
+            return self.run_tally_in_threads(tally, iterations, lambda worker, worker_iterations: worker.run_tally_with_initial_hand(
+                deck.copy(), initial_hand, bottom_list, draw_count, summoners_pact_strategy, worker_iterations))
+        if self.process_count > 1:
+            return self.run_tally_in_processes(tally, iterations, {
+                'deck': deck, 'initial_hand': initial_hand, 'bottom_list': bottom_list,
+                'draw_count': draw_count, 'summoners_pact_strategy': summoners_pact_strategy
+            })
+        # マリガン回数と結果コードごとのゲーム数
+        outcome_counts = tally.outcome_counts
+        # マリガン回数ごとのNecroを唱えた回数
+        cast_necro_counts = tally.cast_necro_counts
         
         self.game.debug_print = False
-
+        progress = self.progress
+        if progress is not None:
+            progress.begin(tally)
+        shuffle = self.shuffle_provider.shuffle if self.shuffle_provider is not None else self.game.random.shuffle
+        
         for i in range(iterations):
             self.game.reset_game()
-            random.shuffle(deck)
+            shuffle(deck)
+            if self.recorder:
+                self.recorder.begin_game()
             # 初期手札が指定されている場合は、run_with_initial_handを呼び出す
             result = self.game.run_with_initial_hand(
-                deck=deck, 
-                initial_hand=initial_hand, 
-                bottom_list=bottom_list, 
-                draw_count=draw_count, 
+                deck=deck,
+                initial_hand=initial_hand,
+                bottom_list=bottom_list,
+                draw_count=draw_count,
                 summoners_pact_strategy=summoners_pact_strategy
             )
+            if self.recorder:
+                self.recorder.end_game(self.game, result, deck, draw_count, summoners_pact_strategy,
+                                       initial_hand=initial_hand, bottom_list=bottom_list)
+            if self.outcome_log:
+                self.outcome_log.append(self.game, result)
             mulligan_count = self.game.mulligan_count
             
+            # マリガン回数と結果コードごとに数える
+            outcome_counts[mulligan_count][self.game.get_outcome_code(result)] += 1
             # Necroを唱えたかどうかをカウント
             if self.game.did_cast_necro:
-                cast_necro_count[mulligan_count] += 1
-            
-            # Collect results
-            if result:
-                wins[mulligan_count] += 1
-            else:
-                if self.game.loss_reason == FALIED_NECRO:
-                    # Necroを唱えられず負けた
-                    failed_necro_count += 1
-                else:
-                    # Necroを唱えてから負けた
-                    losses[mulligan_count] += 1
-                
-                # 負けた理由を記録
-                if self.game.loss_reason:
-                    # 詳細なloss_reasonを使用するかどうかをチェック
-                    if self.detailed_loss_reason:
-                        loss_reasons[self.game.loss_reason] += 1
-                    else:
-                        # 単純化されたloss_reasonに変換
-                        if self.game.loss_reason in [FAILED_CAST_BOTH_WITH_WIND_AND_VALAKUT, FAILED_CAST_BOTH_WITH_WIND_WITHOUT_VALAKUT, 
-                                                    FAILED_CAST_BOTH_WITHOUT_WIND_WITH_VALAKUT, FAILED_CAST_BOTH_WITHOUT_WIND_AND_VALAKUT]:
-                            loss_reasons[FAILED_CAST_BOTH] += 1
-                        elif self.game.loss_reason in [CAST_VALAKUT_FAILED_WIND_WITH_WIND, CAST_VALAKUT_FAILED_WIND_WITHOUT_WIND]:
-                            loss_reasons[CAST_VALAKUT_FAILED_WIND] += 1
-                        elif self.game.loss_reason in [CAST_WIND_FAILED_TENDRILS_WITH_BESEECH_OR_TENDRILS, CAST_WIND_FAILED_TENDRILS_WITHOUT_BESEECH_OR_TENDRILS]:
-                            loss_reasons[CAST_WIND_FAILED_TENDRILS] += 1
-                        else:
-                            loss_reasons[self.game.loss_reason] += 1
-                else:
-                    loss_reasons["Unknown"] += 1
-        
-        # 統計情報を計算
-        full_stats = self._calculate_statistics(wins, losses, cast_necro_count, failed_necro_count, loss_reasons, draw_count, iterations)
-        
-        # シンプルな統計情報を作成
-        stats = {
-            'draw_count': full_stats['draw_count'],
-            'total_games': full_stats['total_games'],
-            'wins': full_stats['total_wins'],
-            'win_rate': full_stats['win_rate'],
-            'losses': full_stats['total_losses'],
-            'cast_necro_count': full_stats['total_cast_necro'],
-            'failed_necro_count': full_stats['failed_necro_count'],
-            'cast_necro_rate': full_stats['cast_necro_rate'],
-            'win_after_necro_resolve_rate': full_stats['win_after_necro_resolve_rate']
-        }
-        
-        # 各loss_reasonごとの欄を追加
-        if self.detailed_loss_reason:
-            # 詳細なloss_reasonを使用する場合
-            for reason in [
-                FALIED_NECRO, FAILED_NECRO_COUNTERED, 
-                FAILED_CAST_BOTH_WITH_WIND_AND_VALAKUT, FAILED_CAST_BOTH_WITH_WIND_WITHOUT_VALAKUT, 
-                FAILED_CAST_BOTH_WITHOUT_WIND_WITH_VALAKUT, FAILED_CAST_BOTH_WITHOUT_WIND_AND_VALAKUT,
-                CAST_VALAKUT_FAILED_WIND_WITH_WIND, CAST_VALAKUT_FAILED_WIND_WITHOUT_WIND,
-                CAST_WIND_FAILED_TENDRILS_WITH_BESEECH_OR_TENDRILS, CAST_WIND_FAILED_TENDRILS_WITHOUT_BESEECH_OR_TENDRILS
-            ]:
-                if reason in full_stats:
-                    stats[reason] = full_stats[reason]
-        else:
-            # 単純化されたloss_reasonを使用する場合
-            for reason in [
-                FALIED_NECRO, FAILED_NECRO_COUNTERED, 
-                FAILED_CAST_BOTH, CAST_VALAKUT_FAILED_WIND, CAST_WIND_FAILED_TENDRILS
-            ]:
-                if reason in full_stats:
-                    stats[reason] = full_stats[reason]
-        
-        # 不要な項目を削除
-        self._remove_unnecessary_fields([stats])
-        
-        return stats
+                cast_necro_counts[mulligan_count] += 1
+            # check_intervalゲームごとに進捗を表示
+            if progress is not None:
+                progress.games_until_update -= 1
+                if progress.games_until_update == 0:
+                    progress.update(tally)
+        
+        if self.outcome_log:
+            self.outcome_log.flush()
+        
+        return tally
     
-    def run_multiple_simulations_without_initial_hand(self, deck: list[str], draw_count: int = 19, mulligan_until_necro: bool = True, summoners_pact_strategy = SummonersPactStrategy.AUTO, opponent_has_forces: bool = False, iterations: int = 10000) -> dict:
+    def run_multiple_simulations_with_initial_hand(self, deck: list[str], initial_hand: list[str], bottom_list: list[str] = [], draw_count: int = 19, summoners_pact_strategy = SummonersPactStrategy.AUTO, iterations: int = 10000) -> dict:
         """
-        初期手札が指定されていない場合のシミュレーションを実行する関数
+        初期手札が指定されている場合のシミュレーションを実行する関数
+        
+        Args:
+            deck: デッキ（カード名のリスト）
+            initial_hand: 初期手札
+            bottom_list: デッキボトムに戻すカードのリスト
+            draw_count: ドロー数
+            iterations: シミュレーション回数
+            cast_summoners_pact: ネクロ設置後にSummoner's Pactを唱えてデッキをシャッフルするか？
+        
+        Returns:
+            シミュレーション結果の統計情報を含む辞書
+        """
+        tally = self.run_tally_with_initial_hand(deck, initial_hand, bottom_list, draw_count, summoners_pact_strategy, iterations)
+        self.print_statistics(tally)
+        return tally.finalize(self.detailed_loss_reason)
+    
+    def run_tally_without_initial_hand(self, deck: list[str], draw_count: int = 19, mulligan_until_necro: bool = True, summoners_pact_strategy = SummonersPactStrategy.AUTO, opponent_has_forces: bool = False, iterations: int = 10000, tally: SimulationTally = None) -> SimulationTally:
+        """
+        初期手札が指定されていない場合のシミュレーションを実行し、集計値を返す関数
         
         Args:
             deck: デッキ（カード名のリスト）
             draw_count: ドロー数
             mulligan_until_necro: Necroを唱えるまでマリガンするかどうか
             opponent_has_forces: 相手がForceを持っているかどうか
-            cast_summoners_pact: ネクロ設置後にSummoner's Pactを唱えてデッキをシャッフルするか？
             iterations: シミュレーション回数
-            
+            tally: 集計値を追加するSimulationTally（Noneなら新しく作る）
+        
         Returns:
-            シミュレーション結果の統計情報を含む辞書
+            シミュレーションの集計値
         """
-        # Statistics
-        # Necroを唱えて勝った回数
-        wins = defaultdict(int)
-        # Necroを唱えて負けた回数
-        losses = defaultdict(int)
-        # Necroを唱えた回数
-        cast_necro_count = defaultdict(int)
-        # Necroを唱えられず負けた回数
-        failed_necro_count = 0
-        # Necroが打ち消された回数
-        necro_countered_count = 0
-        # Necroが解決した回数
-        necro_resolve_count = 0
-        # 負けた理由
-        loss_reasons = defaultdict(int)
+        if tally is None:
+            tally = SimulationTally(draw_count, with_initial_hand=False, mulligan_until_necro=mulligan_until_necro, opponent_has_forces=opponent_has_forces)
+        if self.thread_count > 1:
+            return self.run_tally_in_threads(tally, iterations, lambda worker, worker_iterations: worker.run_tally_without_initial_hand(
+                deck.copy(), draw_count, mulligan_until_necro, summoners_pact_strategy, opponent_has_forces, worker_iterations))
+        if self.process_count > 1:
+            return self.run_tally_in_processes(tally, iterations, {
+                'deck': deck, 'draw_count': draw_count, 'mulligan_until_necro': mulligan_until_necro,
+                'summoners_pact_strategy': summoners_pact_strategy, 'opponent_has_forces': opponent_has_forces
+            })
+        # マリガン回数と結果コードごとのゲーム数
+        outcome_counts = tally.outcome_counts
+        # マリガン回数ごとのNecroを唱えた回数
+        cast_necro_counts = tally.cast_necro_counts
         
         self.game.debug_print = False
-
-        for i in range(iterations):
+        progress = self.progress
+        if progress is not None:
+            progress.begin(tally)
+        shuffle = self.shuffle_provider.shuffle if self.shuffle_provider is not None else self.game.random.shuffle
+        if self.prefilter or self.batch_main_phase:
+            first_mulligan_counts = self.prefilter_games(tally, deck, mulligan_until_necro, iterations)
+        elif self.shared_permutations is not None:
+            first_mulligan_counts = self.arrange_shared_games(deck, iterations)
+        else:
+            first_mulligan_counts = itertools.repeat(None, iterations)
+        
+        for first_mulligan_count in first_mulligan_counts:
             self.game.reset_game()
-            random.shuffle(deck)
+            if first_mulligan_count is None:
+                shuffle(deck)
+            if self.recorder:
+                self.recorder.begin_game()
             # 初期手札が指定されていない場合は、run_without_initial_handを呼び出す
             result = self.game.run_without_initial_hand(
-                deck=deck, 
-                draw_count=draw_count, 
-                mulligan_until_necro=mulligan_until_necro, 
-                summoners_pact_strategy=summoners_pact_strategy, 
-                opponent_has_forces=opponent_has_forces
+                deck=deck,
+                draw_count=draw_count,
+                mulligan_until_necro=mulligan_until_necro,
+                summoners_pact_strategy=summoners_pact_strategy,
+                opponent_has_forces=opponent_has_forces,
+                first_mulligan_count=first_mulligan_count
             )
+            if self.recorder:
+                self.recorder.end_game(self.game, result, deck, draw_count, summoners_pact_strategy,
+                                       mulligan_until_necro=mulligan_until_necro, opponent_has_forces=opponent_has_forces)
+            if self.outcome_log:
+                self.outcome_log.append(self.game, result)
             mulligan_count = self.game.mulligan_count
             
+            # マリガン回数と結果コードごとに数える
+            outcome_counts[mulligan_count][self.game.get_outcome_code(result)] += 1
             # Necroを唱えたかどうかをカウント
             if self.game.did_cast_necro:
-                cast_necro_count[mulligan_count] += 1
-                
-                # Necroが打ち消されたかどうかをチェック
-                if self.game.loss_reason == FAILED_NECRO_COUNTERED:
-                    necro_countered_count += 1
-                else:
-                    # Necroが解決した
-                    necro_resolve_count += 1
-            
-            # Collect results
-            if result:
-                wins[mulligan_count] += 1
-            else:
-                if self.game.loss_reason == FALIED_NECRO:
-                    # Necroを唱えられず負けた
-                    failed_necro_count += 1
-                else:
-                    # Necroを唱えてから負けた
-                    losses[mulligan_count] += 1
-                
-                # 負けた理由を記録
-                if self.game.loss_reason:
-                    # 詳細なloss_reasonを使用するかどうかをチェック
-                    if self.detailed_loss_reason:
-                        loss_reasons[self.game.loss_reason] += 1
-                    else:
-                        # 単純化されたloss_reasonに変換
-                        if self.game.loss_reason in [FAILED_CAST_BOTH_WITH_WIND_AND_VALAKUT, FAILED_CAST_BOTH_WITH_WIND_WITHOUT_VALAKUT, 
-                                                    FAILED_CAST_BOTH_WITHOUT_WIND_WITH_VALAKUT, FAILED_CAST_BOTH_WITHOUT_WIND_AND_VALAKUT]:
-                            loss_reasons[FAILED_CAST_BOTH] += 1
-                        elif self.game.loss_reason in [CAST_VALAKUT_FAILED_WIND_WITH_WIND, CAST_VALAKUT_FAILED_WIND_WITHOUT_WIND]:
-                            loss_reasons[CAST_VALAKUT_FAILED_WIND] += 1
-                        elif self.game.loss_reason in [CAST_WIND_FAILED_TENDRILS_WITH_BESEECH_OR_TENDRILS, CAST_WIND_FAILED_TENDRILS_WITHOUT_BESEECH_OR_TENDRILS]:
-                            loss_reasons[CAST_WIND_FAILED_TENDRILS] += 1
-                        else:
-                            loss_reasons[self.game.loss_reason] += 1
-                else:
-                    loss_reasons["Unknown"] += 1
-        
-        # 統計情報を計算
-        stats = self._calculate_statistics(wins, losses, cast_necro_count, failed_necro_count, loss_reasons, draw_count, iterations, mulligan_until_necro)
-        
-        # 追加の統計情報
-        total_cast_necro = sum(cast_necro_count.values())
-        total_wins = sum(wins.values())
-        
-        # cast_necro_rateは全ゲーム数に対するNecroをキャストした回数の割合
-        stats['cast_necro_rate'] = total_cast_necro / iterations * 100
-        
-        # Necroが解決した回数と打ち消された回数を追加
-        stats['necro_resolve_count'] = necro_resolve_count
-        stats['necro_countered_count'] = necro_countered_count
-        
-        # Necroをキャストした回数に対するNecroが打ち消されずに解決した回数の割合
-        if total_cast_necro > 0:
-            stats['necro_resolve_rate'] = necro_resolve_count / total_cast_necro * 100
-        else:
-            stats['necro_resolve_rate'] = 0.0
+                cast_necro_counts[mulligan_count] += 1
+            # check_intervalゲームごとに進捗を表示
+            if progress is not None:
+                progress.games_until_update -= 1
+                if progress.games_until_update == 0:
+                    progress.update(tally)
         
-        # Necroが解決した回数に対する勝利回数の割合
-        if necro_resolve_count > 0:
-            stats['win_after_necro_resolve_rate'] = total_wins / necro_resolve_count * 100
-        else:
-            stats['win_after_necro_resolve_rate'] = 0.0
+        if self.outcome_log:
+            self.outcome_log.flush()
         
-        # 結果を表示
-        print(f"Cast Necro Rate: {stats['cast_necro_rate']:.1f}%")
-        print(f"Necro Cast Count: {total_cast_necro}")
+        return tally
+    
+    def prefilter_games(self, tally: SimulationTally, deck: list[str], mulligan_until_necro: bool, iterations: int):
+        """
+        NecroもBeseechもない手札をまとめて判定し、GameStateで実行するゲームだけを返すジェネレータ
         
-        if opponent_has_forces:
-            print(f"Necro Resolve Count: {necro_resolve_count}")
-            print(f"Necro Countered Count: {necro_countered_count}")
-            print(f"Necro Resolve Rate: {stats['necro_resolve_rate']:.1f}%")
-            if total_cast_necro > 0:
-                print(f"Failed Necro Countered: {necro_countered_count} ({necro_countered_count/total_cast_necro*100:.1f}% of cast Necro)")
+        DEFAULT_PREFILTER_BLOCK_SIZEゲームずつ、各マリガンの手札を引くための並べ替えをshuffle_providerで作り、
+        最初にNecroかBeseechを含む手札のマリガン回数を求める。どの手札にもないゲームは
+        最大マリガン回数のFALIED_NECROとしてtallyに直接足す。それ以外のゲームは、deckをその手札の順に
+        並べ替えてからマリガン回数を返す（run_without_initial_handのfirst_mulligan_countに渡す）。
+        batch_main_phaseなら、batch_main_phase.find_first_castable_handsでマナの上限からNecroを唱えられないと
+        分かった手札も飛ばす。
+        
+        Args:
+            tally: 集計値
+            deck: デッキ（並べ替えて返すゲームのデッキになる）
+            mulligan_until_necro: Necroを唱えるまでマリガンするかどうか
+            iterations: シミュレーション回数
+        """
+        base_deck = deck.copy()
+        key_card_mask = get_key_card_mask(base_deck)
+        card_type_indices = get_card_type_indices(base_deck)
+        cantor_count_in_deck = base_deck.count(WILD_CANTOR)
+        max_mulligan_count = MAX_MULLIGAN_COUNT if mulligan_until_necro else 0
+        attempt_count = max_mulligan_count + 1
+        progress = self.progress
+        
+        for start in range(0, iterations, DEFAULT_PREFILTER_BLOCK_SIZE):
+            game_count = min(DEFAULT_PREFILTER_BLOCK_SIZE, iterations - start)
+            permutations = self.shuffle_provider.create_block(len(base_deck), game_count * attempt_count)
+            if self.batch_main_phase:
+                first_attempts = find_first_castable_hands(card_type_indices, permutations, attempt_count, cantor_count_in_deck)
             else:
-                print(f"Failed Necro Countered: {necro_countered_count} (0.0% of cast Necro)")
-            print(f"Win After Necro Resolve Rate: {stats['win_after_necro_resolve_rate']:.1f}%")
-        else:
-            print(f"Win After Necro Cast Rate: {stats['win_after_necro_resolve_rate']:.1f}%")
+                first_attempts = find_first_playable_hands(key_card_mask, permutations, attempt_count)
             
-            # opponent_has_forces=Falseの場合は、不要な項目を削除
-            if 'necro_resolve_count' in stats:
-                del stats['necro_resolve_count']
-            if 'necro_countered_count' in stats:
-                del stats['necro_countered_count']
-            if 'necro_resolve_rate' in stats:
-                del stats['necro_resolve_rate']
-        
-        # 不要な項目を削除
-        self._remove_unnecessary_fields([stats])
-        
-        return stats
+            failed_count = int((first_attempts < 0).sum())
+            tally.outcome_counts[max_mulligan_count][FAILED_NECRO_CODE] += failed_count
+            if progress is not None and failed_count > 0:
+                progress.games_until_update -= failed_count
+                if progress.games_until_update <= 0:
+                    progress.update(tally)
+            
+            for i, first_attempt in enumerate(first_attempts.tolist()):
+                if first_attempt < 0:
+                    continue
+                deck[:] = [base_deck[j] for j in permutations[i * attempt_count + first_attempt].tolist()]
+                yield first_attempt
+    
+    def arrange_shared_games(self, deck: list[str], iterations: int):
+        """
+        deckをshared_permutationsの行の順に並べ替えてから0を返すジェネレータ
+        
+        run_without_initial_handのfirst_mulligan_countに0を渡すので、最初の手札はシャッフルせずにdeckから引き、
+        共有メモリの並べ替えを1ゲームに1行ずつ使う。マリガンした後のシャッフルはshuffle_providerで作る。
+        ビューをローカル変数に持たないので、shared_permutationsをNoneにすれば共有メモリを閉じられる。
+        
+        Args:
+            deck: デッキ（並べ替えて返すゲームのデッキになる）
+            iterations: シミュレーション回数（shared_permutationsの行数以下）
+        """
+        base_deck = deck.copy()
+        for i in range(iterations):
+            deck[:] = [base_deck[j] for j in self.shared_permutations[i].tolist()]
+            yield 0
+    
+    def create_worker(self) -> 'DeckAnalyzer':
+        """
+        スレッドで実行するDeckAnalyzerを作る
+        
+        GameState、乱数、ShuffleProviderはワーカーごとに別のインスタンスにし、ほかのスレッドと何も共有しない。
+        シードはself.randomから作るので、seedを指定したDeckAnalyzerの結果は再現できる。
+        """
+        seed = self.random.getrandbits(64)
+        shuffle_provider = ShuffleProvider(seed, self.shuffle_provider.block_size) if self.shuffle_provider is not None else None
+        worker = DeckAnalyzer(self.detailed_loss_reason, shuffle_provider=shuffle_provider,
+                              prefilter=self.prefilter, batch_main_phase=self.batch_main_phase)
+        worker.game.random = random.Random(seed)
+        worker.game.mana_solver = self.game.mana_solver
+        return worker
+    
+    def run_tally_in_threads(self, tally: SimulationTally, iterations: int, run_tally) -> SimulationTally:
+        """
+        iterationsをthread_count個に分けてワーカーのDeckAnalyzerでThreadPoolExecutorから実行し、集計値をtallyに足す
+        
+        ワーカーは互いに状態を共有しないので、GILのないCPythonではスレッド数に応じて速くなる。
+        進捗は、ワーカーが終わるたびにこのスレッドで表示する。
+        
+        Args:
+            tally: 集計値を追加するSimulationTally
+            iterations: シミュレーション回数
+            run_tally: (ワーカー, ゲーム数)を受け取り、ワーカーのrun_tally_*の集計値を返す関数
+        
+        Returns:
+            tally
+        """
+        worker_iterations = [iterations // self.thread_count + (i < iterations % self.thread_count) for i in range(self.thread_count)]
+        workers = [self.create_worker() for _ in worker_iterations]
+        progress = self.progress
+        if progress is not None:
+            progress.begin(tally)
+        
+        with ThreadPoolExecutor(max_workers=self.thread_count) as executor:
+            futures = [executor.submit(run_tally, worker, count) for worker, count in zip(workers, worker_iterations) if count > 0]
+            for future in as_completed(futures):
+                tally.merge(future.result())
+                if progress is not None:
+                    progress.update(tally)
+        
+        return tally
+    
+    def run_tally_in_processes(self, tally: SimulationTally, iterations: int, scenario: dict) -> SimulationTally:
+        """
+        scenarioのiterationsゲームをprocess_count個のワーカープロセスで実行し、集計値をtallyに足す
+        
+        デッキ、シナリオの設定、iterations行の並べ替えをSharedScenarioAreaに書き込み、
+        タスクには共有メモリの名前と担当する行の範囲だけを渡す。ワーカーはSimulationTally.to_bytesだけを返す。
+        初期手札を指定したゲームは、GameStateが手札を取り除いた後でデッキをシャッフルするので、並べ替えは作らない。
+        ゲームはすべてのプロセスに分けるので、1タスクはiterations / process_count（最大DEFAULT_GAMES_PER_TASK）ゲームになる。
+        
+        Args:
+            tally: 集計値を追加するSimulationTally
+            iterations: シミュレーション回数
+            scenario: SharedScenarioArea.createに渡すシナリオの辞書
+        
+        Returns:
+            tally
+        """
+        if iterations <= 0:
+            return tally
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.process_count)
+        progress = self.progress
+        if progress is not None:
+            progress.begin(tally)
+        
+        games_per_task = min(DEFAULT_GAMES_PER_TASK, -(-iterations // self.process_count))
+        permutation_count = 0 if scenario.get('initial_hand') else iterations
+        with SharedScenarioArea.create([scenario], permutation_count, self.random.getrandbits(64)) as area:
+            futures = [self.executor.submit(run_shared_scenario, area.name, area.layout, 0, first_row,
+                                            min(games_per_task, iterations - first_row),
+                                            self.random.getrandbits(64), self.game.mana_solver)
+                       for first_row in range(0, iterations, games_per_task)]
+            try:
+                for future in as_completed(futures):
+                    tally.merge(SimulationTally.from_bytes(future.result()))
+                    if progress is not None:
+                        progress.update(tally)
+            finally:
+                # 共有メモリを消す前に、残ったタスクが終わるのを待つ
+                for future in futures:
+                    future.cancel()
+                for future in futures:
+                    if not future.cancelled():
+                        future.exception()
+        
+        return tally
+    
+    def close(self) -> None:
+        """ワーカープロセスを終了する"""
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+    
+    def run_multiple_simulations_without_initial_hand(self, deck: list[str], draw_count: int = 19, mulligan_until_necro: bool = True, summoners_pact_strategy = SummonersPactStrategy.AUTO, opponent_has_forces: bool = False, iterations: int = 10000) -> dict:
+        """
+        初期手札が指定されていない場合のシミュレーションを実行する関数
+        
+        Args:
+            deck: デッキ（カード名のリスト）
+            draw_count: ドロー数
+            mulligan_until_necro: Necroを唱えるまでマリガンするかどうか
+            opponent_has_forces: 相手がForceを持っているかどうか
+            cast_summoners_pact: ネクロ設置後にSummoner's Pactを唱えてデッキをシャッフルするか？
+            iterations: シミュレーション回数
+        
+        Returns:
+            シミュレーション結果の統計情報を含む辞書
+        """
+        tally = self.run_tally_without_initial_hand(deck, draw_count, mulligan_until_necro, summoners_pact_strategy, opponent_has_forces, iterations)
+        self.print_statistics(tally)
+        return tally.finalize(self.detailed_loss_reason)
     
     def _remove_unnecessary_fields(self, results: list) -> None:
         """
@@ -370,53 +486,54 @@ class DeckAnalyzer:
         
         Args:
             results: 結果のリスト
-            
+        
         Returns:
             None（結果リストを直接修正）
         """
-        # 各フィールドの値を確認
-        all_cast_necro_rate_100 = all(result.get('cast_necro_rate', 0) == 100.0 for result in results)
-        all_cast_necro_count_equals_total_games = all(
-            result.get('cast_necro_count', 0) == result.get('total_games', 0) 
-            for result in results
-        )
-        all_failed_necro_count_0 = all(result.get('failed_necro_count', 0) == 0 for result in results)
-        all_failed_necro_0 = all(result.get(FALIED_NECRO, 0) == 0 for result in results)
-        all_failed_necro_countered_0 = all(result.get(FAILED_NECRO_COUNTERED, 0) == 0 for result in results)
-        
-        # initial_handとbottom_listがすべてNoneまたは空かどうかを確認
-        all_initial_hand_empty = all(
-            result.get('initial_hand') is None or result.get('initial_hand') == '' or result.get('initial_hand') == 'None'
-            for result in results
-        )
-        all_bottom_list_empty = all(
-            result.get('bottom_list') is None or result.get('bottom_list') == '' or result.get('bottom_list') == 'None'
-            for result in results
-        )
-        
-        # 条件に基づいて不要な項目を削除
-        for result in results:
-            if all_cast_necro_rate_100 and 'cast_necro_rate' in result:
-                del result['cast_necro_rate']
-            
-            if all_cast_necro_count_equals_total_games and 'cast_necro_count' in result:
-                del result['cast_necro_count']
-            
-            if all_failed_necro_count_0 and 'failed_necro_count' in result:
-                del result['failed_necro_count']
-            
-            if all_failed_necro_0 and FALIED_NECRO in result:
-                del result[FALIED_NECRO]
-            
-            if all_failed_necro_countered_0 and FAILED_NECRO_COUNTERED in result:
-                del result[FAILED_NECRO_COUNTERED]
-            
-            # initial_handとbottom_listが空の場合は削除
-            if all_initial_hand_empty and 'initial_hand' in result:
-                del result['initial_hand']
-            
-            if all_bottom_list_empty and 'bottom_list' in result:
-                del result['bottom_list']
+        remove_unnecessary_fields(results)
+
+def run_shared_scenario(name: str, layout: tuple, scenario_index: int, first_row: int, game_count: int, seed: int, mana_solver: ManaSolver) -> bytes:
+    """
+    ワーカープロセスでSharedScenarioAreaのシナリオをgame_countゲーム実行する
     
+    初期手札を指定しないシナリオでは、各ゲームの最初の手札を共有メモリのfirst_row行目からの並べ替えの順に
+    並べたデッキから引く（DeckAnalyzer.arrange_shared_games）。マリガンした後とゲーム中のシャッフル、
+    初期手札を指定したシナリオのシャッフルはseedのShuffleProviderで作る。
+    
+    Args:
+        name: 共有メモリの名前
+        layout: SharedScenarioAreaのlayout
+        scenario_index: 実行するシナリオ
+        first_row: 使う並べ替えの最初の行
+        game_count: ゲーム数
+        seed: ワーカーのGameStateとShuffleProviderのシード
+        mana_solver: ワーカーのGameStateのマナの判定方法
+    
+    Returns:
+        集計値のSimulationTally.to_bytes
+    """
+    area = SharedScenarioArea.attach(name, layout)
+    analyzer = None
+    try:
+        scenario = area.read_scenario(scenario_index)
+        analyzer = DeckAnalyzer(shuffle_provider=ShuffleProvider(seed))
+        analyzer.game.random = random.Random(seed)
+        analyzer.game.mana_solver = mana_solver
+        if scenario['initial_hand']:
+            tally = analyzer.run_tally_with_initial_hand(
+                scenario['deck'], scenario['initial_hand'], scenario['bottom_list'], scenario['draw_count'],
+                scenario['summoners_pact_strategy'], game_count)
+        else:
+            analyzer.shared_permutations = area.permutations[first_row:first_row + game_count]
+            tally = analyzer.run_tally_without_initial_hand(
+                scenario['deck'], scenario['draw_count'], scenario['mulligan_until_necro'],
+                scenario['summoners_pact_strategy'], scenario['opponent_has_forces'], game_count)
+        return tally.to_bytes()
+    finally:
+        # 共有メモリのビューが残っているとcloseできない
+        if analyzer is not None:
+            analyzer.shared_permutations = None
+        area.close()
+
 if __name__ == "__main__":
     analyzer = DeckAnalyzer()
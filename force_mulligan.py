@@ -1,5 +1,12 @@
+import sys
+import math
 import random
 import datetime
+import argparse
+import itertools
+import functools
+import numpy as np
+from fractions import Fraction
 
 # カードの種類を定義
 FORCE_OF_WILL = "Force of Will"
@@ -10,6 +17,14 @@ OTHER_CARD = "Other Card"
 # 青いカードのリスト
 BLUE_CARDS = [FORCE_OF_WILL, FORCE_OF_NEGATION, BLUE_CARD]
 
+# ベクトル化版で使うカードの種類のID（ボトムに戻す優先順位の逆順）
+CARD_TYPES = [FORCE_OF_WILL, FORCE_OF_NEGATION, BLUE_CARD, OTHER_CARD]
+FORCE_OF_WILL_ID, FORCE_OF_NEGATION_ID, BLUE_CARD_ID, OTHER_CARD_ID = range(len(CARD_TYPES))
+# ベクトル化版で1度に処理するゲーム数
+DEFAULT_BATCH_SIZE = 1000000
+# create_deckのデッキのCARD_TYPESごとの枚数
+DEFAULT_DECK_TYPE_COUNTS = (4, 2, 26, 28)
+
 class ForceMulliganSimulator:
     """Force of WillとForce of Negationのマリガン戦略をシミュレーションするクラス"""
     
@@ -216,29 +231,242 @@ class ForceMulliganSimulator:
             print(f"シミュレーション終了: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         
         return results_list  # CSVに保存するためにリスト形式で返す
+    
+    def get_deck_type_counts(self) -> np.ndarray:
+        """create_deckのデッキのCARD_TYPESごとの枚数"""
+        self.create_deck()
+        return np.array([self.deck.count(card) for card in CARD_TYPES], dtype=np.int64)
+    
+    def run_vectorized(self, count: int, rng: np.random.Generator, max_mulligan=5) -> np.ndarray:
+        """
+        runと同じマリガン処理をcountゲーム分まとめて実行する
+        
+        各マリガンではまだキープしていないゲームについて、シャッフルしたデッキの先頭7枚を
+        NumPyでまとめて引き、カードの種類ごとの枚数からForceの回数とボトムに戻すカードを配列演算で求める。
+        
+        Args:
+            count: ゲーム数
+            rng: NumPyの乱数生成器
+            max_mulligan: 最大マリガン回数
+        
+        Returns:
+            ゲームごとのForceを唱えられる回数の配列（最大マリガン回数に達したゲームは0）
+        """
+        deck_type_counts = self.get_deck_type_counts()
+        force_counts = np.zeros(count, dtype=np.int64)
+        # まだキープしていないゲームのインデックス
+        remaining = np.arange(count)
+        for mulligan_count in range(max_mulligan + 1):
+            if len(remaining) == 0:
+                break
+            type_counts = draw_type_counts(deck_type_counts, len(remaining), 7, rng)
+            keep = get_force_counts(type_counts) > 0
+            if mulligan_count > 0:
+                type_counts = put_cards_to_bottom_vectorized(type_counts, mulligan_count)
+            force_counts[remaining[keep]] = get_force_counts(type_counts[keep])
+            remaining = remaining[~keep]
+        return force_counts
+    
+    def run_simulations_vectorized(self, iterations=1000000, verbose=True, seed=None, batch_size=DEFAULT_BATCH_SIZE):
+        """
+        run_simulationsと同じ形式の結果をNumPyでまとめて計算する
+        
+        Args:
+            iterations: シミュレーション回数
+            verbose: 結果を表示するかどうか
+            seed: NumPyの乱数のシード
+            batch_size: 1度に処理するゲーム数
+        
+        Returns:
+            run_simulationsと同じ結果のリスト
+        """
+        rng = np.random.default_rng(seed)
+        histogram = np.zeros(4, dtype=np.int64)
+        for start in range(0, iterations, batch_size):
+            force_counts = self.run_vectorized(min(batch_size, iterations - start), rng)
+            # force_countが3を超える場合は3として扱う
+            histogram += np.bincount(np.minimum(force_counts, 3), minlength=4)
+        
+        results_list = []
+        for force_count, count in enumerate(histogram.tolist()):
+            results_list.append({
+                'force_count': force_count,
+                'total_simulations': iterations,
+                'count': count,
+                'percentage': (count / iterations) * 100
+            })
+        
+        if verbose:
+            average_force_count = sum(force_count * count for force_count, count in enumerate(histogram.tolist())) / iterations
+            print("\n===== シミュレーション結果 =====")
+            print(f"合計シミュレーション回数: {iterations}")
+            print(f"平均Force唱えられる回数: {average_force_count:.2f}")
+            print("\nForce唱えられる回数の分布:")
+            for result in results_list:
+                print(f"  {result['force_count']}回: {result['count']}回 ({result['percentage']:.2f}%)")
+        
+        return results_list
+    
+    def calculate_exact_results(self, max_mulligan=5):
+        """
+        create_deckのデッキのForceを唱えられる回数の厳密な分布を結果のリストにする
+        
+        Returns:
+            force_count, probability, percentageの辞書のリスト
+        """
+        distribution = calculate_force_distribution(tuple(self.get_deck_type_counts().tolist()), max_mulligan)
+        return [
+            {'force_count': force_count, 'probability': float(probability), 'percentage': float(probability) * 100}
+            for force_count, probability in enumerate(distribution)
+        ]
+
+def get_hand_compositions(deck_type_counts: tuple, hand_size: int = 7) -> list[tuple[tuple, Fraction]]:
+    """
+    hand_size枚の手札のカードの種類ごとの枚数の組み合わせと、その確率（多変量超幾何分布）
+    
+    Args:
+        deck_type_counts: デッキのカードの種類ごとの枚数
+        hand_size: 手札の枚数
+    
+    Returns:
+        (種類ごとの枚数, 確率) のリスト
+    """
+    total = math.comb(sum(deck_type_counts), hand_size)
+    compositions = []
+    for type_counts in itertools.product(*(range(min(n, hand_size) + 1) for n in deck_type_counts)):
+        if sum(type_counts) != hand_size:
+            continue
+        ways = math.prod(math.comb(n, k) for n, k in zip(deck_type_counts, type_counts))
+        compositions.append((type_counts, Fraction(ways, total)))
+    return compositions
+
+@functools.lru_cache(maxsize=None)
+def calculate_force_distribution(deck_type_counts: tuple = DEFAULT_DECK_TYPE_COUNTS, max_mulligan: int = 5) -> tuple:
+    """
+    ForceMulliganSimulator.runのForceを唱えられる回数の厳密な分布を求める
+    
+    7枚の手札の種類ごとの枚数の組み合わせをすべて数え上げ、キープできる手札にマリガン回数ごとの
+    ボトムの処理を適用する。各マリガンは新しいデッキから引くので、m回目にキープする確率は
+    (キープできない確率)^m * (その手札の確率)。
+    
+    Args:
+        deck_type_counts: デッキのCARD_TYPESごとの枚数（Force of Will, Force of Negation, 青いカード, その他）
+        max_mulligan: 最大マリガン回数
+    
+    Returns:
+        Forceを唱えられる回数0-3の確率（Fraction）のタプル（3を超える場合は3に含める）
+    """
+    compositions = get_hand_compositions(tuple(deck_type_counts))
+    type_counts = np.array([composition for composition, _ in compositions], dtype=np.int64)
+    probabilities = [probability for _, probability in compositions]
+    keep = get_force_counts(type_counts) > 0
+    not_keep_probability = sum(probability for probability, can_keep in zip(probabilities, keep) if not can_keep)
+    
+    distribution = [Fraction(0)] * 4
+    # ここまでキープできなかった確率
+    remaining_probability = Fraction(1)
+    for mulligan_count in range(max_mulligan + 1):
+        force_counts = get_force_counts(put_cards_to_bottom_vectorized(type_counts, mulligan_count))
+        for probability, can_keep, force_count in zip(probabilities, keep, force_counts.tolist()):
+            if can_keep:
+                distribution[min(force_count, 3)] += remaining_probability * probability
+        remaining_probability *= not_keep_probability
+    # 最大マリガン回数に達した場合は0
+    distribution[0] += remaining_probability
+    return tuple(distribution)
+
+def draw_type_counts(deck_type_counts: np.ndarray, count: int, draw_count: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    countゲーム分のシャッフルしたデッキの先頭draw_count枚を引き、カードの種類ごとの枚数を返す
+    
+    デッキを並べ替えて先頭を引くのと同じ分布（多変量超幾何分布）なので、
+    (ゲーム数, 60)の並べ替えを作らずに種類ごとの枚数を直接サンプリングする。
+    
+    Args:
+        deck_type_counts: デッキのカードの種類ごとの枚数
+        count: ゲーム数
+        draw_count: 引く枚数
+        rng: NumPyの乱数生成器
+    
+    Returns:
+        引いたカードの種類ごとの枚数の配列（ゲーム数, 種類数）
+    """
+    return rng.multivariate_hypergeometric(deck_type_counts, draw_count, size=count, method='count')
+
+def get_force_counts(type_counts: np.ndarray) -> np.ndarray:
+    """
+    get_force_countのベクトル化版
+    
+    Args:
+        type_counts: 手札のCARD_TYPESごとの枚数の配列（ゲーム数, 4）
+    
+    Returns:
+        ゲームごとのForceを唱えられる回数
+    """
+    force_count = type_counts[:, FORCE_OF_WILL_ID] + type_counts[:, FORCE_OF_NEGATION_ID]
+    blue_count = force_count + type_counts[:, BLUE_CARD_ID]
+    return np.minimum(force_count, blue_count // 2)
+
+def put_cards_to_bottom_vectorized(type_counts: np.ndarray, mulligan_count: int) -> np.ndarray:
+    """
+    get_cards_to_bottomと同じ優先順位（Other Card > Blue Card > Force of Negation > Force of Will）で
+    mulligan_count枚をボトムに戻した後の枚数を求める
+    
+    Args:
+        type_counts: 手札のCARD_TYPESごとの枚数の配列（ゲーム数, 4）
+        mulligan_count: ボトムに戻す枚数
+    
+    Returns:
+        ボトムに戻した後のCARD_TYPESごとの枚数の配列
+    """
+    type_counts = type_counts.copy()
+    bottom_count = np.full(len(type_counts), mulligan_count)
+    for type_id in [OTHER_CARD_ID, BLUE_CARD_ID, FORCE_OF_NEGATION_ID, FORCE_OF_WILL_ID]:
+        removed = np.minimum(type_counts[:, type_id], bottom_count)
+        type_counts[:, type_id] -= removed
+        bottom_count -= removed
+    return type_counts
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="相手のForceのマリガンのシミュレーション")
+    parser.add_argument('--iterations', type=int, default=1000000, help="シミュレーション回数")
+    parser.add_argument('--vectorized', action='store_true', help="NumPyでまとめてシミュレーションする")
+    parser.add_argument('--exact', action='store_true', help="シミュレーションせずに厳密な分布を計算する")
+    args = parser.parse_args()
+    
     # 乱数のシードを設定（再現性のため）
     random.seed(42)
     
     # シミュレーターのインスタンスを作成
     simulator = ForceMulliganSimulator()
     
-    # 単一のシミュレーションを実行（詳細表示）
-    print("===== 単一シミュレーション =====")
-    force_count = simulator.run(verbose=True)
-    print(f"Forceを唱えられる回数: {force_count}")
+    from deck_utils import save_results_to_csv
     
-    print("\n")
+    if args.exact:
+        results = simulator.calculate_exact_results()
+        print("===== 厳密な分布 =====")
+        for result in results:
+            print(f"  {result['force_count']}回: {result['percentage']:.4f}%")
+        save_results_to_csv("force_mulligan_exact", results, ['force_count', 'probability', 'percentage'])
+        sys.exit(0)
     
-    # 複数のシミュレーションを実行（統計情報）
-    iterations = 1000000
-    print(f"===== {iterations}回のシミュレーション =====")
-    results = simulator.run_simulations(iterations, verbose=True)
+    iterations = args.iterations
+    if args.vectorized:
+        print(f"===== {iterations}回のシミュレーション（ベクトル化） =====")
+        results = simulator.run_simulations_vectorized(iterations, verbose=True, seed=42)
+    else:
+        # 単一のシミュレーションを実行（詳細表示）
+        print("===== 単一シミュレーション =====")
+        force_count = simulator.run(verbose=True)
+        print(f"Forceを唱えられる回数: {force_count}")
+        
+        print("\n")
+        
+        # 複数のシミュレーションを実行（統計情報）
+        print(f"===== {iterations}回のシミュレーション =====")
+        results = simulator.run_simulations(iterations, verbose=True)
     
     # 結果をCSVに保存
-    from deck_utils import save_results_to_csv
-    
     # ファイル名を設定
     filename = "force_mulligan_results"
     
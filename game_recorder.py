@@ -0,0 +1,348 @@
+import os
+import random
+import struct
+import argparse
+from game_state import *
+from tracing import Tracer
+
+# ファイル形式
+MAGIC = b'NDGT'
+FORMAT_VERSION = 1
+FILE_HEADER = struct.Struct('<4sB')
+# レコード長（この値自身を除く）, シード, モード, ドロー数, フラグ, Summoner's Pactの戦略, loss_reason, マリガン回数, ストーム数
+RECORD_HEADER = struct.Struct('<IQBBBBBBB')
+ACTION_COUNT = struct.Struct('<H')
+
+# モード
+MODE_WITHOUT_INITIAL_HAND = 0
+MODE_WITH_INITIAL_HAND = 1
+
+# フラグ
+FLAG_MULLIGAN_UNTIL_NECRO = 1
+FLAG_OPPONENT_HAS_FORCES = 2
+FLAG_RESULT = 4
+
+# 行動の種類
+ACTION_DRAW = 0     # カードを引いた
+ACTION_CAST = 1     # 呪文を唱えた（ロールバックされた試行も含む）
+ACTION_LAND = 2     # 土地を置いた
+ACTION_IMPRINT = 3  # Chrome Moxで刻印した
+ACTION_SEARCH = 4   # Summoner's Pactで探した
+ACTION_NAMES = ['draw', 'cast', 'land', 'imprint', 'search']
+
+def encode_cards(cards: list[str]) -> bytes:
+    """カード名のリストをALL_CARDSのインデックスのバイト列に変換する"""
+    return bytes(ALL_CARDS.index(card) for card in cards)
+
+def decode_cards(data: bytes) -> list[str]:
+    return [ALL_CARDS[code] for code in data]
+
+class GameRecord:
+    """記録された1ゲーム分の情報"""
+
+    def __init__(self, seed: int, deck: list[str], initial_hand: list[str], bottom_list: list[str],
+                 draw_count: int, mulligan_until_necro: bool, summoners_pact_strategy: SummonersPactStrategy,
+                 opponent_has_forces: bool, with_initial_hand: bool):
+        self.seed = seed                              # ゲーム開始時にrandom.seedに渡した値
+        self.deck = deck                              # ゲームに渡したデッキ（60枚）
+        self.initial_hand = initial_hand              # キープした初期手札（ボトムに戻す前）
+        self.bottom_list = bottom_list                # デッキボトムに戻したカード
+        self.draw_count = draw_count
+        self.mulligan_until_necro = mulligan_until_necro
+        self.summoners_pact_strategy = summoners_pact_strategy
+        self.opponent_has_forces = opponent_has_forces
+        self.with_initial_hand = with_initial_hand    # run_with_initial_handで実行したか
+        # ゲームの結果
+        self.result = False
+        self.loss_reason = ''
+        self.mulligan_count = 0
+        self.storm_count = 0
+        self.actions = []                             # (行動の種類, カード名) のリスト
+
+    def to_bytes(self) -> bytes:
+        flags = 0
+        if self.mulligan_until_necro:
+            flags |= FLAG_MULLIGAN_UNTIL_NECRO
+        if self.opponent_has_forces:
+            flags |= FLAG_OPPONENT_HAS_FORCES
+        if self.result:
+            flags |= FLAG_RESULT
+        mode = MODE_WITH_INITIAL_HAND if self.with_initial_hand else MODE_WITHOUT_INITIAL_HAND
+
+        body = bytearray()
+        for cards in [self.deck, self.initial_hand, self.bottom_list]:
+            body.append(len(cards))
+            body += encode_cards(cards)
+        body += ACTION_COUNT.pack(len(self.actions))
+        for action, card in self.actions:
+            body.append(action)
+            body.append(ALL_CARDS.index(card))
+
+        header = RECORD_HEADER.pack(RECORD_HEADER.size - 4 + len(body), self.seed, mode, self.draw_count, flags,
+                                    self.summoners_pact_strategy.value, get_loss_reason_code(self.loss_reason),
+                                    self.mulligan_count, min(self.storm_count, 255))
+        return header + body
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'GameRecord':
+        """
+        Args:
+            data: レコード長を含むレコード全体のバイト列
+        """
+        (_, seed, mode, draw_count, flags, strategy, loss_reason_code,
+         mulligan_count, storm_count) = RECORD_HEADER.unpack_from(data)
+        offset = RECORD_HEADER.size
+        card_lists = []
+        for _ in range(3):
+            length = data[offset]
+            card_lists.append(decode_cards(data[offset + 1:offset + 1 + length]))
+            offset += 1 + length
+        deck, initial_hand, bottom_list = card_lists
+
+        record = cls(seed, deck, initial_hand, bottom_list, draw_count,
+                     bool(flags & FLAG_MULLIGAN_UNTIL_NECRO), SummonersPactStrategy(strategy),
+                     bool(flags & FLAG_OPPONENT_HAS_FORCES), mode == MODE_WITH_INITIAL_HAND)
+        record.result = bool(flags & FLAG_RESULT)
+        record.loss_reason = get_loss_reason_from_code(loss_reason_code)
+        record.mulligan_count = mulligan_count
+        record.storm_count = storm_count
+
+        (action_count,) = ACTION_COUNT.unpack_from(data, offset)
+        offset += ACTION_COUNT.size
+        for i in range(action_count):
+            record.actions.append((data[offset + i * 2], ALL_CARDS[data[offset + i * 2 + 1]]))
+        return record
+
+class RecordingSink:
+    """トレースのイベントからゲームの行動列を集めるsink"""
+
+    def __init__(self):
+        self.actions = []
+        self.initial_hand = []
+        self.bottom_list = []
+
+    def write(self, level, event: str, message: str, fields: dict) -> None:
+        if event == 'draw':
+            for card in fields['cards']:
+                self.actions.append((ACTION_DRAW, card))
+        elif event == 'cast':
+            self.actions.append((ACTION_CAST, fields['card']))
+            if fields.get('imprint'):
+                self.actions.append((ACTION_IMPRINT, fields['imprint']))
+            if fields.get('target'):
+                self.actions.append((ACTION_SEARCH, fields['target']))
+        elif event == 'set_land':
+            self.actions.append((ACTION_LAND, fields['land']))
+        elif event == 'opening_hand':
+            # マリガンのたびに上書きされ、最後にキープした手札が残る
+            self.initial_hand = list(fields['hand'])
+            self.bottom_list = []
+        elif event == 'bottom':
+            self.bottom_list = list(fields['cards'])
+
+def replay_game(record: GameRecord, game: GameState) -> bool:
+    """
+    記録されたゲームを同じシードで再実行する
+
+    Args:
+        record: 記録されたゲーム
+        game: 実行に使うGameState（tracerを設定しておけば行動が出力される）
+
+    Returns:
+        ゲームの勝敗結果
+    """
+    random.seed(record.seed)
+    game.reset_game()
+    if record.with_initial_hand:
+        # run_with_initial_handに渡すのはボトムに戻す前の手札
+        return game.run_with_initial_hand(
+            deck=record.deck,
+            initial_hand=record.initial_hand,
+            bottom_list=record.bottom_list,
+            draw_count=record.draw_count,
+            summoners_pact_strategy=record.summoners_pact_strategy)
+    return game.run_without_initial_hand(
+        deck=record.deck,
+        draw_count=record.draw_count,
+        mulligan_until_necro=record.mulligan_until_necro,
+        summoners_pact_strategy=record.summoners_pact_strategy,
+        opponent_has_forces=record.opponent_has_forces)
+
+def create_record(game: GameState, result: bool, seed: int, deck: list[str], draw_count: int,
+                  summoners_pact_strategy: SummonersPactStrategy, initial_hand: list[str] = None,
+                  bottom_list: list[str] = None, mulligan_until_necro: bool = False,
+                  opponent_has_forces: bool = False) -> GameRecord:
+    """
+    終了したゲームを同じシードで再実行し、行動列を含むGameRecordを作る
+
+    Args:
+        game: ゲームを実行したGameState
+        result: ゲームの勝敗結果
+        seed: ゲーム開始時にrandom.seedに渡した値
+        deck: ゲームに渡したデッキ
+        その他: ゲームに渡した引数（initial_handがNoneならrun_without_initial_hand）
+
+    Returns:
+        記録したゲーム（再実行の結果が元のゲームと違えばRuntimeError）
+    """
+    record = GameRecord(seed, deck.copy(), initial_hand or [], bottom_list or [], draw_count,
+                        mulligan_until_necro, summoners_pact_strategy, opponent_has_forces,
+                        initial_hand is not None)
+    record.result = result
+    record.loss_reason = game.loss_reason
+    record.mulligan_count = game.mulligan_count
+    record.storm_count = game.storm_count
+
+    # 行動列を集めるために同じシードで再実行し、元のゲームの後の乱数の状態に戻す
+    random_state = random.getstate()
+    sink = RecordingSink()
+    replay = GameState()
+    replay.tracer = Tracer(sink)
+    replay.shuffle_enabled = game.shuffle_enabled
+    replay.mana_solver = game.mana_solver
+    replay_result = replay_game(record, replay)
+    random.setstate(random_state)
+
+    if replay_result != result or replay.loss_reason != game.loss_reason:
+        raise RuntimeError(f"ERROR: replay of game (seed {seed}) did not reproduce the result")
+    record.initial_hand = sink.initial_hand
+    record.bottom_list = sink.bottom_list
+    record.actions = sink.actions
+    return record
+
+def read_records(path: str):
+    """
+    記録ファイルからGameRecordを順に読み込む
+
+    Args:
+        path: 記録ファイルのパス
+    """
+    with open(path, 'rb') as f:
+        magic, version = FILE_HEADER.unpack(f.read(FILE_HEADER.size))
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a game trace file (version {FORMAT_VERSION})")
+        while True:
+            length_bytes = f.read(4)
+            if len(length_bytes) < 4:
+                break
+            (length,) = struct.unpack('<I', length_bytes)
+            yield GameRecord.from_bytes(length_bytes + f.read(length))
+
+class GameRecorder:
+    """
+    DeckAnalyzerのゲームを抽出してバイナリ形式で記録するクラス
+
+    記録を有効にすると各ゲームの開始時に専用の乱数から作ったシードでrandom.seedを呼ぶ。
+    ゲーム中は何も記録せず、抽出されたゲームだけを同じシードで再実行して行動列を集めるので、
+    抽出されなかったゲームの負荷はシードの生成だけになる。
+    """
+
+    def __init__(self, path: str, sample_rate: int = 10000, loss_reasons: list[str] = None,
+                 max_bytes: int = 64 * 1024 * 1024, backup_count: int = 3, seed: int = None):
+        """
+        Args:
+            path: 記録ファイルのパス
+            sample_rate: sample_rate回に1回の割合でゲームを記録する（0なら割合では記録しない）
+            loss_reasons: このloss_reasonで負けたゲームはすべて記録する
+            max_bytes: ファイルがこのサイズを超えたらローテーションする
+            backup_count: 残しておく古いファイルの数（path.1, path.2, ...）
+            seed: シードを作る乱数のシード
+        """
+        self.path = path
+        self.sample_rate = sample_rate
+        self.loss_reasons = set(loss_reasons) if loss_reasons else set()
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.random = random.Random(seed)
+        self.file = None
+        self.game_seed = None
+        self.recorded_count = 0
+
+    def begin_game(self) -> None:
+        """ゲーム開始前にシードを設定する"""
+        self.game_seed = self.random.getrandbits(64)
+        random.seed(self.game_seed)
+
+    def end_game(self, game: GameState, result: bool, deck: list[str], draw_count: int,
+                 summoners_pact_strategy: SummonersPactStrategy, initial_hand: list[str] = None,
+                 bottom_list: list[str] = None, mulligan_until_necro: bool = False,
+                 opponent_has_forces: bool = False) -> bool:
+        """
+        ゲーム終了後に記録対象かを判定し、対象なら再実行して記録する
+
+        Args:
+            game: ゲームを実行したGameState
+            result: ゲームの勝敗結果
+            deck: ゲームに渡したデッキ
+            その他: ゲームに渡した引数（initial_handがNoneならrun_without_initial_hand）
+
+        Returns:
+            記録したかどうか
+        """
+        sampled = self.sample_rate > 0 and self.random.randrange(self.sample_rate) == 0
+        if not sampled and not (self.loss_reasons and not result and game.loss_reason in self.loss_reasons):
+            return False
+
+        record = create_record(game, result, self.game_seed, deck, draw_count, summoners_pact_strategy,
+                               initial_hand, bottom_list, mulligan_until_necro, opponent_has_forces)
+        self.write(record)
+        return True
+
+    def write(self, record: GameRecord) -> None:
+        if self.file is None:
+            self.open()
+        self.file.write(record.to_bytes())
+        self.recorded_count += 1
+        if self.file.tell() >= self.max_bytes:
+            self.rotate()
+
+    def open(self) -> None:
+        is_new = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        self.file = open(self.path, 'ab')
+        if is_new:
+            self.file.write(FILE_HEADER.pack(MAGIC, FORMAT_VERSION))
+
+    def rotate(self) -> None:
+        """path -> path.1 -> path.2 ... とずらし、backup_countを超えた古いファイルは削除する"""
+        self.close()
+        for i in range(self.backup_count, 0, -1):
+            source = self.path if i == 1 else f"{self.path}.{i - 1}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{i}")
+        if self.backup_count == 0:
+            os.remove(self.path)
+
+    def close(self) -> None:
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+def print_record(index: int, record: GameRecord) -> None:
+    result = "Win" if record.result else f"Lose ({record.loss_reason})"
+    print(f"#{index}: seed={record.seed} mulligan={record.mulligan_count} storm={record.storm_count} {result}")
+    print(f"  Initial hand: {', '.join(record.initial_hand)}")
+    print(f"  Bottom list: {', '.join(record.bottom_list) if record.bottom_list else 'None'}")
+    print(f"  Actions: {len(record.actions)}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="記録したゲームの一覧表示と再現")
+    parser.add_argument('path', help="記録ファイルのパス")
+    parser.add_argument('--index', type=int, help="再現するゲームの番号（省略時は一覧を表示）")
+    parser.add_argument('--actions', action='store_true', help="記録された行動列を表示する")
+    args = parser.parse_args()
+
+    for i, record in enumerate(read_records(args.path)):
+        if args.index is None:
+            print_record(i, record)
+        elif i == args.index:
+            print_record(i, record)
+            if args.actions:
+                for action, card in record.actions:
+                    print(f"  {ACTION_NAMES[action]}: {card}")
+            print()
+            # debug_print付きで再実行して詳細を表示する
+            game = GameState()
+            result = replay_game(record, game)
+            if result != record.result:
+                print("Warning: replay result differs from the recorded result")
+            break
@@ -1,12 +1,22 @@
 import random
-import csv
-import os
+import functools
 from enum import Enum, auto
 from deck_utils import create_deck
 from mana_pool import ManaPool
 from mana_sources import ManaSources
-from mana_generation_state import ManaGenerationState
+from mana_generation_state import ManaGenerationState, ManaSolver, DEFAULT_MANA_SOLVER
+from undo_journal import UndoJournal, JournaledList
+from tracing import Tracer
 from card_constants import *
+from force_mulligan import calculate_force_distribution
+
+# シミュレーションの結果が変わる変更をしたら上げる（ResultsCacheのキャッシュが無効になる）
+ENGINE_VERSION = 2
+
+@functools.lru_cache(maxsize=None)
+def get_opponent_force_probabilities() -> tuple:
+    """相手のForceの枚数0-3の確率（force_mulligan.pyのデッキの厳密な分布）"""
+    return tuple(float(probability) for probability in calculate_force_distribution())
 
 class SummonersPactStrategy(Enum):
     ALWAYS_CAST = auto()  # 常にキャスト
@@ -14,9 +24,13 @@ class SummonersPactStrategy(Enum):
     AUTO = auto()         # 自動的に判断
 
 class GameState:
-    def __init__(self):
-        self.debug_print = True  # Print control flag
+    def __init__(self, rng: random.Random = None):
+        self.tracer = Tracer()  # トレースの出力先（Noneのときは何も出力しない）
         self.shuffle_enabled = True
+        self.shuffle_provider = None  # シャッフルに使うShuffleProvider（Noneならself.random.shuffle）
+        # ゲームで使う乱数（省略時はrandomモジュールのグローバルな乱数。スレッドごとに実行する場合はrandom.Randomを渡す）
+        self.random = rng if rng is not None else random
+        self.mana_solver = DEFAULT_MANA_SOLVER  # マナ生成の探索方法
 
         self.mana_pool = ManaPool()
         self.mana_source = ManaSources(self.mana_pool)
@@ -27,6 +41,7 @@ class GameState:
     def reset_game(self):
         self.mana_pool.clear()
         self.mana_source.clear()
+        self.journal = UndoJournal()
 
         self.deck = []
         self.hand = []
@@ -35,6 +50,7 @@ class GameState:
         self.graveyard = []
         self.any_mana_sources = []
         self.used_any_mana_sources = [] # 使用済みのAny Mana Source
+        self.opening_hand = [] # main phase開始時の手札
 
         self.mulligan_count = 0 # マリガンした回数
         self.return_count = 0 # マリガンで戻すカードの枚数
@@ -47,6 +63,7 @@ class GameState:
         self.did_cast_valakut = False
         self.did_cast_wind = False
         self.did_cast_tendril = False
+        self.did_imprint_chancellor = False
         self.loss_reason = ''
 
         self.mana_patterns_valakut_before_wind = ['3UR', '2UR', '3R', '2R']
@@ -62,8 +79,11 @@ class GameState:
         return new_instance
     
     def copy_from(self, other):
-        self.debug_print = other.debug_print
+        self.tracer = other.tracer
         self.shuffle_enabled = other.shuffle_enabled
+        self.shuffle_provider = other.shuffle_provider
+        self.random = other.random
+        self.mana_solver = other.mana_solver
         
         self.mana_pool = other.mana_pool.copy()
         self.mana_source = other.mana_source.copy()
@@ -77,6 +97,7 @@ class GameState:
         self.graveyard = other.graveyard.copy()
         self.any_mana_sources = other.any_mana_sources.copy()
         self.used_any_mana_sources = other.used_any_mana_sources.copy()
+        self.opening_hand = other.opening_hand.copy()
         
         self.mulligan_count = other.mulligan_count
         self.return_count = other.return_count
@@ -89,6 +110,7 @@ class GameState:
         self.did_cast_valakut = other.did_cast_valakut
         self.did_cast_wind = other.did_cast_wind
         self.did_cast_tendril = other.did_cast_tendril
+        self.did_imprint_chancellor = other.did_imprint_chancellor
         self.loss_reason = other.loss_reason
 
         self.mana_patterns_valakut_before_wind = other.mana_patterns_valakut_before_wind
@@ -97,9 +119,66 @@ class GameState:
         self.mana_patterns_wind_with_valakut = other.mana_patterns_wind_with_valakut
         self.mana_patterns_wind_without_beseech_and_valakut = other.mana_patterns_wind_without_beseech_and_valakut
     
+    # トランザクションで変更を記録する領域
+    ZONE_NAMES = ['deck', 'hand', 'bottom_list', 'battlefield', 'graveyard', 'any_mana_sources', 'used_any_mana_sources']
+    
+    def begin(self) -> None:
+        """
+        トランザクションを開始する
+        
+        以降の領域の変更は逆操作としてジャーナルに記録され、rollback()で取り消せる。
+        入れ子にすることができ、commit()またはrollback()で直前のbegin()を閉じる。
+        """
+        if not self.journal.is_active():
+            # 一番外側のトランザクションでは、領域を変更を記録するリストに置き換える
+            for name in self.ZONE_NAMES:
+                setattr(self, name, JournaledList(getattr(self, name), self.journal))
+        
+        # マナやフラグは値が少ないのでそのまま保存する
+        pool = self.mana_pool
+        source = self.mana_source
+        snapshot = (
+            pool.W, pool.U, pool.B, pool.R, pool.G,
+            source.W, source.U, source.B, source.R, source.G, source.ANY, source.any_mana_colors.copy(),
+            self.mulligan_count, self.return_count, self.storm_count,
+            self.should_shuffle, self.did_shuffle, self.can_cast_sorcery,
+            self.did_cast_necro, self.did_cast_valakut, self.did_cast_wind, self.did_cast_tendril,
+            self.loss_reason)
+        self.journal.begin(snapshot)
+    
+    def rollback(self) -> None:
+        """直前のbegin()以降の変更をすべて取り消す"""
+        snapshot = self.journal.rollback()
+        pool = self.mana_pool
+        source = self.mana_source
+        (pool.W, pool.U, pool.B, pool.R, pool.G,
+         source.W, source.U, source.B, source.R, source.G, source.ANY, source.any_mana_colors,
+         self.mulligan_count, self.return_count, self.storm_count,
+         self.should_shuffle, self.did_shuffle, self.can_cast_sorcery,
+         self.did_cast_necro, self.did_cast_valakut, self.did_cast_wind, self.did_cast_tendril,
+         self.loss_reason) = snapshot
+        self.end_transaction()
+    
+    def commit(self) -> None:
+        """直前のbegin()以降の変更を確定する"""
+        self.journal.commit()
+        self.end_transaction()
+    
+    def end_transaction(self) -> None:
+        # 一番外側のトランザクションが終わったら、記録の不要な通常のリストに戻す
+        if not self.journal.is_active():
+            for name in self.ZONE_NAMES:
+                setattr(self, name, list(getattr(self, name)))
+    
     def shuffle_deck(self):
         if self.shuffle_enabled:
-            random.shuffle(self.deck)
+            # ジャーナルに1回の変更として記録されるように、コピーをシャッフルしてから書き戻す
+            cards = list(self.deck)
+            if self.shuffle_provider is not None:
+                self.shuffle_provider.shuffle(cards)
+            else:
+                self.random.shuffle(cards)
+            self.deck[:] = cards
             self.bottom_list.clear()
             self.did_shuffle = True
     
@@ -139,17 +218,23 @@ class GameState:
             self.graveyard.remove(card)
             self.battlefield.append(card)
     
-    def debug(self, message: str) -> None:
-        """Debug print function"""
-        if self.debug_print:
-            print(message)
+    @property
+    def debug_print(self) -> bool:
+        """Print control flag"""
+        return self.tracer is not None
+    
+    @debug_print.setter
+    def debug_print(self, value: bool) -> None:
+        # Falseのときはtracerを外し、各呼び出し側の`if self.tracer:`でトレースを丸ごと省く
+        self.tracer = Tracer() if value else None
     
     def draw_cards(self, count: int) -> None:
         drawn_cards = self.deck[:count]
         self.hand.extend(drawn_cards)
-        self.deck = self.deck[count:]
-        card_word = "card" if count == 1 else "cards"
-        self.debug(f"Draw {count} {card_word}: {', '.join(drawn_cards)}")
+        del self.deck[:count]
+        if self.tracer:
+            card_word = "card" if count == 1 else "cards"
+            self.tracer.debug('draw', "Draw {count} {card_word}: {cards!j}", count=count, card_word=card_word, cards=drawn_cards)
     
     def get_cards_to_imprint(self, casting_cards: list[str]) -> list:
         if not self.can_cast_sorcery or CHROME_MOX not in self.hand:
@@ -188,7 +273,8 @@ class GameState:
             deck=self.deck.copy(),
             cards_to_imprint=cards_to_imprint,
             can_cast_sorcery=self.can_cast_sorcery,
-            cards_used_from_hand=None, cards_imprinted=None, cards_searched=None)
+            cards_used_from_hand=None, cards_imprinted=None, cards_searched=None,
+            solver=self.mana_solver)
         
         # ManaSourcesからstate.poolにマナを移動
         state.mana_pool.W += self.mana_source.W
@@ -349,11 +435,15 @@ class GameState:
         return self.try_generate_mana_pattern(required, generic, casting_cards)
     
     def try_generate_mana_pattern(self, required: dict[str, int], generic: int, casting_cards: list[str]) -> bool:
-        self.debug(f'try_generate_mana_pattern: required: {required} generic: {generic} casting_cards: {casting_cards}')
+        if self.tracer:
+            self.tracer.debug('try_generate_mana_pattern', 'try_generate_mana_pattern: required: {required} generic: {generic} casting_cards: {casting_cards}',
+                              required=required, generic=generic, casting_cards=casting_cards)
         cards_to_imprint = self.get_cards_to_imprint(casting_cards)
         state = self.create_mana_generation_state(cards_to_imprint)
         result, cards_used_from_hand, cards_imprinted, cards_searched = state.can_generate_mana_pattern(required, generic)
-        self.debug(f'can_generate_mana_pattern: result: {result} cards_used_from_hand: {cards_used_from_hand} cards_imprinted: {cards_imprinted} cards_searched: {cards_searched}')
+        if self.tracer:
+            self.tracer.debug('can_generate_mana_pattern', 'can_generate_mana_pattern: result: {result} cards_used_from_hand: {cards_used_from_hand} cards_imprinted: {cards_imprinted} cards_searched: {cards_searched}',
+                              result=result, cards_used_from_hand=cards_used_from_hand, cards_imprinted=cards_imprinted, cards_searched=cards_searched)
         if result:
             generate_result, error_message = self.generate_mana_pattern(required, generic, cards_used_from_hand, cards_imprinted, cards_searched)
             if not generate_result:
@@ -415,10 +505,12 @@ class GameState:
         
         self.shuffle_deck()
         self.storm_count += 1
-        self.debug(f"Cast {SUMMONERS_PACT} (Search {target})")
+        if self.tracer:
+            self.tracer.debug('cast', "Cast {card} (Search {target})", card=SUMMONERS_PACT, target=target)
     
     def cast_wild_cantor(self):
-        self.debug(f"Cast {WILD_CANTOR}")
+        if self.tracer:
+            self.tracer.debug('cast', "Cast {card}", card=WILD_CANTOR)
         self.hand.remove(WILD_CANTOR)
         self.battlefield.append(WILD_CANTOR)
         self.add_any_mana_source(WILD_CANTOR)
@@ -437,13 +529,15 @@ class GameState:
         for color in output_mana:
             self.mana_pool.add_mana(color)
         
-        self.debug(f"Cast {MANAMORPHOSE} (Generate: {output_mana} Floating: {self.mana_pool})")
+        if self.tracer:
+            self.tracer.debug('cast', "Cast {card} (Generate: {output_mana} Floating: {mana_pool})", card=MANAMORPHOSE, output_mana=output_mana, mana_pool=self.mana_pool)
         
         # Draw a card
         self.draw_cards(1)
     
     def cast_borne_upon_a_wind(self):
-        self.debug(f"Cast {BORNE_UPON_WIND} (Floating: {self.mana_pool})")
+        if self.tracer:
+            self.tracer.debug('cast', "Cast {card} (Floating: {mana_pool})", card=BORNE_UPON_WIND, mana_pool=self.mana_pool)
         self.hand.remove(BORNE_UPON_WIND)
         self.graveyard.append(BORNE_UPON_WIND)
         self.storm_count += 1
@@ -453,28 +547,32 @@ class GameState:
         self.can_cast_sorcery = True
     
     def cast_dark_ritual(self):
-        self.debug(f"Cast {DARK_RITUAL}")
+        if self.tracer:
+            self.tracer.debug('cast', "Cast {card}", card=DARK_RITUAL)
         self.hand.remove(DARK_RITUAL)
         self.graveyard.append(DARK_RITUAL)
         self.storm_count += 1
         self.mana_pool.add_mana('B', 3)
     
     def cast_cabal_ritual(self):
-        self.debug(f"Cast {CABAL_RITUAL}")
+        if self.tracer:
+            self.tracer.debug('cast', "Cast {card}", card=CABAL_RITUAL)
         self.hand.remove(CABAL_RITUAL)
         self.graveyard.append(CABAL_RITUAL)
         self.storm_count += 1
         self.mana_pool.add_mana('B', 3)
     
     def cast_lotus_petal(self):
-        self.debug(f"Cast {LOTUS_PETAL}")
+        if self.tracer:
+            self.tracer.debug('cast', "Cast {card}", card=LOTUS_PETAL)
         self.hand.remove(LOTUS_PETAL)
         self.battlefield.append(LOTUS_PETAL)
         self.add_any_mana_source(LOTUS_PETAL)
         self.storm_count += 1
     
     def cast_chrome_mox(self, imprint: str):
-        self.debug(f"Cast {CHROME_MOX} (Imprint: {imprint})")
+        if self.tracer:
+            self.tracer.debug('cast', "Cast {card} (Imprint: {imprint})", card=CHROME_MOX, imprint=imprint)
         self.hand.remove(CHROME_MOX)
         self.battlefield.append(CHROME_MOX)
         if imprint:
@@ -500,21 +598,24 @@ class GameState:
         for card in cards_to_remove:
             self.hand.remove(card)
         
-        self.debug(f"Cast {VALAKUT_AWAKENING} (Floating: {self.mana_pool}, Keep: {', '.join(self.hand)})")
+        if self.tracer:
+            self.tracer.debug('cast', "Cast {card} (Floating: {mana_pool}, Keep: {hand!j})", card=VALAKUT_AWAKENING, mana_pool=self.mana_pool, hand=self.hand)
         count = len(cards_to_remove)
         self.deck.extend(cards_to_remove)
         self.draw_cards(count+1)
         self.did_cast_valakut = True
     
     def cast_beseech(self):
-        self.debug(f"Cast {BESEECH_MIRROR}")
+        if self.tracer:
+            self.tracer.debug('cast', "Cast {card}", card=BESEECH_MIRROR)
         self.hand.remove(BESEECH_MIRROR)
         self.graveyard.append(BESEECH_MIRROR)
         self.shuffle_deck()
         self.storm_count += 1
     
     def cast_tendril(self, cast_from_hand: bool):
-        self.debug(f"Cast {TENDRILS_OF_AGONY} (Storm Count: {self.storm_count})")
+        if self.tracer:
+            self.tracer.debug('cast', "Cast {card} (Storm Count: {storm_count})", card=TENDRILS_OF_AGONY, storm_count=self.storm_count)
         if cast_from_hand:
             self.hand.remove(TENDRILS_OF_AGONY)
         else:
@@ -524,13 +625,15 @@ class GameState:
         self.did_cast_tendril = True
     
     def cast_pact_of_negation(self):
-        self.debug(f"Cast {PACT_OF_NEGATION}")
+        if self.tracer:
+            self.tracer.debug('cast', "Cast {card}", card=PACT_OF_NEGATION)
         self.hand.remove(PACT_OF_NEGATION)
         self.graveyard.append(PACT_OF_NEGATION)
         self.storm_count += 1
     
     def cast_necro(self, cast_from_hand: bool):
-        self.debug(f"Cast {NECRODOMINANCE}")
+        if self.tracer:
+            self.tracer.debug('cast', "Cast {card}", card=NECRODOMINANCE)
         if cast_from_hand:
             self.hand.remove(NECRODOMINANCE)
         else:
@@ -540,7 +643,8 @@ class GameState:
         self.did_cast_necro = True
     
     def set_land(self, land: str):
-        self.debug(f"set land {land}")
+        if self.tracer:
+            self.tracer.debug('set_land', "set land {land}", land=land)
         self.hand.remove(land)
         self.battlefield.append(land)
         if land == GEMSTONE_MINE or land == UNDISCOVERED_PARADISE:
@@ -550,39 +654,16 @@ class GameState:
     
     def get_opponent_force_count(self) -> int:
         """
-        results/force_mulligan_results.csvからデータを読み込み、
-        確率に基づいて相手が持っているForceの枚数を返す
+        force_mulligan.calculate_force_distributionの厳密な分布に基づいて
+        相手が持っているForceの枚数を返す
         
         Returns:
             相手が持っているForceの枚数（0-3）
-        """ 
-        csv_path = os.path.join('results', 'force_mulligan_results.csv')
-        
-        # CSVファイルが存在しない場合はデフォルト値を返す
-        if not os.path.exists(csv_path):
-            self.debug(f"Warning: {csv_path} not found. Using default probabilities.")
-            # デフォルトの確率: 0枚:1%, 1枚:79%, 2枚:19%, 3枚:1%
-            probabilities = {0: 0.01, 1: 0.79, 2: 0.19, 3: 0.01}
-        else:
-            # CSVファイルからデータを読み込む
-            probabilities = {}
-            try:
-                with open(csv_path, 'r') as f:
-                    reader = csv.DictReader(f)
-                    for row in reader:
-                        force_count = int(row['force_count'])
-                        percentage = float(row['percentage'])
-                        probabilities[force_count] = percentage / 100.0
-            except Exception as e:
-                self.debug(f"Error reading {csv_path}: {e}. Using default probabilities.")
-                # エラーが発生した場合はデフォルト値を使用
-                probabilities = {0: 0.01, 1: 0.79, 2: 0.19, 3: 0.01}
-        
-        # 確率に基づいてForceの枚数を選択
-        r = random.random()
+        """
+        r = self.random.random()
         cumulative_prob = 0.0
-        for force_count in sorted(probabilities.keys()):
-            cumulative_prob += probabilities[force_count]
+        for force_count, probability in enumerate(get_opponent_force_probabilities()):
+            cumulative_prob += probability
             if r <= cumulative_prob:
                 return force_count
         
@@ -595,12 +676,12 @@ class GameState:
         self.can_cast_sorcery = True
         self.return_count = max(0, self.mulligan_count - (7 - len(self.hand)))
         chancellor_in_initial_hand = CHANCELLOR_OF_ANNEX in self.hand
+        self.opening_hand = self.hand.copy()
 
         if NECRODOMINANCE not in self.hand and BESEECH_MIRROR not in self.hand:
             self.loss_reason = FALIED_NECRO
             return False
 
-        initial_state = self.copy()
         initial_hand = self.hand.copy()
         
         lands = []
@@ -614,12 +695,14 @@ class GameState:
             lands.append("None")
         
         for land in lands:
+            self.begin()
             if land != "None":
                 self.set_land(land)
             
             if self.try_cast_necro(initial_hand):
+                self.commit()
                 break
-            self.copy_from(initial_state)
+            self.rollback()
         
         # Necroを唱えるのに失敗
         if not self.did_cast_necro:
@@ -638,6 +721,7 @@ class GameState:
         
         # 初手にChancellorがあって今ない場合、Chrome MoxにImprintしたと判定する
         did_imprint_chancellor = chancellor_in_initial_hand and CHANCELLOR_OF_ANNEX not in self.hand
+        self.did_imprint_chancellor = did_imprint_chancellor
 
         # マリガン分の手札をデッキボトムに戻す
         if self.return_count > 0:
@@ -669,8 +753,6 @@ class GameState:
         return True
     
     def try_cast_necro(self, initial_hand: list[str]) -> bool:
-        initial_state = self.copy()
-
         if NECRODOMINANCE in self.hand:
             # 生成するマナとcasting_cardsのパターン
             patterns = [
@@ -678,13 +760,15 @@ class GameState:
                 ('BBB', [NECRODOMINANCE])
             ]
             for mana_cost, casting_cards in patterns:
+                self.begin()
                 if self.try_generate_mana(mana_cost, casting_cards):
                     self.mana_pool.pay_mana('BBB')
                     # Cast Necro from hand
                     self.cast_necro(True)
                     if self.validate_hand_count_after_necro(initial_hand):
+                        self.commit()
                         return True
-                    self.copy_from(initial_state)
+                self.rollback()
             
         elif BESEECH_MIRROR in self.hand:
             patterns = [
@@ -692,9 +776,11 @@ class GameState:
                 ('1BBB', [BESEECH_MIRROR])
             ]
             for mana_cost, casting_cards in patterns:
+                self.begin()
                 if self.try_cast_beseech_into_necro(mana_cost, casting_cards) and self.validate_hand_count_after_necro(initial_hand):
+                    self.commit()
                     return True
-                self.copy_from(initial_state)
+                self.rollback()
                 #self.debug(f'failed to cast beseech into necro: mana_pool: {self.mana_pool}')
             
             patterns = [
@@ -702,6 +788,7 @@ class GameState:
                 ('1BBBBBB', [BESEECH_MIRROR])
             ]
             for mana_cost, casting_cards in patterns:
+                self.begin()
                 if self.try_generate_mana(mana_cost, casting_cards):
                     self.mana_pool.pay_mana('1BBBBBB')
                     self.cast_beseech()
@@ -710,8 +797,9 @@ class GameState:
                     self.hand.append(NECRODOMINANCE)
                     self.cast_necro(True)
                     if self.validate_hand_count_after_necro(initial_hand):
+                        self.commit()
                         return True
-                    self.copy_from(initial_state)
+                self.rollback()
         
         if MANAMORPHOSE in self.hand:
             casting_cards = [MANAMORPHOSE]
@@ -827,6 +915,8 @@ class GameState:
         self.hand = cards_to_keep
         self.deck.extend(cards_to_return)
         self.bottom_list = cards_to_return
+        if self.tracer:
+            self.tracer.debug('bottom', "Bottom: {cards!j}", cards=cards_to_return)
     
     def _should_cast_summoners_pact(self) -> bool:
         """
@@ -916,10 +1006,8 @@ class GameState:
         self.draw_cards(draw_count)
         
         # Show drawn cards
-        self.debug("\n=== self.hand in end step ===")
-        for card in self.hand:
-            self.debug(card)
-        self.debug("==================\n")
+        if self.tracer:
+            self.tracer.debug('end_step_hand', "\n=== self.hand in end step ===\n{hand!n}\n==================\n", hand=self.hand)
         
         # Basic validation
         if not self.validate_hand_in_end_step():
@@ -1075,7 +1163,8 @@ class GameState:
                 casting_cards = [TENDRILS_OF_AGONY]
                 if self.try_generate_mana('2BB', casting_cards):
                     self.cast_spells_for_storm_count()
-                    self.debug(f"Floating: {self.mana_pool}")
+                    if self.tracer:
+                        self.tracer.debug('floating', "Floating: {mana_pool}", mana_pool=self.mana_pool)
                     if 9 <= self.storm_count:
                         self.mana_pool.pay_mana('2BB')
                         self.cast_tendril(True)
@@ -1084,7 +1173,8 @@ class GameState:
                 casting_cards = [BESEECH_MIRROR]
                 if self.try_generate_mana('1BBB', casting_cards):
                     self.cast_spells_for_storm_count()
-                    self.debug(f"Floating: {self.mana_pool}")
+                    if self.tracer:
+                        self.tracer.debug('floating', "Floating: {mana_pool}", mana_pool=self.mana_pool)
                     if 8 <= self.storm_count:
                         if self.try_sacrifice_bargain():
                             self.mana_pool.pay_mana('1BBB')
@@ -1191,6 +1281,20 @@ class GameState:
         
         return True
 
+    def get_outcome_code(self, result: bool) -> int:
+        """
+        ゲームの結果を整数コードで返す
+        
+        Args:
+            result: ゲームの勝敗結果
+            
+        Returns:
+            勝った場合はOUTCOME_WIN、負けた場合はloss_reasonのコード（loss_reasonが空ならUNKNOWN_LOSS_REASON_CODE）
+        """
+        if result:
+            return OUTCOME_WIN
+        return LOSS_REASON_CODES.get(self.loss_reason, UNKNOWN_LOSS_REASON_CODE)
+    
     def run_with_initial_hand(self, deck: list[str], initial_hand: list[str], bottom_list: list[str],
                               draw_count: int = 19, summoners_pact_strategy: SummonersPactStrategy = SummonersPactStrategy.AUTO) -> bool:
         """
@@ -1208,8 +1312,9 @@ class GameState:
         """
         # デッキが60枚かどうかをチェック
         if len(deck) != 60:
-            self.debug(f"Error: Deck must contain exactly 60 cards. Current deck has {len(deck)} cards.")
-            self.loss_reason = "Invalid deck size"
+            if self.tracer:
+                self.tracer.error('invalid_deck_size', "Error: Deck must contain exactly 60 cards. Current deck has {deck_size} cards.", deck_size=len(deck))
+            self.loss_reason = INVALID_DECK_SIZE
             return False
         
         self.reset_game()
@@ -1221,7 +1326,10 @@ class GameState:
             if card in self.deck:
                 self.deck.remove(card)
             else:
-                self.debug(f"Warning: Card {card} not found in deck")
+                if self.tracer:
+                    self.tracer.warning('card_not_in_deck', "Warning: Card {card} not found in deck", card=card)
+        if self.tracer:
+            self.tracer.debug('opening_hand', "Opening hand (mulligan {mulligan_count}): {hand!j}", mulligan_count=0, hand=self.hand)
         
         # handのカードをdeckから取り除いた後でシャッフルする
         if self.shuffle_enabled:
@@ -1235,7 +1343,10 @@ class GameState:
                     self.hand.remove(card)
                     self.deck.append(card)
                 else:
-                    self.debug(f"Warning: Card {card} not found in hand for bottom_list")
+                    if self.tracer:
+                        self.tracer.warning('card_not_in_hand', "Warning: Card {card} not found in hand for bottom_list", card=card)
+            if self.tracer:
+                self.tracer.debug('bottom', "Bottom: {cards!j}", cards=bottom_list)
         
         #print(f"self.hand = {self.hand}")
         #print(f"self.deck = {self.deck}")
@@ -1256,13 +1367,15 @@ class GameState:
         #print(f"Cabal Ritual count in deck {self.deck.count(CABAL_RITUAL)}")
         
         if self.end_step(draw_count, summoners_pact_strategy):
-            self.debug("You Win.")
+            if self.tracer:
+                self.tracer.info('game_result', "You Win.", win=True, loss_reason=self.loss_reason)
             return True
         else:
-            self.debug("You Lose.")
+            if self.tracer:
+                self.tracer.info('game_result', "You Lose.", win=False, loss_reason=self.loss_reason)
             return False
     
-    def run_without_initial_hand(self, deck: list[str], draw_count: int, mulligan_until_necro: bool, summoners_pact_strategy: SummonersPactStrategy = SummonersPactStrategy.AUTO, opponent_has_forces: bool = False) -> bool:
+    def run_without_initial_hand(self, deck: list[str], draw_count: int, mulligan_until_necro: bool, summoners_pact_strategy: SummonersPactStrategy = SummonersPactStrategy.AUTO, opponent_has_forces: bool = False, first_mulligan_count: int = None) -> bool:
         """
         初期手札が指定されていない場合のゲーム実行関数（マリガンを行う）
         
@@ -1272,25 +1385,31 @@ class GameState:
             mulligan_until_necro: ネクロを唱えられるまでマリガンするかどうか
             opponent_has_forces: 相手がForceを持っているかどうか
             cast_summoners_pact: ネクロ設置後にSummoner's Pactを唱えてデッキをシャッフルするか？
+            first_mulligan_count: Noneでなければこのマリガン回数から始め、その手札はdeckをシャッフルせずに引く
+                （それまでの手札にNecroもBeseechもないことが分かっている場合に、deckをその手札の順に並べて渡す）
             
         Returns:
             ゲームの勝敗結果（True: 勝ち, False: 負け）
         """
         # デッキが60枚かどうかをチェック
         if len(deck) != 60:
-            self.debug(f"Error: Deck must contain exactly 60 cards. Current deck has {len(deck)} cards.")
-            self.loss_reason = "Invalid deck size"
+            if self.tracer:
+                self.tracer.error('invalid_deck_size', "Error: Deck must contain exactly 60 cards. Current deck has {deck_size} cards.", deck_size=len(deck))
+            self.loss_reason = INVALID_DECK_SIZE
             return False
         
         max_mulligan_count = 4 if mulligan_until_necro else 0
-        for mulligan_count in range(max_mulligan_count + 1):
+        start_mulligan_count = first_mulligan_count if first_mulligan_count is not None else 0
+        for mulligan_count in range(start_mulligan_count, max_mulligan_count + 1):
             self.reset_game()
             self.mulligan_count = mulligan_count
             self.deck = deck.copy()
-            if self.shuffle_enabled:
+            if self.shuffle_enabled and not (first_mulligan_count is not None and mulligan_count == first_mulligan_count):
                 self.shuffle_deck()
             
             self.draw_cards(7)
+            if self.tracer:
+                self.tracer.debug('opening_hand', "Opening hand (mulligan {mulligan_count}): {hand!j}", mulligan_count=mulligan_count, hand=self.hand)
             
             opponent_force_count = self.get_opponent_force_count() if opponent_has_forces else 0
             if self.main_phase(opponent_has_forces, opponent_force_count):
@@ -1304,14 +1423,17 @@ class GameState:
         
         # Necroをキャストできなかった場合
         if not self.did_cast_necro:
-            self.debug(f"Failed to cast Necrodominance. mulligan count = {self.mulligan_count}")
+            if self.tracer:
+                self.tracer.info('failed_necro', "Failed to cast Necrodominance. mulligan count = {mulligan_count}", mulligan_count=self.mulligan_count)
             return False
         
         if self.end_step(draw_count, summoners_pact_strategy):
-            self.debug("You Win.")
+            if self.tracer:
+                self.tracer.info('game_result', "You Win.", win=True, loss_reason=self.loss_reason)
             return True
         else:
-            self.debug("You Lose.")
+            if self.tracer:
+                self.tracer.info('game_result', "You Lose.", win=False, loss_reason=self.loss_reason)
             return False
 
 if __name__ == "__main__":
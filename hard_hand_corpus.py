@@ -0,0 +1,244 @@
+import os
+import json
+import time
+import base64
+import random
+import argparse
+from game_state import *
+from game_recorder import GameRecord, create_record, replay_game
+from instrumentation import Instrumentation
+
+CORPUS_FORMAT_VERSION = 1
+DEFAULT_CORPUS_PATH = os.path.join('results', 'hard_hands.json')
+# このノード数以上探索したゲームを記録する（通常のデッキでは0.1%程度のゲーム）
+DEFAULT_NODE_THRESHOLD = 100
+# コーパスに残すゲームの数（重いものから残す）
+DEFAULT_MAX_ENTRIES = 1000
+
+class HardHandCorpus:
+    """
+    マナ生成の探索が重かったゲームを集めたコーパス
+    
+    ゲームはGameRecord（シード、シャッフル後のデッキ、引数）で保存するので、replay_gameで同じゲームを再実行できる。
+    探索ノード数（recursion_nodes）と記録時の実行時間の大きい順にmax_entries件まで残す。
+    """
+    
+    def __init__(self, path: str = DEFAULT_CORPUS_PATH, max_entries: int = DEFAULT_MAX_ENTRIES):
+        """
+        Args:
+            path: コーパスファイルのパス
+            max_entries: 残すゲームの数
+        """
+        self.path = path
+        self.max_entries = max_entries
+        # (GameRecord, 探索ノード数, 実行時間(us)) のリスト（重い順）
+        self.entries = []
+    
+    def add(self, record: GameRecord, recursion_nodes: int, elapsed_us: float) -> None:
+        self.entries.append((record, recursion_nodes, elapsed_us))
+        self.entries.sort(key=lambda entry: (entry[1], entry[2]), reverse=True)
+        del self.entries[self.max_entries:]
+    
+    def save(self) -> None:
+        """一時ファイルに書いてから置き換える"""
+        state = {
+            'version': CORPUS_FORMAT_VERSION,
+            'engine_version': ENGINE_VERSION,
+            'entries': [
+                {
+                    'record': base64.b64encode(record.to_bytes()).decode('ascii'),
+                    'recursion_nodes': recursion_nodes,
+                    'elapsed_us': elapsed_us
+                }
+                for record, recursion_nodes, elapsed_us in self.entries
+            ]
+        }
+        folder_path = os.path.dirname(self.path)
+        if folder_path and not os.path.exists(folder_path):
+            os.makedirs(folder_path)
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, indent=1)
+        os.replace(temp_path, self.path)
+    
+    def load(self) -> None:
+        """
+        保存されたコーパスを読み込む
+        
+        ENGINE_VERSIONが違っても同じシードのゲームは再実行できるので読み込むが、結果は記録と変わりうる。
+        """
+        with open(self.path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        if state.get('version') != CORPUS_FORMAT_VERSION:
+            raise ValueError(f"ERROR: unsupported hard hand corpus version {state.get('version')} in {self.path}")
+        if state.get('engine_version') != ENGINE_VERSION:
+            print(f"Warning: {self.path} was mined with engine version {state.get('engine_version')} (current {ENGINE_VERSION})")
+        self.entries = [
+            (GameRecord.from_bytes(base64.b64decode(entry['record'])), entry['recursion_nodes'], entry['elapsed_us'])
+            for entry in state['entries']
+        ]
+
+class HardHandMiner:
+    """
+    DeckAnalyzerのrecorderとして渡し、探索ノード数か実行時間が閾値を超えたゲームをコーパスに記録するクラス
+    
+    GameRecorderと同じように各ゲームの開始時に専用の乱数から作ったシードでrandom.seedを呼ぶ。
+    探索ノード数はDeckAnalyzerに渡したInstrumentationのrecursion_nodesの増分で数える。
+    """
+    
+    def __init__(self, corpus: HardHandCorpus, instrumentation: Instrumentation = None,
+                 node_threshold: int = DEFAULT_NODE_THRESHOLD, time_threshold_us: float = None, seed: int = None):
+        """
+        Args:
+            corpus: 記録先のコーパス
+            instrumentation: DeckAnalyzerに渡したInstrumentation（node_thresholdを使うときは必須）
+            node_threshold: このノード数以上探索したゲームを記録する（Noneなら使わない）
+            time_threshold_us: この時間(us)以上かかったゲームを記録する（Noneなら使わない）
+            seed: シードを作る乱数のシード
+        """
+        if node_threshold is not None and instrumentation is None:
+            raise ValueError("ERROR: node_threshold requires the Instrumentation attached to the DeckAnalyzer")
+        if node_threshold is None and time_threshold_us is None:
+            raise ValueError("ERROR: either node_threshold or time_threshold_us is required")
+        self.corpus = corpus
+        self.instrumentation = instrumentation
+        self.node_threshold = node_threshold
+        self.time_threshold_us = time_threshold_us
+        self.random = random.Random(seed)
+        self.game_seed = None
+        self.start_nodes = 0
+        self.start_time = 0
+        self.recorded_count = 0
+    
+    def begin_game(self) -> None:
+        """ゲーム開始前にシードを設定し、ノード数と時刻を記録する"""
+        self.game_seed = self.random.getrandbits(64)
+        random.seed(self.game_seed)
+        if self.instrumentation is not None:
+            self.start_nodes = self.instrumentation.counters['recursion_nodes']
+        self.start_time = time.perf_counter_ns()
+    
+    def end_game(self, game: GameState, result: bool, deck: list[str], draw_count: int,
+                 summoners_pact_strategy: SummonersPactStrategy, initial_hand: list[str] = None,
+                 bottom_list: list[str] = None, mulligan_until_necro: bool = False,
+                 opponent_has_forces: bool = False) -> bool:
+        """
+        ゲーム終了後に閾値を超えたかを判定し、超えていれば記録する
+        
+        Args:
+            GameRecorder.end_gameと同じ
+        
+        Returns:
+            記録したかどうか
+        """
+        elapsed_us = (time.perf_counter_ns() - self.start_time) / 1e3
+        recursion_nodes = 0
+        if self.instrumentation is not None:
+            recursion_nodes = self.instrumentation.counters['recursion_nodes'] - self.start_nodes
+        is_hard = self.node_threshold is not None and recursion_nodes >= self.node_threshold
+        if self.time_threshold_us is not None and elapsed_us >= self.time_threshold_us:
+            is_hard = True
+        if not is_hard:
+            return False
+        
+        record = create_record(game, result, self.game_seed, deck, draw_count, summoners_pact_strategy,
+                               initial_hand, bottom_list, mulligan_until_necro, opponent_has_forces)
+        self.corpus.add(record, recursion_nodes, elapsed_us)
+        self.recorded_count += 1
+        return True
+    
+    def close(self) -> None:
+        self.corpus.save()
+
+def replay_corpus(corpus: HardHandCorpus, repeat: int = 3) -> list[float]:
+    """
+    コーパスのゲームを再実行して時間を計る
+    
+    Args:
+        corpus: 読み込んだコーパス
+        repeat: 各ゲームを実行する回数（最小値を使う）
+    
+    Returns:
+        ゲームごとの実行時間(us)のリスト（コーパスの順）
+    """
+    game = GameState()
+    game.debug_print = False
+    random_state = random.getstate()
+    elapsed_list = []
+    for record, _, _ in corpus.entries:
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter_ns()
+            replay_game(record, game)
+            elapsed = (time.perf_counter_ns() - start) / 1e3
+            if best is None or elapsed < best:
+                best = elapsed
+        elapsed_list.append(best)
+    random.setstate(random_state)
+    return elapsed_list
+
+def summarize_elapsed(elapsed_list: list[float]) -> dict:
+    """
+    実行時間の平均と裾（p50, p90, p99, max）を求める
+    
+    Returns:
+        {'mean': ..., 'p50': ..., 'p90': ..., 'p99': ..., 'max': ...} (us)
+    """
+    if not elapsed_list:
+        return {}
+    sorted_list = sorted(elapsed_list)
+    summary = {'mean': sum(sorted_list) / len(sorted_list)}
+    for name, quantile in [('p50', 0.5), ('p90', 0.9), ('p99', 0.99)]:
+        summary[name] = sorted_list[min(int(len(sorted_list) * quantile), len(sorted_list) - 1)]
+    summary['max'] = sorted_list[-1]
+    return summary
+
+def mine_hard_hands(deck: list[str], corpus: HardHandCorpus, iterations: int, draw_count: int = 19,
+                    node_threshold: int = DEFAULT_NODE_THRESHOLD, time_threshold_us: float = None,
+                    opponent_has_forces: bool = False, seed: int = None) -> int:
+    """
+    マリガンありのシミュレーションを実行し、重かったゲームをコーパスに記録する
+    
+    Args:
+        deck: デッキ（カード名のリスト）
+        corpus: 記録先のコーパス
+        iterations: シミュレーション回数
+        その他: HardHandMinerとrun_tally_without_initial_handの引数
+    
+    Returns:
+        記録したゲーム数
+    """
+    from deck_analyzer import DeckAnalyzer
+    instrumentation = Instrumentation()
+    miner = HardHandMiner(corpus, instrumentation, node_threshold, time_threshold_us, seed)
+    analyzer = DeckAnalyzer(recorder=miner, instrumentation=instrumentation)
+    analyzer.run_tally_without_initial_hand(deck, draw_count, opponent_has_forces=opponent_has_forces, iterations=iterations)
+    miner.close()
+    return miner.recorded_count
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="探索が重いゲームのコーパスの収集と再実行")
+    parser.add_argument('corpus', nargs='?', default=DEFAULT_CORPUS_PATH, help="コーパスファイルのパス")
+    parser.add_argument('--mine', metavar='DECK', help="このデッキのシミュレーションから重いゲームを集める")
+    parser.add_argument('--iterations', type=int, default=100000, help="収集するときのシミュレーション回数")
+    parser.add_argument('--node-threshold', type=int, default=DEFAULT_NODE_THRESHOLD, help="このノード数以上探索したゲームを記録する")
+    parser.add_argument('--time-threshold-us', type=float, help="この時間(us)以上かかったゲームも記録する")
+    parser.add_argument('--max-entries', type=int, default=DEFAULT_MAX_ENTRIES, help="コーパスに残すゲームの数")
+    parser.add_argument('--repeat', type=int, default=3, help="再実行するときに各ゲームを実行する回数")
+    args = parser.parse_args()
+    
+    corpus = HardHandCorpus(args.corpus, args.max_entries)
+    if os.path.exists(args.corpus):
+        corpus.load()
+    
+    if args.mine:
+        recorded_count = mine_hard_hands(create_deck(args.mine), corpus, args.iterations, node_threshold=args.node_threshold,
+                                         time_threshold_us=args.time_threshold_us)
+        print(f"{recorded_count} games recorded, {len(corpus.entries)} games in {args.corpus}")
+    else:
+        elapsed_list = replay_corpus(corpus, args.repeat)
+        for i, ((record, recursion_nodes, elapsed_us), replay_us) in enumerate(zip(corpus.entries, elapsed_list)):
+            print(f"#{i}: nodes={recursion_nodes} recorded={elapsed_us:.0f}us replay={replay_us:.0f}us seed={record.seed}")
+            print(f"  Initial hand: {', '.join(record.initial_hand)}")
+        summary = summarize_elapsed(elapsed_list)
+        print(' '.join(f"{name}={value:.0f}us" for name, value in summary.items()))
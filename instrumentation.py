@@ -0,0 +1,122 @@
+import time
+from collections import defaultdict
+
+# 実行時間を計測するGameStateのメソッド
+TIMED_GAME_METHODS = ['main_phase', 'try_cast_necro', 'try_generate_mana_pattern', 'end_step', 'try_cast_tendril']
+# 実行時間を計測するManaGenerationStateのメソッド
+TIMED_MANA_METHODS = ['can_generate_mana_pattern']
+# 呼び出し1回を探索の1ノードとして数えるManaGenerationStateのメソッド
+RECURSION_METHODS = ['try_generate_colored_mana', 'try_generate_B', 'try_generate_generic']
+
+class Instrumentation:
+    """
+    ゲームの処理ごとの実行時間と回数を集計するクラス
+    
+    attachしたGameStateのメソッドをインスタンス属性で計測付きのものに置き換えるので、
+    attachしていないGameStateやManaGenerationStateには何のコストもかからない。
+    時間は入れ子の呼び出しを含む（main_phaseの時間にはtry_cast_necroの時間も含まれる）。
+    """
+    
+    def __init__(self):
+        self.counters = defaultdict(int)
+        # メソッドごとの合計時間（ナノ秒）と呼び出し回数
+        self.times = defaultdict(int)
+        self.calls = defaultdict(int)
+    
+    def reset(self) -> None:
+        self.counters.clear()
+        self.times.clear()
+        self.calls.clear()
+    
+    def count(self, name: str, n: int = 1) -> None:
+        self.counters[name] += n
+    
+    def timed(self, name: str, func):
+        """
+        funcの実行時間をnameで集計する関数を返す
+        
+        try_cast_necroのように再帰する関数の時間を二重に数えないように、一番外側の呼び出しだけ時間を足す。
+        """
+        times = self.times
+        calls = self.calls
+        perf_counter_ns = time.perf_counter_ns
+        depth = [0]
+        def wrapper(*args, **kwargs):
+            calls[name] += 1
+            if depth[0] > 0:
+                depth[0] += 1
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    depth[0] -= 1
+            depth[0] = 1
+            start = perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                times[name] += perf_counter_ns() - start
+                depth[0] = 0
+        return wrapper
+    
+    def counted(self, name: str, func):
+        """funcの呼び出し回数をnameで数える関数を返す"""
+        counters = self.counters
+        def wrapper(*args, **kwargs):
+            counters[name] += 1
+            return func(*args, **kwargs)
+        return wrapper
+    
+    def attach(self, game) -> None:
+        """
+        GameStateに計測を組み込む
+        
+        Args:
+            game: 計測するGameState
+        """
+        for name in TIMED_GAME_METHODS:
+            setattr(game, name, self.timed(name, getattr(game, name)))
+        for name in ['run_with_initial_hand', 'run_without_initial_hand']:
+            setattr(game, name, self.counted('games', getattr(game, name)))
+        game.copy = self.counted('game_state_copies', game.copy)
+        
+        shuffle_deck = game.shuffle_deck
+        def counted_shuffle_deck():
+            if game.shuffle_enabled:
+                self.counters['shuffles'] += 1
+            return shuffle_deck()
+        game.shuffle_deck = counted_shuffle_deck
+        
+        create_mana_generation_state = game.create_mana_generation_state
+        def instrumented_create_mana_generation_state(cards_to_imprint):
+            state = create_mana_generation_state(cards_to_imprint)
+            self.counters['mana_generation_states'] += 1
+            self.attach_mana_generation_state(state)
+            return state
+        game.create_mana_generation_state = instrumented_create_mana_generation_state
+    
+    def attach_mana_generation_state(self, state) -> None:
+        """ManaGenerationStateに計測を組み込む（探索中に作られるコピーは数えるだけ）"""
+        for name in TIMED_MANA_METHODS:
+            setattr(state, name, self.timed(name, getattr(state, name)))
+        for name in RECURSION_METHODS:
+            setattr(state, name, self.counted('recursion_nodes', getattr(state, name)))
+        state.copy = self.counted('mana_generation_state_copies', state.copy)
+    
+    def get_results(self) -> dict:
+        """
+        集計結果を1行の辞書にする
+        
+        Returns:
+            回数、1ゲームあたりの回数、メソッドごとの呼び出し回数・合計時間(ms)・1ゲームあたりの時間(us)の辞書
+        """
+        games = self.counters['games']
+        results = {'games': games}
+        for name in ['shuffles', 'game_state_copies', 'mana_generation_states', 'mana_generation_state_copies', 'recursion_nodes']:
+            count = self.counters[name]
+            results[name] = count
+            results[f'{name}_per_game'] = count / games if games > 0 else 0.0
+        for name in TIMED_GAME_METHODS + TIMED_MANA_METHODS:
+            results[f'{name}_calls'] = self.calls[name]
+            results[f'{name}_ms'] = self.times[name] / 1e6
+            results[f'{name}_us_per_game'] = self.times[name] / 1e3 / games if games > 0 else 0.0
+        return results
@@ -1,11 +1,23 @@
+from enum import Enum, auto
 from mana_pool import ManaPool
 from card_constants import *
+from mana_kernel import is_numba_available, create_kernel_state, create_required_array, can_generate_mana_counts
+
+class ManaSolver(Enum):
+    BACKTRACKING = auto()  # 従来の再帰探索
+    DP = auto()            # 失敗した資源の状態をメモ化する動的計画法
+    DIFFERENTIAL = auto()  # 両方を実行して結果が一致することを確認する（mana_kernelの判定も確認する）
+    KERNEL = auto()        # mana_kernelで生成できると判定した場合だけ再帰探索する
+
+# numbaがあればmana_kernelをコンパイルして使う
+DEFAULT_MANA_SOLVER = ManaSolver.KERNEL if is_numba_available() else ManaSolver.BACKTRACKING
 
 class ManaGenerationState:
     def __init__(
             self, mana_pool=None, any_mana_source=0,
             hand=None, deck=None, cards_to_imprint=None, can_cast_sorcery=False,
-            cards_used_from_hand=None, cards_imprinted=None, cards_searched=None):
+            cards_used_from_hand=None, cards_imprinted=None, cards_searched=None,
+            solver=ManaSolver.BACKTRACKING):
         self.mana_pool = mana_pool if mana_pool is not None else ManaPool()
         self.any_mana_source = any_mana_source
         self.hand = hand if hand is not None else []
@@ -15,6 +27,9 @@ class ManaGenerationState:
         self.cards_used_from_hand = cards_used_from_hand if cards_used_from_hand is not None else []
         self.cards_imprinted = cards_imprinted if cards_imprinted is not None else []
         self.cards_searched = cards_searched if cards_searched is not None else []
+        self.solver = solver
+        # DPで使用する、マナを生成できないと分かった状態の集合（コピー間で共有する）
+        self.failed_states = set() if solver == ManaSolver.DP else None
     
     def copy(self):
         new_instance = ManaGenerationState()
@@ -31,8 +46,33 @@ class ManaGenerationState:
         self.cards_used_from_hand = other.cards_used_from_hand.copy()
         self.cards_imprinted = other.cards_imprinted.copy()
         self.cards_searched = other.cards_searched.copy()
+        self.solver = other.solver
+        self.failed_states = other.failed_states
+    
+    def get_state_key(self, step: str) -> tuple:
+        """
+        探索の結果を決める資源の状態をタプルで返す
+        
+        手札やデッキの並び順、使用したカードの記録は結果に影響しないので含めない
+        
+        Args:
+            step: 探索中のステップ（'R', 'G', 'W', 'U', 'B', 'generic'）
+        
+        Returns:
+            状態のキー
+        """
+        pool = self.mana_pool
+        return (
+            step, pool.W, pool.U, pool.B, pool.R, pool.G, self.any_mana_source,
+            tuple(sorted(self.hand)), tuple(sorted(self.cards_to_imprint)),
+            self.deck.count(WILD_CANTOR), self.cards_searched.count(ELVISH_SPIRIT_GUIDE))
     
     def can_generate_mana_pattern(self, required: dict[str, int], generic: int) -> tuple[bool, list[str], list[str], list[str]]:
+        if self.solver == ManaSolver.DIFFERENTIAL:
+            return self.compare_solvers(required, generic)
+        if self.solver == ManaSolver.KERNEL and not self.can_generate_mana_with_kernel(required, generic):
+            return [False, [], [], []]
+        
         if self.mana_pool.can_pay_pattern(required, generic):
             return [True, self.cards_used_from_hand, self.cards_imprinted, self.cards_searched]
         
@@ -77,6 +117,45 @@ class ManaGenerationState:
         else:
             return [False, [], [], []]
     
+    def compare_solvers(self, required: dict[str, int], generic: int) -> tuple[bool, list[str], list[str], list[str]]:
+        """
+        BACKTRACKINGとDPの両方で探索し、結果とmana_kernelの判定が一致することを確認する
+        
+        Raises:
+            RuntimeError: ソルバーの結果が異なる場合
+        """
+        kernel_result = self.can_generate_mana_with_kernel(required, generic)
+        results = []
+        states = []
+        for solver in [ManaSolver.BACKTRACKING, ManaSolver.DP]:
+            state = self.copy()
+            state.solver = solver
+            state.failed_states = set() if solver == ManaSolver.DP else None
+            results.append(state.can_generate_mana_pattern(required, generic))
+            states.append(state)
+        
+        backtracking_result, dp_result = results
+        if backtracking_result != dp_result or kernel_result != dp_result[0]:
+            error_msg = f"ERROR: mana solvers disagree\n"
+            error_msg += f"required: {required}, generic: {generic}\n"
+            error_msg += f"hand: {self.hand}, mana_pool: {self.mana_pool}, any_mana_source: {self.any_mana_source}\n"
+            error_msg += f"backtracking: {backtracking_result}\n"
+            error_msg += f"dp: {dp_result}\n"
+            error_msg += f"kernel: {kernel_result}"
+            raise RuntimeError(error_msg)
+        
+        # DPの結果の状態を引き継ぐ
+        solver = self.solver
+        self.copy_from(states[1])
+        self.solver = solver
+        return dp_result
+    
+    def can_generate_mana_with_kernel(self, required: dict[str, int], generic: int) -> bool:
+        """mana_kernelで、can_generate_mana_patternがマナを生成できるかだけを判定する"""
+        pool = self.mana_pool
+        state = create_kernel_state(self.hand, self.cards_to_imprint, [pool.W, pool.U, pool.B, pool.R, pool.G], self.any_mana_source, self.deck)
+        return bool(can_generate_mana_counts(state, create_required_array(required), generic, self.can_cast_sorcery))
+    
     def can_generate_mana(self, mana_cost: str) -> tuple[bool, list[str], list[str], list[str]]:
         required, generic = self.mana_pool.analyze_mana_pattern(mana_cost)
         return self.can_generate_mana_pattern(required, generic)
@@ -197,6 +276,12 @@ class ManaGenerationState:
                 # Invalid Color
                 return False
         
+        state_key = None
+        if self.failed_states is not None:
+            state_key = self.get_state_key(color)
+            if state_key in self.failed_states:
+                return False
+        
         initial_state = self.copy()
         
         # Use any color mana source
@@ -241,6 +326,8 @@ class ManaGenerationState:
                         return True
                     self.copy_from(initial_state)
         
+        if state_key is not None:
+            self.failed_states.add(state_key)
         return False
     
     def try_generate_B(self, required: dict[str, int], generic: int) -> bool:
@@ -249,6 +336,12 @@ class ManaGenerationState:
             # 黒マナはマナプールから支払わない
             return self.try_generate_generic(required, generic)
         
+        state_key = None
+        if self.failed_states is not None:
+            state_key = self.get_state_key('B')
+            if state_key in self.failed_states:
+                return False
+        
         initial_state = self.copy()
         
         if DARK_RITUAL in self.hand and self.mana_pool.B > 0:
@@ -300,6 +393,8 @@ class ManaGenerationState:
                         return True
                     self.copy_from(initial_state)
         
+        if state_key is not None:
+            self.failed_states.add(state_key)
         return False
     
     def try_generate_generic(self, required: dict[str, int], generic: int) -> bool:
@@ -309,6 +404,12 @@ class ManaGenerationState:
             self.mana_pool.pay_pattern({'B': requiredB}, generic)
             return True
         
+        state_key = None
+        if self.failed_states is not None:
+            state_key = self.get_state_key('generic')
+            if state_key in self.failed_states:
+                return False
+        
         initial_state = self.copy()
 
         # Chancellorを刻印でChrome Moxキャスト
@@ -352,5 +453,7 @@ class ManaGenerationState:
                             return True
                         self.copy_from(initial_state)
         
+        if state_key is not None:
+            self.failed_states.add(state_key)
         return False
     
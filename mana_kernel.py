@@ -0,0 +1,324 @@
+import numpy as np
+from card_constants import *
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+# 探索で使うカードの種類（それ以外のカードはマナの生成に関係しないので数えない）
+KERNEL_CARD_TYPES = [
+    CHROME_MOX, LOTUS_PETAL, SUMMONERS_PACT, ELVISH_SPIRIT_GUIDE, SIMIAN_SPIRIT_GUIDE,
+    WILD_CANTOR, DARK_RITUAL, CABAL_RITUAL,
+    CHANCELLOR_OF_ANNEX, PACT_OF_NEGATION, BORNE_UPON_WIND, VALAKUT_AWAKENING, MANAMORPHOSE,
+    DURESS, NECRODOMINANCE, BESEECH_MIRROR
+]
+(CHROME_MOX_ID, LOTUS_PETAL_ID, SUMMONERS_PACT_ID, ELVISH_SPIRIT_GUIDE_ID, SIMIAN_SPIRIT_GUIDE_ID,
+ WILD_CANTOR_ID, DARK_RITUAL_ID, CABAL_RITUAL_ID,
+ CHANCELLOR_OF_ANNEX_ID, PACT_OF_NEGATION_ID, BORNE_UPON_WIND_ID, VALAKUT_AWAKENING_ID, MANAMORPHOSE_ID,
+ DURESS_ID, NECRODOMINANCE_ID, BESEECH_MIRROR_ID) = range(len(KERNEL_CARD_TYPES))
+CARD_TYPE_COUNT = len(KERNEL_CARD_TYPES)
+
+# マナの色の順番（マナプールとrequiredの配列のインデックス）
+COLORS = 'WUBRG'
+W, U, B, R, G = range(5)
+
+# 状態の配列のインデックス
+STEP = 0
+POOL = 1
+ANY_MANA_SOURCE = POOL + 5
+DECK_CANTOR = ANY_MANA_SOURCE + 1
+DECK_ELVISH = DECK_CANTOR + 1
+HAND = DECK_ELVISH + 1
+IMPRINT = HAND + CARD_TYPE_COUNT
+STATE_SIZE = IMPRINT + CARD_TYPE_COUNT
+
+# 探索のステップ（ManaGenerationStateと同じくR, G, W, U, B, genericの順に支払う）
+STEP_COLORS = np.array([R, G, W, U], dtype=np.int64)
+STEP_B = 4
+STEP_GENERIC = 5
+
+# Chrome Moxで色ごとに刻印を試すカードの順番（-1は終わり）
+IMPRINT_CARDS = np.array([
+    [CHANCELLOR_OF_ANNEX_ID, -1, -1, -1, -1],
+    [PACT_OF_NEGATION_ID, BORNE_UPON_WIND_ID, -1, -1, -1],
+    [DURESS_ID, NECRODOMINANCE_ID, BESEECH_MIRROR_ID, CABAL_RITUAL_ID, DARK_RITUAL_ID],
+    [VALAKUT_AWAKENING_ID, WILD_CANTOR_ID, MANAMORPHOSE_ID, -1, -1],
+    [SUMMONERS_PACT_ID, -1, -1, -1, -1],
+], dtype=np.int64)
+# 不特定マナのためにChrome Moxを唱えるときに試す色の順番
+GENERIC_MOX_COLORS = np.array([W, G, B, R, U], dtype=np.int64)
+
+def is_numba_available() -> bool:
+    return njit is not None
+
+def jit(function):
+    """numbaがあればnjitでコンパイルし、なければそのままPythonの関数として使う"""
+    if njit is None:
+        return function
+    return njit(cache=True)(function)
+
+def create_kernel_state(hand: list[str], cards_to_imprint: list[str], pool: list[int], any_mana_source: int, deck: list[str]) -> np.ndarray:
+    """
+    ManaGenerationStateの資源を整数の配列にする
+    
+    Args:
+        hand: 手札
+        cards_to_imprint: Chrome Moxに刻印してよいカード
+        pool: W, U, B, R, Gの順のマナプール
+        any_mana_source: 任意の色のマナ源の数
+        deck: デッキ
+    
+    Returns:
+        状態の配列
+    """
+    state = np.zeros(STATE_SIZE, dtype=np.int64)
+    state[POOL:POOL + 5] = pool
+    state[ANY_MANA_SOURCE] = any_mana_source
+    state[DECK_CANTOR] = deck.count(WILD_CANTOR)
+    state[DECK_ELVISH] = deck.count(ELVISH_SPIRIT_GUIDE)
+    for i, card in enumerate(KERNEL_CARD_TYPES):
+        state[HAND + i] = hand.count(card)
+        state[IMPRINT + i] = cards_to_imprint.count(card)
+    return state
+
+def create_required_array(required: dict[str, int]) -> np.ndarray:
+    """requiredの辞書をW, U, B, R, Gの順の配列にする"""
+    return np.array([required[color] for color in COLORS], dtype=np.int64)
+
+@jit
+def can_pay(state, required, generic):
+    total = 0
+    required_total = generic
+    for color in range(5):
+        if state[POOL + color] < required[color]:
+            return False
+        total += state[POOL + color]
+        required_total += required[color]
+    return total >= required_total
+
+@jit
+def get_pool_total(state):
+    total = 0
+    for color in range(5):
+        total += state[POOL + color]
+    return total
+
+@jit
+def cast_card(state, card):
+    state[HAND + card] -= 1
+    if state[IMPRINT + card] > 0:
+        state[IMPRINT + card] -= 1
+
+@jit
+def try_cast_chrome_mox(state, color):
+    for card in IMPRINT_CARDS[color]:
+        if card < 0:
+            break
+        if state[IMPRINT + card] > 0 and state[HAND + card] > 0:
+            state[IMPRINT + card] -= 1
+            state[HAND + card] -= 1
+            state[HAND + CHROME_MOX_ID] -= 1
+            return True
+    return False
+
+@jit
+def can_pay_cabal_ritual(state):
+    return state[POOL + B] > 0 and get_pool_total(state) >= 2
+
+@jit
+def pay_cabal_ritual(state):
+    # ManaPool.pay_mana('1B')と同じく、Bを払ってから不特定マナをW, G, R, B, Uの順に払う
+    state[POOL + B] -= 1
+    for color in (W, G, R, B, U):
+        if state[POOL + color] > 0:
+            state[POOL + color] -= 1
+            break
+
+@jit
+def search_cantor(state):
+    # Summoner's PactでWild Cantorをサーチする
+    cast_card(state, SUMMONERS_PACT_ID)
+    state[DECK_CANTOR] -= 1
+    state[HAND + WILD_CANTOR_ID] += 1
+
+@jit
+def push(stack, count, state):
+    if count == len(stack):
+        new_stack = np.empty((len(stack) * 2, stack.shape[1]), dtype=np.int64)
+        new_stack[:count] = stack
+        stack = new_stack
+    stack[count] = state
+    return stack, count + 1
+
+@jit
+def can_generate_mana_counts(initial_state, required, generic, can_cast_sorcery):
+    """
+    ManaGenerationState.can_generate_mana_patternと同じ判定を整数の配列で行う
+    
+    再帰探索のかわりに、同じ分岐の状態をスタックに積んで探索する。
+    結果（生成できるかどうか）は探索の順番によらないので、ManaGenerationStateと同じになる。
+    
+    Args:
+        initial_state: create_kernel_stateの結果
+        required: W, U, B, R, Gの順の必要な色マナ
+        generic: 必要な不特定マナ
+        can_cast_sorcery: ソーサリーを唱えられるか
+    
+    Returns:
+        マナを生成できるかどうか
+    """
+    state = initial_state.copy()
+    if can_pay(state, required, generic):
+        return True
+    
+    # Summoners PactでElvishをサーチし、Spirit Guideをすべてマナに変える
+    while state[HAND + SUMMONERS_PACT_ID] > 0 and state[DECK_ELVISH] > 0:
+        cast_card(state, SUMMONERS_PACT_ID)
+        state[DECK_ELVISH] -= 1
+        state[HAND + ELVISH_SPIRIT_GUIDE_ID] += 1
+    while state[HAND + ELVISH_SPIRIT_GUIDE_ID] > 0:
+        cast_card(state, ELVISH_SPIRIT_GUIDE_ID)
+        state[POOL + G] += 1
+    while state[HAND + SIMIAN_SPIRIT_GUIDE_ID] > 0:
+        cast_card(state, SIMIAN_SPIRIT_GUIDE_ID)
+        state[POOL + R] += 1
+    if can_pay(state, required, generic):
+        return True
+    
+    if can_cast_sorcery:
+        while state[HAND + LOTUS_PETAL_ID] > 0:
+            cast_card(state, LOTUS_PETAL_ID)
+            state[ANY_MANA_SOURCE] += 1
+    
+    total_available_mana = get_pool_total(state) + state[ANY_MANA_SOURCE] + state[HAND + CHROME_MOX_ID] + state[HAND + DARK_RITUAL_ID] * 2 + state[HAND + CABAL_RITUAL_ID]
+    total_required_mana = generic
+    for color in range(5):
+        total_required_mana += required[color]
+    if total_available_mana < total_required_mana:
+        return False
+    
+    stack = np.empty((64, STATE_SIZE), dtype=np.int64)
+    state[STEP] = 0
+    stack, count = push(stack, 0, state)
+    while count > 0:
+        count -= 1
+        state = stack[count].copy()
+        step = state[STEP]
+        
+        if step < STEP_B:
+            # try_generate_colored_mana
+            color = STEP_COLORS[step]
+            if required[color] <= state[POOL + color]:
+                state[POOL + color] -= required[color]
+                state[STEP] = step + 1
+                stack, count = push(stack, count, state)
+                continue
+            
+            if state[ANY_MANA_SOURCE] > 0:
+                child = state.copy()
+                child[ANY_MANA_SOURCE] -= 1
+                child[POOL + color] += 1
+                stack, count = push(stack, count, child)
+            
+            if can_cast_sorcery:
+                if state[HAND + CHROME_MOX_ID] > 0:
+                    child = state.copy()
+                    if try_cast_chrome_mox(child, color):
+                        child[POOL + color] += 1
+                        stack, count = push(stack, count, child)
+                
+                if state[HAND + WILD_CANTOR_ID] > 0:
+                    for cost in (G, R):
+                        if color != cost and state[POOL + cost] > 0:
+                            child = state.copy()
+                            child[POOL + cost] -= 1
+                            cast_card(child, WILD_CANTOR_ID)
+                            child[ANY_MANA_SOURCE] += 1
+                            stack, count = push(stack, count, child)
+                elif color != G and (state[POOL + G] > 0 or state[POOL + R] > 0) and\
+                    state[HAND + SUMMONERS_PACT_ID] > 0 and state[DECK_CANTOR] > 0:
+                    child = state.copy()
+                    search_cantor(child)
+                    stack, count = push(stack, count, child)
+        
+        elif step == STEP_B:
+            # try_generate_B（黒マナはマナプールから支払わない）
+            if required[B] <= state[POOL + B]:
+                state[STEP] = STEP_GENERIC
+                stack, count = push(stack, count, state)
+                continue
+            
+            if state[HAND + DARK_RITUAL_ID] > 0 and state[POOL + B] > 0:
+                child = state.copy()
+                cast_card(child, DARK_RITUAL_ID)
+                child[POOL + B] += 2
+                stack, count = push(stack, count, child)
+            
+            if state[HAND + CABAL_RITUAL_ID] > 0 and can_pay_cabal_ritual(state):
+                child = state.copy()
+                cast_card(child, CABAL_RITUAL_ID)
+                pay_cabal_ritual(child)
+                child[POOL + B] += 3
+                stack, count = push(stack, count, child)
+            
+            if state[ANY_MANA_SOURCE] > 0:
+                child = state.copy()
+                child[ANY_MANA_SOURCE] -= 1
+                child[POOL + B] += 1
+                stack, count = push(stack, count, child)
+            
+            if can_cast_sorcery:
+                if state[HAND + CHROME_MOX_ID] > 0:
+                    child = state.copy()
+                    if try_cast_chrome_mox(child, B):
+                        child[POOL + B] += 1
+                        stack, count = push(stack, count, child)
+                
+                if state[HAND + WILD_CANTOR_ID] > 0:
+                    for cost in (G, R):
+                        if state[POOL + cost] > 0:
+                            child = state.copy()
+                            child[POOL + cost] -= 1
+                            cast_card(child, WILD_CANTOR_ID)
+                            child[ANY_MANA_SOURCE] += 1
+                            stack, count = push(stack, count, child)
+                elif (state[POOL + G] > 0 or state[POOL + R] > 0) and\
+                    state[HAND + SUMMONERS_PACT_ID] > 0 and state[DECK_CANTOR] > 0:
+                    child = state.copy()
+                    search_cantor(child)
+                    stack, count = push(stack, count, child)
+        
+        else:
+            # try_generate_generic
+            if required[B] + generic <= get_pool_total(state):
+                return True
+            
+            if state[HAND + DARK_RITUAL_ID] > 0 and state[POOL + B] > 0:
+                child = state.copy()
+                cast_card(child, DARK_RITUAL_ID)
+                child[POOL + B] += 2
+                stack, count = push(stack, count, child)
+            
+            if state[HAND + CABAL_RITUAL_ID] > 0 and can_pay_cabal_ritual(state):
+                child = state.copy()
+                cast_card(child, CABAL_RITUAL_ID)
+                pay_cabal_ritual(child)
+                child[POOL + B] += 3
+                stack, count = push(stack, count, child)
+            
+            if state[ANY_MANA_SOURCE] > 0:
+                child = state.copy()
+                child[ANY_MANA_SOURCE] -= 1
+                child[POOL + B] += 1
+                stack, count = push(stack, count, child)
+            
+            # Chancellorを刻印する場合も含めて、Chrome Moxを色ごとに試す
+            if can_cast_sorcery and state[HAND + CHROME_MOX_ID] > 0:
+                for color in GENERIC_MOX_COLORS:
+                    child = state.copy()
+                    if try_cast_chrome_mox(child, color):
+                        child[POOL + color] += 1
+                        stack, count = push(stack, count, child)
+    
+    return False
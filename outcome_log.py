@@ -0,0 +1,179 @@
+import os
+import numpy as np
+from card_constants import *
+
+# ファイル形式
+MAGIC = b'NDOL'
+FORMAT_VERSION = 1
+HEADER_SIZE = 16  # MAGIC + バージョン + 予約領域
+
+# 1ゲーム分のレコード
+OUTCOME_DTYPE = np.dtype([
+    ('result', '?'),                          # 勝ったかどうか
+    ('mulligan_count', 'u1'),
+    ('storm_count', 'u1'),
+    ('loss_reason', 'u1'),                    # get_loss_reason_codeのコード
+    ('did_cast_necro', '?'),
+    ('did_cast_wind', '?'),
+    ('did_cast_valakut', '?'),
+    ('did_cast_tendril', '?'),
+    ('did_shuffle', '?'),
+    ('did_imprint_chancellor', '?'),
+    ('hand', 'u1', (len(ALL_CARDS),)),        # main phase開始時の手札（ALL_CARDSの順の枚数）
+])
+
+# 初期手札の土地
+LAND_CARDS = [GEMSTONE_MINE, UNDISCOVERED_PARADISE, VAULT_OF_WHISPERS]
+
+CARD_INDEX = {card: i for i, card in enumerate(ALL_CARDS)}
+
+class OutcomeLog:
+    """
+    1ゲームごとの結果をNumPyの構造化配列としてファイルに追記するクラス
+
+    DeckAnalyzerに渡すと各ゲームの結果を記録する。
+    レコードはbuffer_size件ごとにまとめて書き込み、load_outcomesでメモリマップとして読み込める。
+    """
+
+    def __init__(self, path: str, buffer_size: int = 4096):
+        """
+        Args:
+            path: 記録ファイルのパス（既存のファイルには追記する）
+            buffer_size: まとめて書き込むレコード数
+        """
+        self.path = path
+        self.buffer = np.zeros(buffer_size, dtype=OUTCOME_DTYPE)
+        self.count = 0  # bufferに溜まっているレコード数
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            with open(path, 'wb') as f:
+                f.write(get_header())
+        else:
+            check_header(path)
+
+    def append(self, game, result: bool) -> None:
+        """
+        終了したゲームの結果を追加する
+
+        Args:
+            game: ゲームを実行したGameState
+            result: ゲームの勝敗結果
+        """
+        row = self.buffer[self.count]
+        row['result'] = result
+        row['mulligan_count'] = game.mulligan_count
+        row['storm_count'] = min(game.storm_count, 255)
+        row['loss_reason'] = get_loss_reason_code(game.loss_reason)
+        row['did_cast_necro'] = game.did_cast_necro
+        row['did_cast_wind'] = game.did_cast_wind
+        row['did_cast_valakut'] = game.did_cast_valakut
+        row['did_cast_tendril'] = game.did_cast_tendril
+        row['did_shuffle'] = game.did_shuffle
+        row['did_imprint_chancellor'] = game.did_imprint_chancellor
+        hand = row['hand']
+        hand[:] = 0
+        for card in game.opening_hand:
+            hand[CARD_INDEX[card]] += 1
+        self.count += 1
+        if self.count == len(self.buffer):
+            self.flush()
+
+    def flush(self) -> None:
+        if self.count > 0:
+            with open(self.path, 'ab') as f:
+                self.buffer[:self.count].tofile(f)
+            self.count = 0
+
+    def close(self) -> None:
+        self.flush()
+
+def get_header() -> bytes:
+    return (MAGIC + bytes([FORMAT_VERSION])).ljust(HEADER_SIZE, b'\0')
+
+def check_header(path: str) -> None:
+    with open(path, 'rb') as f:
+        if f.read(HEADER_SIZE) != get_header():
+            raise ValueError(f"{path} is not an outcome log file (version {FORMAT_VERSION})")
+
+def load_outcomes(path: str) -> np.ndarray:
+    """
+    記録ファイルを読み取り専用のメモリマップとして開く
+
+    Args:
+        path: 記録ファイルのパス
+
+    Returns:
+        OUTCOME_DTYPEの構造化配列
+    """
+    check_header(path)
+    count = (os.path.getsize(path) - HEADER_SIZE) // OUTCOME_DTYPE.itemsize
+    if count == 0:
+        return np.zeros(0, dtype=OUTCOME_DTYPE)
+    return np.memmap(path, dtype=OUTCOME_DTYPE, mode='r', offset=HEADER_SIZE, shape=(count,))
+
+def card_count(outcomes: np.ndarray, cards) -> np.ndarray:
+    """
+    各ゲームの初期手札に含まれる指定カードの枚数
+
+    Args:
+        outcomes: load_outcomesの配列
+        cards: カード名またはカード名のリスト
+
+    Returns:
+        ゲームごとの枚数の配列
+    """
+    if isinstance(cards, str):
+        cards = [cards]
+    indices = [CARD_INDEX[card] for card in cards]
+    return outcomes['hand'][:, indices].sum(axis=1)
+
+def land_count(outcomes: np.ndarray) -> np.ndarray:
+    return card_count(outcomes, LAND_CARDS)
+
+def win_rate_by(outcomes: np.ndarray, keys: np.ndarray) -> dict:
+    """
+    キーの値ごとのゲーム数、勝利数、勝率を集計する
+
+    Args:
+        outcomes: load_outcomesの配列
+        keys: ゲームごとの0以上の整数キー（land_count(outcomes)やoutcomes['mulligan_count']など）
+
+    Returns:
+        {キー: {'games': ゲーム数, 'wins': 勝利数, 'win_rate': 勝率(%)}} の辞書
+    """
+    keys = np.asarray(keys, dtype=np.int64)
+    games = np.bincount(keys)
+    wins = np.bincount(keys, weights=outcomes['result'], minlength=len(games)).astype(np.int64)
+    stats = {}
+    for key in np.nonzero(games)[0]:
+        stats[int(key)] = {
+            'games': int(games[key]),
+            'wins': int(wins[key]),
+            'win_rate': wins[key] / games[key] * 100
+        }
+    return stats
+
+def storm_count_distribution(outcomes: np.ndarray, mask: np.ndarray = None) -> np.ndarray:
+    """
+    ストーム数ごとのゲーム数
+
+    Args:
+        outcomes: load_outcomesの配列
+        mask: 集計するゲームを選ぶ真偽値の配列（outcomes['result']など）
+
+    Returns:
+        インデックスがストーム数の配列
+    """
+    storm_counts = outcomes['storm_count']
+    if mask is not None:
+        storm_counts = storm_counts[mask]
+    return np.bincount(storm_counts, minlength=256)[:int(storm_counts.max(initial=0)) + 1]
+
+def loss_reason_counts(outcomes: np.ndarray) -> dict:
+    """
+    loss_reasonごとの敗北数
+
+    Returns:
+        {loss_reason: 敗北数} の辞書
+    """
+    counts = np.bincount(outcomes['loss_reason'][~outcomes['result']], minlength=256)
+    return {get_loss_reason_from_code(code): int(counts[code]) for code in np.nonzero(counts)[0]}
@@ -3,6 +3,7 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
 import os
+from result_writer import read_results
 
 # imgsフォルダが存在しない場合は作成
 if not os.path.exists('imgs'):
@@ -19,16 +20,16 @@ def plot_mulligan_stats():
         print(f"Warning: {csv_path} not found. Skipping mulligan stats plot.")
         return
     
-    # CSVファイルを読み込む
-    df = pd.read_csv(csv_path)
-    
-    # 最も勝率の高いデッキを特定
-    df = df.sort_values('win_rate', ascending=False)
+    # CSVファイルを読み込む（シミュレーション実行中なら終わったパターンだけ）
+    df = pd.DataFrame(read_results(csv_path))
     
     if df.empty:
         print("Error: No data found in CSV file")
         return
     
+    # 最も勝率の高いデッキを特定
+    df = df.sort_values('win_rate', ascending=False)
+    
     # 最も勝率の高い行を使用
     deck_data = df.iloc[0:1]
     
@@ -117,11 +118,15 @@ def plot_draw_count_analysis():
         print(f"Warning: {csv_path} not found. Skipping draw count analysis plot.")
         return
     
-    # CSVファイルを読み込む
-    df = pd.read_csv(csv_path)
+    # CSVファイルを読み込む（シミュレーション実行中なら終わったパターンだけ）
+    df = pd.DataFrame(read_results(csv_path))
+    
+    if df.empty:
+        print("Error: No data found in CSV file")
+        return
     
     # デッキ名を取得
-    if 'deck_name' in df.columns and not df.empty:
+    if 'deck_name' in df.columns:
         deck_name = df['deck_name'].iloc[0]
     else:
         deck_name = "Best Deck (GM4_UP0_WC0_CM4_BW4_VA3)"
@@ -0,0 +1,29 @@
+import numpy as np
+from card_constants import *
+
+# 手札にどちらもなければmain phaseの最初でNecroを唱えられずに失敗するカード
+KEY_CARDS = [NECRODOMINANCE, BESEECH_MIRROR]
+# 1度に判定するゲーム数
+DEFAULT_PREFILTER_BLOCK_SIZE = 4096
+
+def get_key_card_mask(deck: list[str]) -> np.ndarray:
+    """deckの各位置のカードがKEY_CARDSかどうか"""
+    return np.array([card in KEY_CARDS for card in deck], dtype=bool)
+
+def find_first_playable_hands(key_card_mask: np.ndarray, permutations: np.ndarray, attempt_count: int, hand_size: int = 7) -> np.ndarray:
+    """
+    ゲームごとに、KEY_CARDSを含む最初の手札のマリガン回数を求める
+    
+    Args:
+        key_card_mask: get_key_card_maskの結果
+        permutations: 並べ替えの配列（ゲーム数 * attempt_count, デッキ枚数）。ゲームiのm回目の手札はi * attempt_count + m行目の先頭hand_size枚
+        attempt_count: 1ゲームで引く手札の最大数（最大マリガン回数 + 1）
+        hand_size: 手札の枚数
+    
+    Returns:
+        ゲームごとのマリガン回数の配列（どの手札にもなければ-1）
+    """
+    has_key_card = key_card_mask[permutations[:, :hand_size]].any(axis=1).reshape(-1, attempt_count)
+    first_attempts = has_key_card.argmax(axis=1)
+    first_attempts[~has_key_card.any(axis=1)] = -1
+    return first_attempts
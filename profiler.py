@@ -0,0 +1,139 @@
+import os
+import sys
+import time
+import pstats
+import cProfile
+import threading
+from collections import defaultdict
+
+# 要約に表示するこのリポジトリのモジュール
+PROFILE_MODULES = ['game_state', 'mana_generation_state', 'mana_pool', 'mana_sources', 'undo_journal', 'deck_analyzer', 'simulation_tally']
+DEFAULT_TOP_N = 30
+# スタックをサンプリングする間隔（秒）
+DEFAULT_SAMPLE_INTERVAL = 0.001
+
+def get_module_name(filename: str) -> str:
+    return os.path.splitext(os.path.basename(filename))[0]
+
+class StackSampler:
+    """
+    別スレッドから対象スレッドのスタックを一定間隔で記録するサンプリングプロファイラ
+    
+    記録したスタックはflamegraph.plなどが読めるcollapsed形式（"a;b;c 回数"）で書き出せる。
+    """
+    
+    def __init__(self, interval: float = DEFAULT_SAMPLE_INTERVAL, thread_id: int = None):
+        """
+        Args:
+            interval: サンプリング間隔（秒）
+            thread_id: 対象スレッドのID（Noneなら呼び出したスレッド）
+        """
+        self.interval = interval
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        # collapsed形式のスタックごとのサンプル数
+        self.stacks = defaultdict(int)
+        self.stop_event = threading.Event()
+        self.thread = None
+    
+    def sample(self) -> None:
+        frame = sys._current_frames().get(self.thread_id)
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f"{get_module_name(code.co_filename)}:{code.co_name}")
+            frame = frame.f_back
+        if names:
+            self.stacks[';'.join(reversed(names))] += 1
+    
+    def run(self) -> None:
+        while not self.stop_event.wait(self.interval):
+            self.sample()
+    
+    def start(self) -> None:
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+    
+    def stop(self) -> None:
+        self.stop_event.set()
+        self.thread.join()
+    
+    def write_collapsed(self, path: str) -> None:
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in sorted(self.stacks.items()):
+                f.write(f"{stack} {count}\n")
+
+def format_summary(stats: pstats.Stats, top_n: int = DEFAULT_TOP_N, modules: list[str] = PROFILE_MODULES) -> str:
+    """
+    このリポジトリのモジュールの関数だけを自己時間の順に並べた要約を作る
+    
+    Args:
+        stats: cProfileの結果
+        top_n: 表示する関数の数
+        modules: 対象のモジュール名
+    
+    Returns:
+        要約の文字列
+    """
+    total_time = stats.total_tt
+    module_times = defaultdict(float)
+    functions = []
+    for (filename, line, function_name), (_, call_count, self_time, cumulative_time, _) in stats.stats.items():
+        module = get_module_name(filename)
+        if module not in modules:
+            continue
+        module_times[module] += self_time
+        functions.append((self_time, cumulative_time, call_count, f"{module}:{function_name}:{line}"))
+    functions.sort(reverse=True)
+    
+    lines = [f"Total time: {total_time:.3f}s", "", "Self time by module:"]
+    for module, module_time in sorted(module_times.items(), key=lambda item: item[1], reverse=True):
+        lines.append(f"  {module:<24} {module_time:8.3f}s ({module_time / total_time * 100:5.1f}%)")
+    lines.append("")
+    lines.append(f"Top {top_n} functions by self time:")
+    lines.append(f"  {'self(s)':>8} {'cum(s)':>8} {'calls':>10}  function")
+    for self_time, cumulative_time, call_count, name in functions[:top_n]:
+        lines.append(f"  {self_time:8.3f} {cumulative_time:8.3f} {call_count:10d}  {name}")
+    return '\n'.join(lines)
+
+def profile_call(func, output_base: str, top_n: int = DEFAULT_TOP_N, sample_interval: float = DEFAULT_SAMPLE_INTERVAL):
+    """
+    funcをcProfileとStackSamplerで計測しながら実行する
+    
+    <output_base>.prof（pstats/snakeviz用）、<output_base>.collapsed（flamegraph用）、
+    <output_base>_summary.txt（要約）を書き出し、要約を表示する。
+    
+    Args:
+        func: 引数なしで呼び出す関数
+        output_base: 出力ファイルのパス（拡張子なし）
+        top_n: 要約に表示する関数の数
+        sample_interval: スタックをサンプリングする間隔（秒）
+    
+    Returns:
+        funcの戻り値
+    """
+    folder_path = os.path.dirname(output_base)
+    if folder_path and not os.path.exists(folder_path):
+        os.makedirs(folder_path)
+    
+    profile = cProfile.Profile()
+    sampler = StackSampler(sample_interval)
+    sampler.start()
+    start_time = time.perf_counter()
+    profile.enable()
+    try:
+        result = func()
+    finally:
+        profile.disable()
+        sampler.stop()
+    elapsed_time = time.perf_counter() - start_time
+    
+    profile.dump_stats(f"{output_base}.prof")
+    sampler.write_collapsed(f"{output_base}.collapsed")
+    summary = format_summary(pstats.Stats(profile), top_n)
+    summary = f"Wall time: {elapsed_time:.3f}s\n{summary}"
+    with open(f"{output_base}_summary.txt", 'w', encoding='utf-8') as f:
+        f.write(summary + '\n')
+    
+    print(f"\n{summary}")
+    print(f"\nProfile saved to {output_base}.prof, {output_base}.collapsed and {output_base}_summary.txt")
+    return result
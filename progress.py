@@ -0,0 +1,146 @@
+import sys
+import math
+import time
+
+# 何ゲームごとに進捗を表示するか
+DEFAULT_CHECK_INTERVAL = 10000
+# 勝率の信頼区間のz値（95%）
+CONFIDENCE_Z = 1.96
+
+def format_duration(seconds: float) -> str:
+    seconds = int(seconds)
+    hours, remainder = divmod(seconds, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    if hours > 0:
+        return f"{hours}h{minutes:02d}m{seconds:02d}s"
+    if minutes > 0:
+        return f"{minutes}m{seconds:02d}s"
+    return f"{seconds}s"
+
+def get_confidence_interval(wins: int, games: int) -> tuple:
+    """
+    勝率のWilsonスコア信頼区間（95%）
+    
+    Returns:
+        (下限, 上限) の勝率(%)
+    """
+    if games == 0:
+        return 0.0, 100.0
+    p = wins / games
+    denominator = 1 + CONFIDENCE_Z ** 2 / games
+    center = (p + CONFIDENCE_Z ** 2 / (2 * games)) / denominator
+    margin = CONFIDENCE_Z * math.sqrt(p * (1 - p) / games + CONFIDENCE_Z ** 2 / (4 * games ** 2)) / denominator
+    return (center - margin) * 100, (center + margin) * 100
+
+class ProgressReporter:
+    """
+    シミュレーションの進捗（ゲーム数/秒、勝率と信頼区間、ETA）を表示するクラス
+    
+    DeckAnalyzerに渡すと、ゲームのループが開始時にbeginを呼び、check_intervalゲームごとにupdateを呼ぶ。
+    run_test_patternsはstart_experimentとstart_patternで実験全体とパターンのゲーム数を知らせる。
+    出力先はstderrか、1行ずつ追記するステータスファイル（tail -fで見られる）。
+    """
+    
+    def __init__(self, check_interval: int = DEFAULT_CHECK_INTERVAL, status_path: str = None, stream=None):
+        """
+        Args:
+            check_interval: 何ゲームごとに進捗を表示するか
+            status_path: 進捗を追記するファイルのパス（Noneならstreamに出力する）
+            stream: 出力先（Noneならsys.stderr）
+        """
+        self.check_interval = check_interval
+        self.status_path = status_path
+        self.stream = stream
+        self.experiment_name = None
+        self.pattern_count = 0
+        self.finished_pattern_count = 0
+        self.finished_pattern_seconds = 0.0
+        # 次にupdateを呼ぶまでのゲーム数（ゲームのループが減らす）
+        self.games_until_update = check_interval
+        self.start_pattern(None)
+    
+    def start_experiment(self, name: str, pattern_count: int) -> None:
+        """
+        複数パターンからなる実験の開始を知らせる
+        
+        Args:
+            name: 実験名（結果のファイル名）
+            pattern_count: パターン数
+        """
+        self.experiment_name = name
+        self.pattern_count = pattern_count
+        self.finished_pattern_count = 0
+        self.finished_pattern_seconds = 0.0
+    
+    def start_pattern(self, name: str, target_games: int = None) -> None:
+        """
+        パターンの開始を知らせる
+        
+        Args:
+            name: パターン名
+            target_games: このパターンで目標とするゲーム数（Noneなら不明）
+        """
+        self.pattern_name = name
+        self.target_games = target_games
+        self.pattern_start_time = time.perf_counter()
+        self.games_until_update = self.check_interval
+        # 最初のbeginで、キャッシュなどから引き継いだゲーム数を記録する
+        self.start_games = None
+    
+    def begin(self, tally) -> None:
+        """ゲームのループの開始時に呼ばれる"""
+        # start_patternが呼ばれていなければ、ループごとに別のパターンとみなす
+        if self.start_games is None or self.pattern_name is None:
+            self.start_games = tally.total_games
+            self.pattern_start_time = time.perf_counter()
+    
+    def finish_pattern(self) -> None:
+        self.finished_pattern_count += 1
+        self.finished_pattern_seconds += time.perf_counter() - self.pattern_start_time
+    
+    def update(self, tally) -> None:
+        """
+        現在の集計値から進捗を表示する
+        
+        Args:
+            tally: 実行中のパターンのSimulationTally
+        """
+        self.games_until_update = self.check_interval
+        games = tally.total_games
+        wins = tally.total_wins
+        elapsed = time.perf_counter() - self.pattern_start_time
+        games_per_second = (games - self.start_games) / elapsed if elapsed > 0 else 0.0
+        lower, upper = get_confidence_interval(wins, games)
+        
+        parts = []
+        if self.experiment_name is not None:
+            parts.append(f"[{self.experiment_name} {self.finished_pattern_count + 1}/{self.pattern_count}]")
+        if self.pattern_name is not None:
+            parts.append(f"{self.pattern_name}:")
+        if self.target_games:
+            parts.append(f"{games}/{self.target_games} games ({games / self.target_games * 100:.1f}%),")
+        else:
+            parts.append(f"{games} games,")
+        parts.append(f"{games_per_second:.0f} games/s,")
+        parts.append(f"win rate {wins / games * 100:.2f}% (95% CI {lower:.2f}-{upper:.2f})")
+        
+        if self.target_games and games_per_second > 0:
+            pattern_eta = max(self.target_games - games, 0) / games_per_second
+            eta = f"ETA {format_duration(pattern_eta)}"
+            remaining_patterns = self.pattern_count - self.finished_pattern_count - 1
+            if self.experiment_name is not None and remaining_patterns > 0:
+                # 残りのパターンは今のパターンと同じくらいかかるとみなす
+                seconds_per_pattern = (self.finished_pattern_seconds + elapsed + pattern_eta) / (self.finished_pattern_count + 1)
+                eta += f" (experiment {format_duration(pattern_eta + remaining_patterns * seconds_per_pattern)})"
+            parts.append(eta)
+        
+        self.write(' '.join(parts))
+    
+    def write(self, line: str) -> None:
+        if self.status_path is not None:
+            with open(self.status_path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+        else:
+            stream = self.stream if self.stream is not None else sys.stderr
+            stream.write(line + '\n')
+            stream.flush()
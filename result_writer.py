@@ -0,0 +1,148 @@
+import os
+import csv
+from card_constants import *
+from simulation_tally import MAX_MULLIGAN_COUNT, DETAILED_LOSS_REASON_FIELDS, SIMPLIFIED_LOSS_REASON_FIELDS
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+# run_test_patternsの結果の列と型（この順に並ぶ）
+RESULT_SCHEMA = {
+    'pattern_name': str,
+    'initial_hand': str,
+    'bottom_list': str,
+    'summoners_pact_strategy': str,
+    'draw_count': int,
+    'total_games': int,
+    'win_rate': float,
+    'cast_necro_rate': float,
+    'total_cast_necro': int,
+    'cast_necro_count': int,
+    'necro_resolve_count': int,
+    'necro_countered_count': int,
+    'necro_resolve_rate': float,
+    'win_after_necro_resolve_rate': float,
+    'total_wins': int,
+    'total_losses': int,
+    'wins': int,
+    'losses': int,
+    'failed_necro_count': int,
+}
+for reason in SIMPLIFIED_LOSS_REASON_FIELDS + DETAILED_LOSS_REASON_FIELDS:
+    RESULT_SCHEMA[reason] = int
+for prefix, field_type in [('wins_mull', int), ('losses_mull', int), ('cast_necro_mull', int), ('win_rate_mull', float)]:
+    for m in range(MAX_MULLIGAN_COUNT + 1):
+        RESULT_SCHEMA[f'{prefix}{m}'] = field_type
+
+ARROW_TYPES = {str: 'string', int: 'int64', float: 'float64'}
+
+def is_parquet_available() -> bool:
+    return pa is not None
+
+class StreamingResultWriter:
+    """
+    パターンの結果を1行ずつファイルに追記するクラス
+    
+    列は最初に宣言したschemaで固定し、1行書くたびにflushするので、
+    実行中でもread_resultsでそれまでに終わったパターンの結果を読める。
+    pyarrowがインストールされていれば同じ行をParquetファイルにも書く（Parquetはclose後に読める）。
+    withで使うと、例外で止まってもcloseする。
+    """
+    
+    def __init__(self, filename: str, schema: dict = RESULT_SCHEMA, folder_path: str = 'results', parquet: bool = None):
+        """
+        Args:
+            filename: 保存するファイル名（拡張子なし）
+            schema: 列名と型（str, int, float）の辞書
+            folder_path: 保存先のフォルダパス
+            parquet: Parquetファイルも書くかどうか（Noneならpyarrowがあれば書く）
+        """
+        if not os.path.exists(folder_path):
+            os.makedirs(folder_path)
+        if parquet is None:
+            parquet = is_parquet_available()
+        elif parquet and not is_parquet_available():
+            raise ImportError("ERROR: pyarrow is required for Parquet output")
+        self.schema = schema
+        self.path = os.path.join(folder_path, f"{filename}.csv")
+        self.file = open(self.path, 'w', newline='')
+        self.writer = csv.DictWriter(self.file, fieldnames=list(schema.keys()))
+        self.writer.writeheader()
+        self.file.flush()
+        self.parquet_writer = None
+        if parquet:
+            self.parquet_path = os.path.join(folder_path, f"{filename}.parquet")
+            self.arrow_schema = pa.schema([(name, ARROW_TYPES[field_type]) for name, field_type in schema.items()])
+            self.parquet_writer = pq.ParquetWriter(self.parquet_path, self.arrow_schema)
+    
+    def write(self, result: dict) -> None:
+        """
+        1パターンの結果を追記する（schemaにない列があればValueError）
+        
+        Args:
+            result: 結果の辞書（schemaの列のうち、ないものは空欄になる）
+        """
+        unknown_fields = [key for key in result if key not in self.schema]
+        if unknown_fields:
+            raise ValueError(f"ERROR: fields not in the result schema: {unknown_fields}")
+        self.writer.writerow(result)
+        self.file.flush()
+        if self.parquet_writer is not None:
+            columns = {}
+            for name, field_type in self.schema.items():
+                value = result.get(name)
+                columns[name] = [None if value is None else field_type(value)]
+            self.parquet_writer.write_table(pa.table(columns, schema=self.arrow_schema))
+    
+    def close(self) -> None:
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        if self.parquet_writer is not None:
+            self.parquet_writer.close()
+            self.parquet_writer = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        # 途中のパターンで止まっても、それまでの結果を読めるようにParquetのフッターを書いて閉じる
+        self.close()
+
+def read_results(path: str, schema: dict = RESULT_SCHEMA) -> list[dict]:
+    """
+    結果のCSVファイルを読む（書き込み中のファイルでもよい）
+    
+    最後の行が途中までしか書かれていない場合は無視する。
+    schemaにある列は型を変換し、空欄はNoneにする。
+    
+    Args:
+        path: CSVファイルのパス
+        schema: 列名と型の辞書
+    
+    Returns:
+        結果の辞書のリスト
+    """
+    with open(path, 'r', newline='') as f:
+        text = f.read()
+    # 改行で終わっていない最後の行は書き込み途中
+    if not text.endswith('\n'):
+        text = text[:text.rfind('\n') + 1]
+    results = []
+    for row in csv.DictReader(text.splitlines()):
+        result = {}
+        for key, value in row.items():
+            field_type = schema.get(key)
+            if value == '' and field_type is not None:
+                result[key] = None
+            elif field_type is int:
+                result[key] = int(float(value))
+            elif field_type is float:
+                result[key] = float(value)
+            else:
+                result[key] = value
+        results.append(result)
+    return results
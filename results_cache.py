@@ -0,0 +1,82 @@
+import os
+import json
+import sqlite3
+import hashlib
+from collections import Counter
+from game_state import ENGINE_VERSION, SummonersPactStrategy
+from simulation_tally import SimulationTally
+
+DEFAULT_CACHE_PATH = os.path.join('results', 'cache.sqlite')
+
+def get_cache_key(deck: list[str], initial_hand: list[str] = [], bottom_list: list[str] = [], draw_count: int = 19,
+                  summoners_pact_strategy: SummonersPactStrategy = SummonersPactStrategy.NEVER_CAST,
+                  opponent_has_forces: bool = False, mulligan_until_necro: bool = True) -> str:
+    """
+    シミュレーションの条件からキャッシュのキーを作る
+    
+    デッキはカードの枚数だけを使うので、並び順が違っても同じキーになる。
+    初期手札とbottom_listは並び順も含める。
+    
+    Returns:
+        条件のSHA-256ハッシュ（16進数）
+    """
+    scenario = {
+        'engine_version': ENGINE_VERSION,
+        'card_counts': sorted(Counter(deck).items()),
+        'initial_hand': list(initial_hand),
+        'bottom_list': list(bottom_list),
+        'draw_count': draw_count,
+        'summoners_pact_strategy': summoners_pact_strategy.name,
+        'opponent_has_forces': opponent_has_forces,
+        'mulligan_until_necro': mulligan_until_necro
+    }
+    return hashlib.sha256(json.dumps(scenario, sort_keys=True).encode('utf-8')).hexdigest()
+
+class ResultsCache:
+    """
+    シミュレーション条件のハッシュをキーにSimulationTallyを保存するSQLiteのキャッシュ
+    
+    同じ条件のシミュレーションは保存された集計値から結果を作り、
+    より多いシミュレーション回数が指定された場合は足りないゲーム数だけ実行してmergeする。
+    """
+    
+    def __init__(self, path: str = DEFAULT_CACHE_PATH):
+        """
+        Args:
+            path: SQLiteファイルのパス
+        """
+        folder_path = os.path.dirname(path)
+        if folder_path and not os.path.exists(folder_path):
+            os.makedirs(folder_path)
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS tallies (key TEXT PRIMARY KEY, total_games INTEGER NOT NULL, tally BLOB NOT NULL)"
+        )
+        self.connection.commit()
+    
+    def get(self, key: str) -> SimulationTally:
+        """保存されている集計値（なければNone）"""
+        row = self.connection.execute("SELECT tally FROM tallies WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        return SimulationTally.from_bytes(row[0])
+    
+    def put(self, key: str, tally: SimulationTally) -> None:
+        """
+        集計値を保存する（保存されているものよりゲーム数が少ない場合は何もしない）
+        
+        Args:
+            key: get_cache_keyのキー
+            tally: 保存する集計値
+        """
+        self.connection.execute(
+            "INSERT INTO tallies (key, total_games, tally) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET total_games = excluded.total_games, tally = excluded.tally "
+            "WHERE excluded.total_games > tallies.total_games",
+            (key, tally.total_games, tally.to_bytes())
+        )
+        self.connection.commit()
+    
+    def close(self) -> None:
+        self.connection.close()
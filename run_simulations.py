@@ -2,16 +2,32 @@
 from game_state import *
 from deck_utils import get_filename_without_extension, create_deck, save_results_to_csv, DEFAULT_PRIORITY_FIELDS
 from deck_analyzer import DeckAnalyzer
+from checkpoint import SimulationCheckpoint, DEFAULT_CHECKPOINT_PATH, DEFAULT_CHECKPOINT_INTERVAL
+from results_cache import ResultsCache, get_cache_key, DEFAULT_CACHE_PATH
+from result_writer import StreamingResultWriter
+from progress import ProgressReporter, DEFAULT_CHECK_INTERVAL
+from instrumentation import Instrumentation
+from profiler import profile_call, DEFAULT_TOP_N
+from shuffle_provider import ShuffleProvider
+from hard_hand_corpus import HardHandCorpus, HardHandMiner, DEFAULT_CORPUS_PATH, DEFAULT_NODE_THRESHOLD
+import os
+import sys
 import time
 import datetime
 import itertools
+import argparse
+import inspect
+import shutil
+import tempfile
 
 # 定数
 BEST_DECK_PATH = 'decks/gemstone4_paradise0_cantor0_chrome4_wind4_valakut3.txt'
 DEFAULT_ITERATIONS = 1000000
 DEFAULT_INITIAL_ITERATIONS = 100000
+# プロファイルするときのシミュレーション回数
+DEFAULT_PROFILE_ITERATIONS = 1000
 
-def run_test_patterns(analyzer: DeckAnalyzer, pattern_list: list, filename: str, iterations: int = DEFAULT_ITERATIONS, sort_by_win_rate: bool = False):
+def run_test_patterns(analyzer: DeckAnalyzer, pattern_list: list, filename: str, iterations: int = DEFAULT_ITERATIONS, sort_by_win_rate: bool = False, top_up: bool = False):
     """
     テストパターンのリストに対してシミュレーションを実行する汎用関数
     
@@ -31,62 +47,100 @@ def run_test_patterns(analyzer: DeckAnalyzer, pattern_list: list, filename: str,
         filename: 結果を保存するCSVファイルの名前（拡張子なし）
         iterations: シミュレーション回数
         sort_by_win_rate: 結果をwin_rateでソートするかどうか（デフォルトはFalse）
+        top_up: Trueの場合、analyzer.cacheに保存された各パターンの集計値にiterations回を追加して結果を作り直す
         
     Returns:
         各パターンの結果のリスト
     """
-    results = []
+    if top_up and analyzer.cache is None:
+        raise ValueError("ERROR: top_up requires analyzer.cache to load previous results")
     
-    print(f"\nRunning {len(pattern_list)} test patterns with {iterations} iterations each")
+    results = []
     
-    for i, pattern in enumerate(pattern_list):
-        name = pattern.get('name', f'Pattern {i+1}')
-        deck = pattern.get('deck', [])
-        initial_hand = pattern.get('initial_hand', [])
-        bottom_list = pattern.get('bottom_list', [])
-        summoners_pact_strategy = pattern.get('summoners_pact_strategy', SummonersPactStrategy.NEVER_CAST)
-        draw_count = pattern.get('draw_count', 19)
-        opponent_has_forces = pattern.get('opponent_has_forces', False)
-        
-        print(f"\nRunning pattern: {name}")
-        print(f"Initial hand: {', '.join(initial_hand) if initial_hand else 'None'}")
-        print(f"Bottom list: {', '.join(bottom_list) if bottom_list else 'None'}")
-        print(f"Draw count: {draw_count}")
-        print(f"Opponent has forces: {opponent_has_forces}")
-        
-        # 初期手札が空の場合はrun_multiple_simulations_without_initial_handを使用
-        if not initial_hand:
-            stats = analyzer.run_multiple_simulations_without_initial_hand(
-                deck=deck, 
-                draw_count=draw_count, 
-                mulligan_until_necro=True, 
-                summoners_pact_strategy=summoners_pact_strategy, 
-                opponent_has_forces=opponent_has_forces, 
-                iterations=iterations
-            )
-        else:
-            # 初期手札が指定されている場合はrun_multiple_simulations_with_initial_handを使用
-            stats = analyzer.run_multiple_simulations_with_initial_hand(
-                deck=deck, 
-                initial_hand=initial_hand, 
-                bottom_list=bottom_list, 
-                draw_count=draw_count, 
-                summoners_pact_strategy=summoners_pact_strategy, 
-                iterations=iterations
-            )
-        
-        # 結果にパターン情報を追加（statsを直接変更）
-        stats['pattern_name'] = name
-        if initial_hand:  # 初期手札が空でない場合のみ追加
-            stats['initial_hand'] = ', '.join(initial_hand)
-        if bottom_list:  # ボトムリストが空でない場合のみ追加
-            stats['bottom_list'] = ', '.join(bottom_list)
-        stats['summoners_pact_strategy'] = summoners_pact_strategy
-        
-        # statsを使用
-        result = stats
-        
-        results.append(result)
+    if top_up:
+        print(f"\nAdding {iterations} iterations to each of {len(pattern_list)} test patterns")
+    else:
+        print(f"\nRunning {len(pattern_list)} test patterns with {iterations} iterations each")
+    
+    if analyzer.progress is not None:
+        analyzer.progress.start_experiment(filename, len(pattern_list))
+    # パターンごとの処理時間と回数
+    instrumentation_results = []
+    
+    # 終わったパターンから順に結果を追記する（実行中でも読める。途中で止まってもそこまでの結果を閉じて残す）
+    with StreamingResultWriter(filename) as writer:
+        for i, pattern in enumerate(pattern_list):
+            name = pattern.get('name', f'Pattern {i+1}')
+            deck = pattern.get('deck', [])
+            initial_hand = pattern.get('initial_hand', [])
+            bottom_list = pattern.get('bottom_list', [])
+            summoners_pact_strategy = pattern.get('summoners_pact_strategy', SummonersPactStrategy.NEVER_CAST)
+            draw_count = pattern.get('draw_count', 19)
+            opponent_has_forces = pattern.get('opponent_has_forces', False)
+            
+            print(f"\nRunning pattern: {name}")
+            print(f"Initial hand: {', '.join(initial_hand) if initial_hand else 'None'}")
+            print(f"Bottom list: {', '.join(bottom_list) if bottom_list else 'None'}")
+            print(f"Draw count: {draw_count}")
+            print(f"Opponent has forces: {opponent_has_forces}")
+            
+            if analyzer.progress is not None:
+                analyzer.progress.start_pattern(name, iterations)
+            if analyzer.instrumentation is not None:
+                analyzer.instrumentation.reset()
+            
+            # 途中経過を保存する場合やキャッシュを使う場合は集計値を足しながら実行する
+            if analyzer.checkpoint is not None or analyzer.cache is not None:
+                stats = run_pattern_incrementally(
+                    analyzer=analyzer,
+                    checkpoint_key=analyzer.checkpoint.get_key(filename, name) if analyzer.checkpoint is not None else None,
+                    deck=deck,
+                    initial_hand=initial_hand,
+                    bottom_list=bottom_list,
+                    draw_count=draw_count,
+                    summoners_pact_strategy=summoners_pact_strategy,
+                    opponent_has_forces=opponent_has_forces,
+                    iterations=iterations,
+                    top_up=top_up
+                )
+            # 初期手札が空の場合はrun_multiple_simulations_without_initial_handを使用
+            elif not initial_hand:
+                stats = analyzer.run_multiple_simulations_without_initial_hand(
+                    deck=deck, 
+                    draw_count=draw_count, 
+                    mulligan_until_necro=True, 
+                    summoners_pact_strategy=summoners_pact_strategy, 
+                    opponent_has_forces=opponent_has_forces, 
+                    iterations=iterations
+                )
+            else:
+                # 初期手札が指定されている場合はrun_multiple_simulations_with_initial_handを使用
+                stats = analyzer.run_multiple_simulations_with_initial_hand(
+                    deck=deck, 
+                    initial_hand=initial_hand, 
+                    bottom_list=bottom_list, 
+                    draw_count=draw_count, 
+                    summoners_pact_strategy=summoners_pact_strategy, 
+                    iterations=iterations
+                )
+            
+            # 結果にパターン情報を追加（statsを直接変更）
+            stats['pattern_name'] = name
+            if initial_hand:  # 初期手札が空でない場合のみ追加
+                stats['initial_hand'] = ', '.join(initial_hand)
+            if bottom_list:  # ボトムリストが空でない場合のみ追加
+                stats['bottom_list'] = ', '.join(bottom_list)
+            stats['summoners_pact_strategy'] = summoners_pact_strategy
+            
+            # statsを使用
+            result = stats
+            
+            results.append(result)
+            writer.write(result)
+            if analyzer.progress is not None:
+                analyzer.progress.finish_pattern()
+            if analyzer.instrumentation is not None:
+                instrumentation_results.append({'pattern_name': name, **analyzer.instrumentation.get_results()})
     
     # sort_by_win_rateがTrueの場合のみ結果を勝率の昇順でソート
     if sort_by_win_rate:
@@ -97,11 +151,105 @@ def run_test_patterns(analyzer: DeckAnalyzer, pattern_list: list, filename: str,
     for result in results:
         print(f"Pattern: {result['pattern_name']}, Win Rate: {result['win_rate']:.2f}%")
     
-    # 結果をCSVに保存
+    # すべてのパターンが終わったら、ソートして不要な列を除いたCSVで置き換える
     save_results_to_csv(filename, results, DEFAULT_PRIORITY_FIELDS)
+    if instrumentation_results:
+        save_results_to_csv(f"{filename}_instrumentation", instrumentation_results, ['pattern_name', 'games'])
     
     return results
 
+def run_pattern_incrementally(analyzer: DeckAnalyzer, checkpoint_key: str, deck: list, initial_hand: list, bottom_list: list, draw_count: int, summoners_pact_strategy: SummonersPactStrategy, opponent_has_forces: bool, iterations: int, top_up: bool = False) -> dict:
+    """
+    analyzer.checkpointとanalyzer.cacheの集計値に足りないゲーム数だけ実行して1つのパターンの結果を作る関数
+    
+    checkpointが設定されていれば途中経過を保存しながらchunk_sizeゲームずつ実行し、
+    終了済みのパターンは保存された集計値から結果を作り、途中のパターンは保存されたゲーム数から続きを実行する。
+    cacheが設定されていれば、同じ条件で保存された集計値から始め、最後に集計値を保存する。
+    top_upがTrueの場合は、cacheに保存されていたゲーム数にiterations回を追加する。
+    その目標のゲーム数はcheckpointに記録し、再開したときはキャッシュから数え直さずに記録した目標を使う。
+    
+    Args:
+        analyzer: checkpointかcacheが設定されたDeckAnalyzerインスタンス
+        checkpoint_key: チェックポイント内のパターンのキー（checkpointがNoneならNone）
+        deck: デッキ
+        initial_hand: 初期手札（空リストの場合は初期手札なし）
+        bottom_list: デッキボトムに戻すカードのリスト
+        draw_count: ドロー数
+        summoners_pact_strategy: Summoner's Pactの戦略
+        opponent_has_forces: 相手がForceを持っているかどうか
+        iterations: シミュレーション回数
+        top_up: cacheの集計値に追加するゲーム数としてiterationsを扱うかどうか
+        
+    Returns:
+        シミュレーション結果の統計情報を含む辞書
+    """
+    checkpoint = analyzer.checkpoint
+    cache = analyzer.cache
+    tally = None
+    if checkpoint is not None:
+        tally = checkpoint.get_tally(checkpoint_key)
+    if cache is not None:
+        cache_key = get_cache_key(deck, initial_hand, bottom_list, draw_count, summoners_pact_strategy, opponent_has_forces)
+        cached_tally = cache.get(cache_key)
+        target = checkpoint.get_target(checkpoint_key) if top_up and checkpoint is not None else None
+        if target is not None:
+            # 再開したときは、終わったパターンの結果でキャッシュのゲーム数が増えているので、始めたときの目標を使う
+            iterations = target
+        elif top_up:
+            if cached_tally is not None:
+                iterations += cached_tally.total_games
+            else:
+                print(f"Warning: no cached games to top up, running {iterations} games from scratch")
+            if checkpoint is not None:
+                checkpoint.set_target(checkpoint_key, iterations)
+        # キャッシュの方がゲーム数が多ければそちらを使う
+        if cached_tally is not None and (tally is None or cached_tally.total_games > tally.total_games):
+            print(f"Using {cached_tally.total_games} cached games")
+            tally = cached_tally
+    
+    done = tally.total_games if tally is not None else 0
+    if analyzer.progress is not None:
+        analyzer.progress.target_games = iterations
+    if checkpoint is not None and checkpoint.is_completed(checkpoint_key) and done >= iterations:
+        print(f"Skipping completed pattern ({done} games)")
+        iterations = done
+    elif 0 < done < iterations:
+        print(f"Resuming from {done} games")
+    
+    chunk_size = checkpoint.chunk_size if checkpoint is not None else iterations
+    while done < iterations:
+        chunk_iterations = min(chunk_size, iterations - done)
+        if not initial_hand:
+            tally = analyzer.run_tally_without_initial_hand(
+                deck=deck,
+                draw_count=draw_count,
+                mulligan_until_necro=True,
+                summoners_pact_strategy=summoners_pact_strategy,
+                opponent_has_forces=opponent_has_forces,
+                iterations=chunk_iterations,
+                tally=tally
+            )
+        else:
+            tally = analyzer.run_tally_with_initial_hand(
+                deck=deck,
+                initial_hand=initial_hand,
+                bottom_list=bottom_list,
+                draw_count=draw_count,
+                summoners_pact_strategy=summoners_pact_strategy,
+                iterations=chunk_iterations,
+                tally=tally
+            )
+        done = tally.total_games
+        if checkpoint is not None:
+            checkpoint.update(checkpoint_key, tally)
+    
+    if checkpoint is not None:
+        checkpoint.complete(checkpoint_key, tally)
+    if cache is not None:
+        cache.put(cache_key, tally)
+    analyzer.print_statistics(tally)
+    return tally.finalize(analyzer.detailed_loss_reason)
+
 def create_custom_deck(card_counts: dict, base_deck_path: str = BEST_DECK_PATH) -> list:
     """
     指定されたカード枚数でデッキを作成する関数
@@ -616,7 +764,7 @@ def simulate_mulligan_strategies(analyzer: DeckAnalyzer, deck_path: str = BEST_D
     return results_2
 
 # custom deck simulations
-def simulate_custom_deck_variations(analyzer: DeckAnalyzer, card_counts_list: list, filename: str, opponent_has_forces: bool = False, iterations: int = DEFAULT_ITERATIONS):
+def simulate_custom_deck_variations(analyzer: DeckAnalyzer, card_counts_list: list, filename: str, opponent_has_forces: bool = False, iterations: int = DEFAULT_ITERATIONS, top_up: bool = False):
     """
     カード枚数の辞書のリストからデッキを作成し、シミュレーションを実行する汎用関数
     
@@ -626,6 +774,7 @@ def simulate_custom_deck_variations(analyzer: DeckAnalyzer, card_counts_list: li
         filename: 結果を保存するCSVファイルの名前（拡張子なし）
         iterations: シミュレーション回数
         opponent_has_forces: 相手がForceを持っているかどうか（デフォルトはFalse）
+        top_up: Trueの場合、前回の結果にiterations回を追加する（analyzer.cacheが必要）
         
     Returns:
         各デッキバリエーションの結果のリスト
@@ -671,7 +820,7 @@ def simulate_custom_deck_variations(analyzer: DeckAnalyzer, card_counts_list: li
             print(f"  {card}: {count}")
     
     # すべてのパターンを一度に実行
-    results = run_test_patterns(analyzer, all_patterns, filename, iterations, sort_by_win_rate=True)
+    results = run_test_patterns(analyzer, all_patterns, filename, iterations, sort_by_win_rate=True, top_up=top_up)
     
     # 各結果にカード枚数情報を追加
     for result in results:
@@ -1143,22 +1292,116 @@ def simulate_chancellor_variations_against_forces(analyzer: DeckAnalyzer, initia
         final_iterations=final_iterations
     )
 
-if __name__ == "__main__":
+# __main__で順に実行する実験
+EXPERIMENTS = [
+    simulate_summoners_pact_strategies,
+    simulate_auto_summoners_pact_strategy,
+    simulate_main_deck_variations,
+    simulate_draw_counts,
+    simulate_initial_hands,
+    simulate_mulligan_strategies,
+    simulate_chancellor_variations,
+    simulate_chancellor_variations_against_forces
+]
+
+def profile_experiment(experiment_name: str, iterations: int = DEFAULT_PROFILE_ITERATIONS, top_n: int = DEFAULT_TOP_N, output_folder: str = os.path.join('results', 'profile')):
+    """
+    実験を少ないシミュレーション回数でプロファイルする関数
+    
+    <output_folder>/<実験名>.prof、.collapsed、_summary.txtを書き出す。
+    本来の結果のCSVを上書きしないように、decksをコピーした一時ディレクトリで実行する。
+    
+    Args:
+        experiment_name: EXPERIMENTSの関数名
+        iterations: シミュレーション回数（2フェーズの実験では両方のフェーズの回数）
+        top_n: 要約に表示する関数の数
+        output_folder: プロファイルの保存先のフォルダパス
+        
+    Returns:
+        実験の結果
+    """
+    experiments = {experiment.__name__: experiment for experiment in EXPERIMENTS}
+    experiment = experiments[experiment_name]
+    parameters = inspect.signature(experiment).parameters
+    kwargs = {name: iterations for name in ['iterations', 'initial_iterations', 'final_iterations'] if name in parameters}
+    output_base = os.path.abspath(os.path.join(output_folder, experiment_name))
+    decks_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'decks')
+    
     analyzer = DeckAnalyzer()
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as work_dir:
+        shutil.copytree(decks_path, os.path.join(work_dir, 'decks'))
+        os.chdir(work_dir)
+        try:
+            return profile_call(lambda: experiment(analyzer, **kwargs), output_base, top_n)
+        finally:
+            os.chdir(cwd)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="すべてのシミュレーションを実行する")
+    parser.add_argument('--resume', action='store_true', help="チェックポイントから再開する（終了したパターンは飛ばす）")
+    parser.add_argument('--checkpoint', default=DEFAULT_CHECKPOINT_PATH, help="チェックポイントファイルのパス")
+    parser.add_argument('--checkpoint-interval', type=float, default=DEFAULT_CHECKPOINT_INTERVAL, help="チェックポイントを保存する間隔（秒）")
+    parser.add_argument('--cache', default=DEFAULT_CACHE_PATH, help="結果のキャッシュのパス")
+    parser.add_argument('--no-cache', action='store_true', help="結果のキャッシュを使わない")
+    parser.add_argument('--progress-interval', type=int, default=DEFAULT_CHECK_INTERVAL, help="何ゲームごとに進捗を表示するか（0なら表示しない）")
+    parser.add_argument('--progress-file', help="進捗を追記するファイルのパス（省略時は標準エラー出力）")
+    parser.add_argument('--instrument', action='store_true', help="処理ごとの時間と回数を集計して<結果のファイル名>_instrumentation.csvに保存する")
+    parser.add_argument('--mine-hard-hands', nargs='?', const=DEFAULT_CORPUS_PATH, metavar='CORPUS', help="探索が重いゲームをコーパスに記録する（ノード数を数えるため--instrumentも有効になる）")
+    parser.add_argument('--hard-node-threshold', type=int, default=DEFAULT_NODE_THRESHOLD, help="このノード数以上探索したゲームを記録する")
+    parser.add_argument('--hard-time-threshold-us', type=float, help="この時間(us)以上かかったゲームも記録する")
+    parser.add_argument('--batched-shuffle', action='store_true', help="NumPyでまとめて作った並べ替えでデッキをシャッフルする（--mine-hard-handsとは併用できない）")
+    parser.add_argument('--prefilter', action='store_true', help="NecroもBeseechもない手札をNumPyでまとめて判定する（--batched-shuffleも有効になる）")
+    parser.add_argument('--threads', type=int, default=1, help="ゲームを分けて実行するスレッド数（GILのないCPythonで速くなる。--instrumentと--mine-hard-handsとは併用できない）")
+    parser.add_argument('--processes', type=int, default=1, help="ゲームを分けて実行するプロセス数（デッキと並べ替えは共有メモリで渡す。--prefilter、--batch-main-phase、--threads、--instrument、--mine-hard-handsとは併用できない）")
+    parser.add_argument('--batch-main-phase', action='store_true', help="--prefilterに加えて、マナが足りずNecroを唱えられない手札もNumPyでまとめて判定する")
+    parser.add_argument('--profile', choices=[experiment.__name__ for experiment in EXPERIMENTS], help="指定した実験だけを少ない回数でプロファイルする")
+    parser.add_argument('--profile-iterations', type=int, default=DEFAULT_PROFILE_ITERATIONS, help="プロファイルするときのシミュレーション回数")
+    parser.add_argument('--profile-top', type=int, default=DEFAULT_TOP_N, help="プロファイルの要約に表示する関数の数")
+    args = parser.parse_args()
+    
+    if args.profile:
+        profile_experiment(args.profile, args.profile_iterations, args.profile_top)
+        sys.exit(0)
+    
+    if args.threads > 1 and getattr(sys, '_is_gil_enabled', lambda: True)():
+        print("Warning: GIL is enabled, so --threads does not run games in parallel")
+    
+    checkpoint = SimulationCheckpoint(args.checkpoint, interval=args.checkpoint_interval)
+    if args.resume:
+        if os.path.exists(args.checkpoint):
+            checkpoint.load()
+            print(f"チェックポイントから再開: {args.checkpoint} (終了済み {len(checkpoint.completed)} パターン)")
+        else:
+            print(f"Warning: checkpoint {args.checkpoint} not found, starting from scratch")
+    cache = None if args.no_cache else ResultsCache(args.cache)
+    progress = ProgressReporter(args.progress_interval, args.progress_file) if args.progress_interval > 0 else None
+    instrumentation = Instrumentation() if args.instrument or args.mine_hard_hands else None
+    miner = None
+    if args.mine_hard_hands:
+        corpus = HardHandCorpus(args.mine_hard_hands)
+        if os.path.exists(args.mine_hard_hands):
+            corpus.load()
+        miner = HardHandMiner(corpus, instrumentation, args.hard_node_threshold, args.hard_time_threshold_us)
+    shuffle_provider = ShuffleProvider() if args.batched_shuffle or args.prefilter or args.batch_main_phase else None
+    analyzer = DeckAnalyzer(recorder=miner, checkpoint=checkpoint, cache=cache, progress=progress, instrumentation=instrumentation,
+                            shuffle_provider=shuffle_provider, prefilter=args.prefilter, batch_main_phase=args.batch_main_phase,
+                            thread_count=args.threads, process_count=args.processes)
     
     print("シミュレーション開始: ", datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
     start_time = time.time()
     
     # シミュレーション関数を実行
     print("\n=== シミュレーション実行 ===")
-    simulate_summoners_pact_strategies(analyzer)
-    simulate_auto_summoners_pact_strategy(analyzer)
-    simulate_main_deck_variations(analyzer)
-    simulate_draw_counts(analyzer)
-    simulate_initial_hands(analyzer)
-    simulate_mulligan_strategies(analyzer)
-    simulate_chancellor_variations(analyzer)
-    simulate_chancellor_variations_against_forces(analyzer)
+    for experiment in EXPERIMENTS:
+        experiment(analyzer)
+    checkpoint.save()
+    analyzer.close()
+    if cache is not None:
+        cache.close()
+    if miner is not None:
+        miner.close()
+        print(f"重いゲームを{miner.recorded_count}件記録: {args.mine_hard_hands}")
 
     end_time = time.time()
     elapsed_time = end_time - start_time
@@ -0,0 +1,146 @@
+import numpy as np
+from multiprocessing import shared_memory
+from card_constants import *
+from game_state import SummonersPactStrategy
+
+# デッキの枚数（GameStateは60枚のデッキしか実行しない）
+DECK_SIZE = 60
+# シナリオの初期手札とbottom_listの最大枚数
+MAX_HAND_SIZE = 7
+# シナリオの設定の配列（int16）の列
+(DRAW_COUNT, SUMMONERS_PACT_STRATEGY, OPPONENT_HAS_FORCES, MULLIGAN_UNTIL_NECRO,
+ INITIAL_HAND_SIZE, BOTTOM_LIST_SIZE) = range(6)
+INITIAL_HAND = BOTTOM_LIST_SIZE + 1
+BOTTOM_LIST = INITIAL_HAND + MAX_HAND_SIZE
+DESCRIPTOR_SIZE = BOTTOM_LIST + MAX_HAND_SIZE
+
+def get_area_size(layout: tuple) -> tuple[int, int, int]:
+    """
+    共有メモリ内の配置を求める
+    
+    Args:
+        layout: (シナリオの数, 並べ替えの数)
+    
+    Returns:
+        (設定の配列のオフセット, 並べ替えの配列のオフセット, 全体のバイト数)
+    """
+    scenario_count, permutation_count = layout
+    # int16の設定の配列が2バイト境界から始まるように、デッキの配列の後を揃える
+    descriptors_offset = (scenario_count * DECK_SIZE + 1) // 2 * 2
+    permutations_offset = descriptors_offset + scenario_count * DESCRIPTOR_SIZE * 2
+    return descriptors_offset, permutations_offset, max(permutations_offset + permutation_count * DECK_SIZE, 1)
+
+class SharedScenarioArea:
+    """
+    ワーカープロセスが共有するシナリオの領域（multiprocessing.shared_memory）
+    
+    ALL_CARDSのインデックスにしたデッキ、シナリオの設定（初期手札、bottom_list、ドロー数など）、
+    ゲームごとに最初の手札を引くデッキの順（0..59の並べ替え）のブロックを1つの共有メモリに並べる。
+    ワーカーはnameとlayoutだけを受け取ってattachし、コピーせずにNumPyの配列として読むので、
+    タスクごとにデッキやパターンの辞書をpickleして送る必要がない。
+    """
+    
+    def __init__(self, shm: shared_memory.SharedMemory, layout: tuple, owner: bool):
+        """
+        Args:
+            shm: 共有メモリ
+            layout: (シナリオの数, 並べ替えの数)
+            owner: 共有メモリを作ったプロセスか（closeでunlinkする）
+        """
+        self.shm = shm
+        self.layout = layout
+        self.owner = owner
+        scenario_count, permutation_count = layout
+        descriptors_offset, permutations_offset, _ = get_area_size(layout)
+        self.decks = np.ndarray((scenario_count, DECK_SIZE), dtype=np.int8, buffer=shm.buf)
+        self.descriptors = np.ndarray((scenario_count, DESCRIPTOR_SIZE), dtype=np.int16, buffer=shm.buf, offset=descriptors_offset)
+        self.permutations = np.ndarray((permutation_count, DECK_SIZE), dtype=np.int8, buffer=shm.buf, offset=permutations_offset)
+    
+    @property
+    def name(self) -> str:
+        return self.shm.name
+    
+    @classmethod
+    def create(cls, scenarios: list[dict], permutation_count: int, seed: int = None) -> 'SharedScenarioArea':
+        """
+        シナリオと並べ替えのブロックを書き込んだ共有メモリを作る
+        
+        Args:
+            scenarios: run_test_patternsのパターンと同じ形式の辞書のリスト（'mulligan_until_necro'も指定できる）
+            permutation_count: 作る並べ替えの数（ゲーム数）
+            seed: 並べ替えを作るGeneratorのシード
+        
+        Returns:
+            作った領域（使い終わったらcloseする）
+        """
+        layout = (len(scenarios), permutation_count)
+        shm = shared_memory.SharedMemory(create=True, size=get_area_size(layout)[2])
+        area = cls(shm, layout, owner=True)
+        try:
+            for i, scenario in enumerate(scenarios):
+                area.write_scenario(i, scenario)
+            # 共有メモリの上で直接0..59を並べ替える
+            area.permutations[:] = np.arange(DECK_SIZE, dtype=np.int8)
+            np.random.default_rng(seed).permuted(area.permutations, axis=1, out=area.permutations)
+        except Exception:
+            area.close()
+            raise
+        return area
+    
+    @classmethod
+    def attach(cls, name: str, layout: tuple) -> 'SharedScenarioArea':
+        """ワーカーから既存の共有メモリにつなぐ"""
+        return cls(shared_memory.SharedMemory(name=name), layout, owner=False)
+    
+    def write_scenario(self, index: int, scenario: dict) -> None:
+        deck = scenario['deck']
+        initial_hand = scenario.get('initial_hand', [])
+        bottom_list = scenario.get('bottom_list', [])
+        if len(deck) != DECK_SIZE:
+            raise ValueError(f"ERROR: shared scenarios require {DECK_SIZE}-card decks, got {len(deck)} cards")
+        if len(initial_hand) > MAX_HAND_SIZE or len(bottom_list) > MAX_HAND_SIZE:
+            raise ValueError(f"ERROR: initial_hand and bottom_list must have at most {MAX_HAND_SIZE} cards")
+        self.decks[index] = [ALL_CARDS.index(card) for card in deck]
+        descriptor = self.descriptors[index]
+        descriptor[:] = -1
+        descriptor[DRAW_COUNT] = scenario.get('draw_count', 19)
+        descriptor[SUMMONERS_PACT_STRATEGY] = scenario.get('summoners_pact_strategy', SummonersPactStrategy.NEVER_CAST).value
+        descriptor[OPPONENT_HAS_FORCES] = scenario.get('opponent_has_forces', False)
+        descriptor[MULLIGAN_UNTIL_NECRO] = scenario.get('mulligan_until_necro', True)
+        descriptor[INITIAL_HAND_SIZE] = len(initial_hand)
+        descriptor[BOTTOM_LIST_SIZE] = len(bottom_list)
+        descriptor[INITIAL_HAND:INITIAL_HAND + len(initial_hand)] = [ALL_CARDS.index(card) for card in initial_hand]
+        descriptor[BOTTOM_LIST:BOTTOM_LIST + len(bottom_list)] = [ALL_CARDS.index(card) for card in bottom_list]
+    
+    def read_scenario(self, index: int) -> dict:
+        """
+        シナリオを読み出す
+        
+        Returns:
+            write_scenarioに渡したのと同じ形式の辞書（'mulligan_until_necro'を含む）
+        """
+        descriptor = self.descriptors[index].tolist()
+        initial_hand_size = descriptor[INITIAL_HAND_SIZE]
+        bottom_list_size = descriptor[BOTTOM_LIST_SIZE]
+        return {
+            'deck': [ALL_CARDS[code] for code in self.decks[index].tolist()],
+            'initial_hand': [ALL_CARDS[code] for code in descriptor[INITIAL_HAND:INITIAL_HAND + initial_hand_size]],
+            'bottom_list': [ALL_CARDS[code] for code in descriptor[BOTTOM_LIST:BOTTOM_LIST + bottom_list_size]],
+            'draw_count': descriptor[DRAW_COUNT],
+            'summoners_pact_strategy': SummonersPactStrategy(descriptor[SUMMONERS_PACT_STRATEGY]),
+            'opponent_has_forces': bool(descriptor[OPPONENT_HAS_FORCES]),
+            'mulligan_until_necro': bool(descriptor[MULLIGAN_UNTIL_NECRO])
+        }
+    
+    def close(self) -> None:
+        """共有メモリを閉じる（作ったプロセスなら削除する）。配列のビューを先に外しておく"""
+        self.decks = self.descriptors = self.permutations = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
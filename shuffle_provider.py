@@ -0,0 +1,59 @@
+import numpy as np
+
+# 1度に作る並べ替えの数
+DEFAULT_BLOCK_SIZE = 65536
+# 初めて使う長さの最初のブロックの並べ替えの数（使うたびに倍にしてDEFAULT_BLOCK_SIZEまで増やす）
+INITIAL_BLOCK_SIZE = 1024
+
+class ShuffleProvider:
+    """
+    NumPyのGeneratorでまとめて作った整数の並べ替えでリストをシャッフルするクラス
+    
+    リストの長さごとに0..n-1の並べ替えをblock_size行ずつGenerator.permutedで作っておき、
+    shuffleのたびに1行ずつ使う。random.shuffleのように1要素ごとに乱数を引かないので、
+    1ゲームあたりの乱数のコストはブロックを作るコストを行数で割ったものになる。
+    ゲーム中のシャッフルはデッキの枚数が毎回違うので、初めて使う長さは小さいブロックから始める。
+    """
+    
+    def __init__(self, seed: int = None, block_size: int = DEFAULT_BLOCK_SIZE):
+        """
+        Args:
+            seed: Generatorのシード
+            block_size: 1度に作る並べ替えの数
+        """
+        self.rng = np.random.default_rng(seed)
+        self.block_size = block_size
+        # 長さごとの並べ替えのブロックと、次に使う行
+        self.blocks = {}
+        self.positions = {}
+    
+    def create_block(self, length: int, count: int) -> np.ndarray:
+        """0..length-1の並べ替えをcount行作る"""
+        dtype = np.int8 if length <= 128 else np.int32
+        return self.rng.permuted(np.broadcast_to(np.arange(length, dtype=dtype), (count, length)), axis=1)
+    
+    def get_permutation(self, length: int) -> list[int]:
+        """
+        0..length-1の並べ替えを1つ返す
+        
+        Args:
+            length: 並べ替える要素の数
+        
+        Returns:
+            並べ替えのインデックスのリスト
+        """
+        block = self.blocks.get(length)
+        position = self.positions.get(length, 0)
+        if block is None or position == len(block):
+            count = INITIAL_BLOCK_SIZE if block is None else len(block) * 2
+            block = self.create_block(length, min(count, self.block_size))
+            self.blocks[length] = block
+            position = 0
+        self.positions[length] = position + 1
+        return block[position].tolist()
+    
+    def shuffle(self, cards: list) -> None:
+        """random.shuffleと同じようにリストをその場でシャッフルする"""
+        if len(cards) < 2:
+            return
+        cards[:] = [cards[i] for i in self.get_permutation(len(cards))]
@@ -0,0 +1,328 @@
+import struct
+from collections import defaultdict
+from card_constants import *
+
+# マリガン回数の最大値
+MAX_MULLIGAN_COUNT = 4
+
+# 結果コードごとのloss_reasonのコード（詳細・単純化）
+DETAILED_LOSS_REASON_TABLE = list(range(OUTCOME_CODE_COUNT))
+SIMPLIFIED_LOSS_REASON_TABLE = [get_simplified_loss_reason_code(code) for code in range(OUTCOME_CODE_COUNT)]
+FAILED_NECRO_CODE = LOSS_REASON_CODES[FALIED_NECRO]
+NECRO_COUNTERED_CODE = LOSS_REASON_CODES[FAILED_NECRO_COUNTERED]
+
+# 統計情報に欄を作るloss_reason
+DETAILED_LOSS_REASON_FIELDS = [
+    FALIED_NECRO, FAILED_NECRO_COUNTERED,
+    FAILED_CAST_BOTH_WITH_WIND_AND_VALAKUT, FAILED_CAST_BOTH_WITH_WIND_WITHOUT_VALAKUT,
+    FAILED_CAST_BOTH_WITHOUT_WIND_WITH_VALAKUT, FAILED_CAST_BOTH_WITHOUT_WIND_AND_VALAKUT,
+    CAST_VALAKUT_FAILED_WIND_WITH_WIND, CAST_VALAKUT_FAILED_WIND_WITHOUT_WIND,
+    CAST_WIND_FAILED_TENDRILS_WITH_BESEECH_OR_TENDRILS, CAST_WIND_FAILED_TENDRILS_WITHOUT_BESEECH_OR_TENDRILS
+]
+SIMPLIFIED_LOSS_REASON_FIELDS = [
+    FALIED_NECRO, FAILED_NECRO_COUNTERED,
+    FAILED_CAST_BOTH, CAST_VALAKUT_FAILED_WIND, CAST_WIND_FAILED_TENDRILS
+]
+
+# シリアライズ形式
+TALLY_FORMAT_VERSION = 1
+TALLY_HEADER = struct.Struct('<BBBH')  # バージョン, ドロー数, フラグ, 0でない集計値の数
+TALLY_ENTRY = struct.Struct('<BBQ')    # マリガン回数, 結果コード（255はNecroを唱えた回数）, 回数
+CAST_NECRO_ENTRY_CODE = 255
+FLAG_WITH_INITIAL_HAND = 1
+FLAG_MULLIGAN_UNTIL_NECRO = 2
+FLAG_OPPONENT_HAS_FORCES = 4
+
+class SimulationTally:
+    """
+    シミュレーションの生の集計値
+    
+    マリガン回数と結果コードごとのゲーム数と、マリガン回数ごとのNecroを唱えた回数だけを持つ。
+    別のプロセスやマシンで集計したものをmergeで足し合わせてからfinalizeすれば、
+    どのように分割して実行しても1回で実行した場合と同じ統計情報になる。
+    """
+    
+    def __init__(self, draw_count: int = 19, with_initial_hand: bool = False,
+                 mulligan_until_necro: bool = True, opponent_has_forces: bool = False):
+        """
+        Args:
+            draw_count: ドロー数
+            with_initial_hand: 初期手札を指定したシミュレーションか
+            mulligan_until_necro: Necroを唱えるまでマリガンするかどうか
+            opponent_has_forces: 相手がForceを持っているかどうか
+        """
+        self.draw_count = draw_count
+        self.with_initial_hand = with_initial_hand
+        self.mulligan_until_necro = mulligan_until_necro
+        self.opponent_has_forces = opponent_has_forces
+        # outcome_counts[マリガン回数][結果コード] = ゲーム数
+        self.outcome_counts = [[0] * OUTCOME_CODE_COUNT for _ in range(MAX_MULLIGAN_COUNT + 1)]
+        # マリガン回数ごとのNecroを唱えた回数
+        self.cast_necro_counts = [0] * (MAX_MULLIGAN_COUNT + 1)
+    
+    def add_game(self, mulligan_count: int, outcome_code: int, did_cast_necro: bool) -> None:
+        self.outcome_counts[mulligan_count][outcome_code] += 1
+        if did_cast_necro:
+            self.cast_necro_counts[mulligan_count] += 1
+    
+    @property
+    def total_games(self) -> int:
+        return sum(sum(counts) for counts in self.outcome_counts)
+    
+    @property
+    def total_wins(self) -> int:
+        return sum(counts[OUTCOME_WIN] for counts in self.outcome_counts)
+    
+    def get_settings(self) -> tuple:
+        return (self.draw_count, self.with_initial_hand, self.mulligan_until_necro, self.opponent_has_forces)
+    
+    def merge(self, other: 'SimulationTally') -> None:
+        """
+        別の集計値を足し合わせる
+        
+        Args:
+            other: 同じ設定で集計したSimulationTally
+        """
+        if self.get_settings() != other.get_settings():
+            raise ValueError(f"ERROR: cannot merge tallies with different settings: {self.get_settings()} and {other.get_settings()}")
+        for counts, other_counts in zip(self.outcome_counts, other.outcome_counts):
+            for code, count in enumerate(other_counts):
+                if count:
+                    counts[code] += count
+        for m, count in enumerate(other.cast_necro_counts):
+            self.cast_necro_counts[m] += count
+    
+    def copy(self) -> 'SimulationTally':
+        new_instance = SimulationTally(*self.get_settings())
+        new_instance.merge(self)
+        return new_instance
+    
+    def to_bytes(self) -> bytes:
+        """0でない集計値だけを書き出す"""
+        entries = []
+        for m, counts in enumerate(self.outcome_counts):
+            for code, count in enumerate(counts):
+                if count:
+                    entries.append(TALLY_ENTRY.pack(m, code, count))
+        for m, count in enumerate(self.cast_necro_counts):
+            if count:
+                entries.append(TALLY_ENTRY.pack(m, CAST_NECRO_ENTRY_CODE, count))
+        flags = 0
+        if self.with_initial_hand:
+            flags |= FLAG_WITH_INITIAL_HAND
+        if self.mulligan_until_necro:
+            flags |= FLAG_MULLIGAN_UNTIL_NECRO
+        if self.opponent_has_forces:
+            flags |= FLAG_OPPONENT_HAS_FORCES
+        return TALLY_HEADER.pack(TALLY_FORMAT_VERSION, self.draw_count, flags, len(entries)) + b''.join(entries)
+    
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'SimulationTally':
+        version, draw_count, flags, entry_count = TALLY_HEADER.unpack_from(data)
+        if version != TALLY_FORMAT_VERSION:
+            raise ValueError(f"ERROR: unsupported tally format version {version}")
+        tally = cls(draw_count, bool(flags & FLAG_WITH_INITIAL_HAND),
+                    bool(flags & FLAG_MULLIGAN_UNTIL_NECRO), bool(flags & FLAG_OPPONENT_HAS_FORCES))
+        for i in range(entry_count):
+            m, code, count = TALLY_ENTRY.unpack_from(data, TALLY_HEADER.size + i * TALLY_ENTRY.size)
+            if code == CAST_NECRO_ENTRY_CODE:
+                tally.cast_necro_counts[m] = count
+            else:
+                tally.outcome_counts[m][code] = count
+        return tally
+    
+    def get_counters(self, detailed_loss_reason: bool) -> tuple:
+        """
+        マリガン回数ごとの勝敗数などの集計値を作る
+        
+        Args:
+            detailed_loss_reason: 詳細なloss_reasonで集計するかどうか
+        
+        Returns:
+            (wins, losses, cast_necro_count, failed_necro_count, necro_countered_count, loss_reasons)
+        """
+        wins = defaultdict(int)
+        losses = defaultdict(int)
+        cast_necro_count = defaultdict(int)
+        failed_necro_count = 0
+        necro_countered_count = 0
+        # 詳細か単純化されたloss_reasonのコードごとの敗北数
+        loss_reason_table = DETAILED_LOSS_REASON_TABLE if detailed_loss_reason else SIMPLIFIED_LOSS_REASON_TABLE
+        loss_reason_counts = [0] * OUTCOME_CODE_COUNT
+        
+        for m, counts in enumerate(self.outcome_counts):
+            wins[m] = counts[OUTCOME_WIN]
+            cast_necro_count[m] = self.cast_necro_counts[m]
+            failed_necro_count += counts[FAILED_NECRO_CODE]
+            # Necroを唱えてから負けた回数
+            losses[m] = sum(counts) - counts[OUTCOME_WIN] - counts[FAILED_NECRO_CODE]
+            necro_countered_count += counts[NECRO_COUNTERED_CODE]
+            for code in range(1, OUTCOME_CODE_COUNT):
+                if counts[code] > 0:
+                    loss_reason_counts[loss_reason_table[code]] += counts[code]
+        
+        loss_reasons = defaultdict(int)
+        for code, count in enumerate(loss_reason_counts):
+            if count > 0:
+                loss_reasons[get_loss_reason_from_code(code)] = count
+        
+        return wins, losses, cast_necro_count, failed_necro_count, necro_countered_count, loss_reasons
+    
+    def calculate_statistics(self, detailed_loss_reason: bool) -> dict:
+        """
+        マリガン回数ごとの内訳を含むすべての統計情報を計算する
+        
+        Args:
+            detailed_loss_reason: 詳細なloss_reasonで集計するかどうか
+        
+        Returns:
+            統計情報を含む辞書
+        """
+        wins, losses, cast_necro_count, failed_necro_count, _, loss_reasons = self.get_counters(detailed_loss_reason)
+        iterations = self.total_games
+        total_wins = sum(wins.values())
+        total_losses = sum(losses.values())
+        total_cast_necro = sum(cast_necro_count.values())
+        
+        # 基本的な統計情報
+        stats = {
+            'draw_count': self.draw_count,
+            'total_games': iterations,
+            'total_wins': total_wins,
+            'win_rate': total_wins/iterations*100,
+            'total_losses': total_losses,
+            'failed_necro_count': failed_necro_count,
+            'total_cast_necro': total_cast_necro,
+            'cast_necro_rate': total_cast_necro/iterations*100
+        }
+        
+        # 各loss_reasonごとに欄を作成
+        for reason in DETAILED_LOSS_REASON_FIELDS if detailed_loss_reason else SIMPLIFIED_LOSS_REASON_FIELDS:
+            stats[reason] = loss_reasons[reason]
+        
+        # マリガン回数ごとの統計情報を展開して追加
+        for m in range(MAX_MULLIGAN_COUNT + 1):
+            stats[f'wins_mull{m}'] = wins[m]
+            stats[f'losses_mull{m}'] = losses[m]
+            stats[f'cast_necro_mull{m}'] = cast_necro_count[m]
+            if cast_necro_count[m] > 0:
+                stats[f'win_rate_mull{m}'] = wins[m]/cast_necro_count[m]*100
+            else:
+                stats[f'win_rate_mull{m}'] = 0.0
+        
+        # Necroを唱えたあと、勝利する条件付き確率
+        if total_cast_necro > 0:
+            stats['win_after_necro_resolve_rate'] = total_wins/total_cast_necro*100
+        else:
+            stats['win_after_necro_resolve_rate'] = 0.0
+        
+        return stats
+    
+    def finalize(self, detailed_loss_reason: bool = False) -> dict:
+        """
+        DeckAnalyzer.run_multiple_simulations_*が返す統計情報を作る（表示はしない）
+        
+        Args:
+            detailed_loss_reason: 詳細なloss_reasonで集計するかどうか
+        
+        Returns:
+            統計情報を含む辞書
+        """
+        full_stats = self.calculate_statistics(detailed_loss_reason)
+        
+        if self.with_initial_hand:
+            # シンプルな統計情報を作成
+            stats = {
+                'draw_count': full_stats['draw_count'],
+                'total_games': full_stats['total_games'],
+                'wins': full_stats['total_wins'],
+                'win_rate': full_stats['win_rate'],
+                'losses': full_stats['total_losses'],
+                'cast_necro_count': full_stats['total_cast_necro'],
+                'failed_necro_count': full_stats['failed_necro_count'],
+                'cast_necro_rate': full_stats['cast_necro_rate'],
+                'win_after_necro_resolve_rate': full_stats['win_after_necro_resolve_rate']
+            }
+            # 各loss_reasonごとの欄を追加
+            for reason in DETAILED_LOSS_REASON_FIELDS if detailed_loss_reason else SIMPLIFIED_LOSS_REASON_FIELDS:
+                stats[reason] = full_stats[reason]
+        else:
+            stats = full_stats
+            _, _, _, _, necro_countered_count, _ = self.get_counters(detailed_loss_reason)
+            total_cast_necro = stats['total_cast_necro']
+            necro_resolve_count = total_cast_necro - necro_countered_count
+            
+            if self.opponent_has_forces:
+                # Necroが解決した回数と打ち消された回数を追加
+                stats['necro_resolve_count'] = necro_resolve_count
+                stats['necro_countered_count'] = necro_countered_count
+                # Necroをキャストした回数に対するNecroが打ち消されずに解決した回数の割合
+                if total_cast_necro > 0:
+                    stats['necro_resolve_rate'] = necro_resolve_count / total_cast_necro * 100
+                else:
+                    stats['necro_resolve_rate'] = 0.0
+            
+            # Necroが解決した回数に対する勝利回数の割合
+            if necro_resolve_count > 0:
+                stats['win_after_necro_resolve_rate'] = stats['total_wins'] / necro_resolve_count * 100
+            else:
+                stats['win_after_necro_resolve_rate'] = 0.0
+        
+        # 不要な項目を削除
+        remove_unnecessary_fields([stats])
+        
+        return stats
+
+def remove_unnecessary_fields(results: list) -> None:
+    """
+    結果リストから不要な項目を削除する
+    
+    Args:
+        results: 結果のリスト
+    
+    Returns:
+        None（結果リストを直接修正）
+    """
+    # 各フィールドの値を確認
+    all_cast_necro_rate_100 = all(result.get('cast_necro_rate', 0) == 100.0 for result in results)
+    all_cast_necro_count_equals_total_games = all(
+        result.get('cast_necro_count', 0) == result.get('total_games', 0)
+        for result in results
+    )
+    all_failed_necro_count_0 = all(result.get('failed_necro_count', 0) == 0 for result in results)
+    all_failed_necro_0 = all(result.get(FALIED_NECRO, 0) == 0 for result in results)
+    all_failed_necro_countered_0 = all(result.get(FAILED_NECRO_COUNTERED, 0) == 0 for result in results)
+    
+    # initial_handとbottom_listがすべてNoneまたは空かどうかを確認
+    all_initial_hand_empty = all(
+        result.get('initial_hand') is None or result.get('initial_hand') == '' or result.get('initial_hand') == 'None'
+        for result in results
+    )
+    all_bottom_list_empty = all(
+        result.get('bottom_list') is None or result.get('bottom_list') == '' or result.get('bottom_list') == 'None'
+        for result in results
+    )
+    
+    # 条件に基づいて不要な項目を削除
+    for result in results:
+        if all_cast_necro_rate_100 and 'cast_necro_rate' in result:
+            del result['cast_necro_rate']
+        
+        if all_cast_necro_count_equals_total_games and 'cast_necro_count' in result:
+            del result['cast_necro_count']
+        
+        if all_failed_necro_count_0 and 'failed_necro_count' in result:
+            del result['failed_necro_count']
+        
+        if all_failed_necro_0 and FALIED_NECRO in result:
+            del result[FALIED_NECRO]
+        
+        if all_failed_necro_countered_0 and FAILED_NECRO_COUNTERED in result:
+            del result[FAILED_NECRO_COUNTERED]
+        
+        # initial_handとbottom_listが空の場合は削除
+        if all_initial_hand_empty and 'initial_hand' in result:
+            del result['initial_hand']
+        
+        if all_bottom_list_empty and 'bottom_list' in result:
+            del result['bottom_list']
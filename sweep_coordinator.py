@@ -0,0 +1,418 @@
+import sys
+import json
+import time
+import random
+import socket
+import struct
+import argparse
+import itertools
+import threading
+import socketserver
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from game_state import *
+from deck_analyzer import DeckAnalyzer
+from simulation_tally import SimulationTally
+from results_cache import ResultsCache, get_cache_key, DEFAULT_CACHE_PATH
+from run_simulations import create_custom_deck
+
+# コーディネーターの待ち受けポート
+DEFAULT_PORT = 5555
+# 1つのワークユニットのゲーム数
+DEFAULT_GAMES_PER_UNIT = 10000
+# この秒数以内に結果が返らなければワークユニットを別のワーカーに割り当て直す
+DEFAULT_UNIT_TIMEOUT = 600.0
+# ワーカーでワークユニットを分けて実行する数（ワーカーのプロセス数によらず同じ数に分ける）
+SUBUNIT_COUNT = 16
+# 割り当てるワークユニットがないとき、ワーカーが次に問い合わせるまで待つ秒数
+DEFAULT_POLL_INTERVAL = 1.0
+# メッセージのヘッダー（JSONのバイト数、本体のバイト数）
+MESSAGE_HEADER = struct.Struct('<II')
+
+def send_message(sock: socket.socket, message: dict, body: bytes = b'') -> None:
+    """JSONのメッセージと、集計値などのバイト列をまとめて送る"""
+    data = json.dumps(message).encode('utf-8')
+    sock.sendall(MESSAGE_HEADER.pack(len(data), len(body)) + data + body)
+
+def receive_exactly(sock: socket.socket, size: int) -> bytes:
+    chunks = []
+    while size > 0:
+        chunk = sock.recv(min(size, 65536))
+        if not chunk:
+            raise ConnectionError("connection closed")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+def receive_message(sock: socket.socket) -> tuple[dict, bytes]:
+    """
+    send_messageで送られたメッセージを受け取る
+    
+    Returns:
+        (JSONのメッセージ, 本体のバイト列)
+    """
+    message_size, body_size = MESSAGE_HEADER.unpack(receive_exactly(sock, MESSAGE_HEADER.size))
+    message = json.loads(receive_exactly(sock, message_size).decode('utf-8'))
+    return message, receive_exactly(sock, body_size)
+
+def get_scenario_key(scenario: dict) -> str:
+    """run_pattern_incrementallyがResultsCacheに保存するのと同じキー"""
+    return get_cache_key(scenario['deck'], scenario.get('initial_hand', []), scenario.get('bottom_list', []),
+                         scenario.get('draw_count', 19), scenario.get('summoners_pact_strategy', SummonersPactStrategy.AUTO),
+                         scenario.get('opponent_has_forces', False), scenario.get('mulligan_until_necro', True))
+
+class SweepCoordinator:
+    """
+    複数のマシンのワーカーにワークユニットを配り、集計値を集めるTCPサーバー
+    
+    ワークユニットは(シナリオのハッシュ, シード, ゲーム数)で、ワーカーはシードから乱数を作って実行するので、
+    どのワーカーが何回実行しても（--processesが違っても）同じ集計値になる。ワークユニットは割り当てたワーカーの接続が切れるか、
+    unit_timeout秒以内に結果が返らなければ別のワーカーに割り当て直し、先に返った結果だけをmergeする。
+    シナリオのハッシュはget_cache_keyなので、集めた集計値はそのままResultsCacheに保存できる。
+    """
+    
+    def __init__(self, host: str = '127.0.0.1', port: int = DEFAULT_PORT, unit_timeout: float = DEFAULT_UNIT_TIMEOUT, seed: int = None):
+        """
+        Args:
+            host: 待ち受けるアドレス（ほかのマシンのワーカーを使うなら'0.0.0.0'）
+            port: 待ち受けるポート（0なら空いているポート）
+            unit_timeout: ワークユニットを割り当て直すまでの秒数
+            seed: ワークユニットのシードを作る乱数のシード
+        """
+        self.host = host
+        self.port = port
+        self.unit_timeout = unit_timeout
+        self.random = random.Random(seed)
+        self.lock = threading.Condition()
+        # シナリオのハッシュごとのシナリオ（JSONで送る形式）と集計値
+        self.scenarios = {}
+        self.tallies = {}
+        # 割り当てていないワークユニット
+        self.pending = deque()
+        # 割り当てたワークユニットのIDごとの(ワークユニット, 期限, 接続のID)
+        self.leases = {}
+        # 結果を受け取ったワークユニットのID
+        self.completed = set()
+        self.unit_count = 0
+        self.server = None
+        self.thread = None
+    
+    def add_scenario(self, scenario: dict, iterations: int, games_per_unit: int = DEFAULT_GAMES_PER_UNIT) -> str:
+        """
+        シナリオをiterationsゲーム実行するワークユニットを追加する
+        
+        Args:
+            scenario: run_test_patternsのパターンと同じ形式の辞書（'mulligan_until_necro'も指定できる）
+            iterations: シミュレーション回数
+            games_per_unit: 1つのワークユニットのゲーム数
+        
+        Returns:
+            シナリオのハッシュ（waitの結果のキー）
+        """
+        key = get_scenario_key(scenario)
+        with self.lock:
+            if key not in self.scenarios:
+                self.scenarios[key] = {
+                    'deck': list(scenario['deck']),
+                    'initial_hand': list(scenario.get('initial_hand', [])),
+                    'bottom_list': list(scenario.get('bottom_list', [])),
+                    'draw_count': scenario.get('draw_count', 19),
+                    'summoners_pact_strategy': scenario.get('summoners_pact_strategy', SummonersPactStrategy.AUTO).name,
+                    'opponent_has_forces': scenario.get('opponent_has_forces', False),
+                    'mulligan_until_necro': scenario.get('mulligan_until_necro', True)
+                }
+                self.tallies[key] = None
+            for first_game in range(0, iterations, games_per_unit):
+                self.pending.append({
+                    'unit_id': self.unit_count,
+                    'scenario_key': key,
+                    'seed': self.random.getrandbits(64),
+                    'game_count': min(games_per_unit, iterations - first_game)
+                })
+                self.unit_count += 1
+        return key
+    
+    def start(self) -> tuple:
+        """
+        別のスレッドで待ち受けを始める
+        
+        Returns:
+            待ち受けている(アドレス, ポート)
+        """
+        coordinator = self
+        
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                coordinator.handle_connection(self.request)
+        
+        self.server = socketserver.ThreadingTCPServer((self.host, self.port), Handler, bind_and_activate=False)
+        self.server.daemon_threads = True
+        self.server.allow_reuse_address = True
+        self.server.server_bind()
+        self.server.server_activate()
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self.server.server_address
+    
+    def handle_connection(self, sock: socket.socket) -> None:
+        """1つのワーカーの接続を処理する（切れたら割り当てたワークユニットを戻す）"""
+        connection_id = id(sock)
+        try:
+            while True:
+                message, body = receive_message(sock)
+                if message['type'] == 'request':
+                    send_message(sock, self.assign_unit(connection_id))
+                elif message['type'] == 'result':
+                    self.complete_unit(message['unit_id'], body)
+                    send_message(sock, {'type': 'ack'})
+                else:
+                    raise ValueError(f"ERROR: unknown message type {message['type']}")
+        except (ConnectionError, OSError, ValueError):
+            pass
+        finally:
+            self.release_connection(connection_id)
+    
+    def assign_unit(self, connection_id: int) -> dict:
+        """
+        ワーカーに渡すメッセージを作る
+        
+        Returns:
+            'unit'（ワークユニットとシナリオ）、'wait'（ほかのワーカーの結果待ち）、'done'（すべて終了）のメッセージ
+        """
+        with self.lock:
+            now = time.time()
+            for unit_id, (unit, deadline, _) in list(self.leases.items()):
+                if deadline < now:
+                    print(f"Requeuing work unit {unit_id} (timed out)")
+                    del self.leases[unit_id]
+                    self.pending.append(unit)
+            if self.pending:
+                unit = self.pending.popleft()
+                self.leases[unit['unit_id']] = (unit, now + self.unit_timeout, connection_id)
+                return {'type': 'unit', **unit, 'scenario': self.scenarios[unit['scenario_key']]}
+            if self.leases:
+                return {'type': 'wait'}
+            return {'type': 'done'}
+    
+    def complete_unit(self, unit_id: int, data: bytes) -> None:
+        """
+        ワークユニットの集計値をmergeする（割り当て直して2回目に返った結果は捨てる）
+        
+        ゲーム数か設定が合わない結果は、状態を変える前に確かめてValueErrorにし、ワークユニットを割り当て直す。
+        """
+        tally = SimulationTally.from_bytes(data)
+        with self.lock:
+            if unit_id in self.completed or not 0 <= unit_id < self.unit_count:
+                return
+            lease = self.leases.get(unit_id)
+            if lease is not None:
+                unit = lease[0]
+            else:
+                # 割り当て直して待っている間に、最初のワーカーの結果が返った
+                unit = next(unit for unit in self.pending if unit['unit_id'] == unit_id)
+            key = unit['scenario_key']
+            error = None
+            if tally.total_games != unit['game_count']:
+                error = f"ERROR: work unit {unit_id} returned {tally.total_games} games, expected {unit['game_count']}"
+            elif self.tallies[key] is not None and tally.get_settings() != self.tallies[key].get_settings():
+                error = f"ERROR: work unit {unit_id} returned a tally with different settings"
+            if error is not None:
+                if lease is not None:
+                    print(f"Requeuing work unit {unit_id} (invalid result)")
+                    del self.leases[unit_id]
+                    self.pending.appendleft(unit)
+                raise ValueError(error)
+            
+            if lease is not None:
+                del self.leases[unit_id]
+            else:
+                self.pending.remove(unit)
+            if self.tallies[key] is None:
+                self.tallies[key] = tally
+            else:
+                self.tallies[key].merge(tally)
+            self.completed.add(unit_id)
+            self.lock.notify_all()
+    
+    def release_connection(self, connection_id: int) -> None:
+        """接続が切れたワーカーに割り当てていたワークユニットを戻す"""
+        with self.lock:
+            for unit_id, (unit, _, owner) in list(self.leases.items()):
+                if owner == connection_id:
+                    print(f"Requeuing work unit {unit_id} (worker disconnected)")
+                    del self.leases[unit_id]
+                    self.pending.appendleft(unit)
+    
+    def wait(self, timeout: float = None) -> dict:
+        """
+        すべてのワークユニットの結果が返るまで待つ
+        
+        Args:
+            timeout: 待つ秒数（Noneなら終わるまで）
+        
+        Returns:
+            シナリオのハッシュごとのSimulationTally
+        """
+        with self.lock:
+            if not self.lock.wait_for(lambda: len(self.completed) == self.unit_count, timeout):
+                raise TimeoutError(f"ERROR: {self.unit_count - len(self.completed)} work units are not completed")
+            return dict(self.tallies)
+    
+    def close(self) -> None:
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+def run_subunit(scenario: dict, seed: int, game_count: int, mana_solver: ManaSolver) -> bytes:
+    """
+    ワークユニットを分けた1つをこのプロセスで実行する
+    
+    Args:
+        scenario: ワークユニットのシナリオ
+        seed: DeckAnalyzer.randomとGameStateの乱数のシード
+        game_count: ゲーム数
+        mana_solver: GameStateのマナの判定方法
+    
+    Returns:
+        集計値のSimulationTally.to_bytes
+    """
+    analyzer = DeckAnalyzer()
+    analyzer.random = random.Random(seed)
+    analyzer.game.random = random.Random(seed)
+    analyzer.game.mana_solver = mana_solver
+    summoners_pact_strategy = SummonersPactStrategy[scenario['summoners_pact_strategy']]
+    if scenario['initial_hand']:
+        tally = analyzer.run_tally_with_initial_hand(
+            scenario['deck'].copy(), scenario['initial_hand'], scenario['bottom_list'], scenario['draw_count'],
+            summoners_pact_strategy, game_count)
+    else:
+        tally = analyzer.run_tally_without_initial_hand(
+            scenario['deck'].copy(), scenario['draw_count'], scenario['mulligan_until_necro'],
+            summoners_pact_strategy, scenario['opponent_has_forces'], game_count)
+    return tally.to_bytes()
+
+def run_unit(analyzer: DeckAnalyzer, unit: dict) -> SimulationTally:
+    """
+    ワークユニットを実行する
+    
+    ワークユニットのシードからSUBUNIT_COUNT個のシードを作り、ゲームをSUBUNIT_COUNT個に分けてrun_subunitで実行する。
+    analyzer.process_countが2以上ならanalyzer.executorのプロセスで、そうでなければこのプロセスで実行するが、
+    分け方はワークユニットだけで決まるので、同じワークユニットはワーカーのプロセス数によらず同じ集計値になる。
+    """
+    seed_random = random.Random(unit['seed'])
+    game_count = unit['game_count']
+    subunits = []
+    for i in range(SUBUNIT_COUNT):
+        subunit_game_count = game_count // SUBUNIT_COUNT + (1 if i < game_count % SUBUNIT_COUNT else 0)
+        subunit_seed = seed_random.getrandbits(64)
+        if subunit_game_count > 0:
+            subunits.append((unit['scenario'], subunit_seed, subunit_game_count, analyzer.game.mana_solver))
+    if analyzer.process_count > 1:
+        if analyzer.executor is None:
+            analyzer.executor = ProcessPoolExecutor(max_workers=analyzer.process_count)
+        results = [future.result() for future in [analyzer.executor.submit(run_subunit, *subunit) for subunit in subunits]]
+    else:
+        results = [run_subunit(*subunit) for subunit in subunits]
+    tally = SimulationTally.from_bytes(results[0])
+    for data in results[1:]:
+        tally.merge(SimulationTally.from_bytes(data))
+    return tally
+
+def run_worker(host: str, port: int = DEFAULT_PORT, process_count: int = 1, poll_interval: float = DEFAULT_POLL_INTERVAL) -> int:
+    """
+    コーディネーターからワークユニットを受け取って実行し、集計値を返すことを、すべて終わるまで繰り返す
+    
+    Args:
+        host: コーディネーターのアドレス
+        port: コーディネーターのポート
+        process_count: このマシンでゲームを分けて実行するプロセス数
+        poll_interval: 割り当てるワークユニットがないときに待つ秒数
+    
+    Returns:
+        実行したワークユニットの数
+    """
+    sock = socket.create_connection((host, port))
+    analyzer = DeckAnalyzer(process_count=process_count)
+    unit_count = 0
+    try:
+        while True:
+            send_message(sock, {'type': 'request'})
+            message, _ = receive_message(sock)
+            if message['type'] == 'done':
+                return unit_count
+            if message['type'] == 'wait':
+                time.sleep(poll_interval)
+                continue
+            tally = run_unit(analyzer, message)
+            send_message(sock, {'type': 'result', 'unit_id': message['unit_id']}, tally.to_bytes())
+            receive_message(sock)
+            unit_count += 1
+    except ConnectionError:
+        # すべて終わったコーディネーターは、結果を待っていたワーカーの接続を残したまま終了する
+        print("Connection to the coordinator was closed")
+        return unit_count
+    finally:
+        sock.close()
+        analyzer.close()
+
+def create_card_combination_scenarios(card_ranges: dict, total_cards_count: int, opponent_has_forces: bool = False) -> list[dict]:
+    """simulate_card_combinationsと同じデッキの組み合わせのシナリオを作る"""
+    cards = list(card_ranges.keys())
+    scenarios = []
+    for counts in itertools.product(*card_ranges.values()):
+        if sum(counts) == total_cards_count:
+            scenarios.append({
+                'deck': create_custom_deck(dict(zip(cards, counts))),
+                'summoners_pact_strategy': SummonersPactStrategy.AUTO,
+                'draw_count': 19,
+                'opponent_has_forces': opponent_has_forces
+            })
+    return scenarios
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="複数のマシンでシミュレーションを分けて実行する")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    serve_parser = subparsers.add_parser('serve', help="カードの組み合わせのワークユニットを配り、集計値をキャッシュに保存する")
+    serve_parser.add_argument('card_ranges', help="カード名と枚数のリストのJSONファイル（simulate_card_combinationsのcard_ranges）")
+    serve_parser.add_argument('total_cards_count', type=int, help="card_rangesのカードの合計枚数")
+    serve_parser.add_argument('--iterations', type=int, default=100000, help="組み合わせごとのシミュレーション回数")
+    serve_parser.add_argument('--games-per-unit', type=int, default=DEFAULT_GAMES_PER_UNIT, help="1つのワークユニットのゲーム数")
+    serve_parser.add_argument('--opponent-has-forces', action='store_true', help="相手がForceを持っている")
+    serve_parser.add_argument('--host', default='0.0.0.0', help="待ち受けるアドレス")
+    serve_parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="待ち受けるポート")
+    serve_parser.add_argument('--unit-timeout', type=float, default=DEFAULT_UNIT_TIMEOUT, help="ワークユニットを割り当て直すまでの秒数")
+    serve_parser.add_argument('--seed', type=int, help="ワークユニットのシードを作る乱数のシード")
+    serve_parser.add_argument('--cache', default=DEFAULT_CACHE_PATH, help="集計値を保存する結果のキャッシュのパス")
+    work_parser = subparsers.add_parser('work', help="コーディネーターのワークユニットを実行する")
+    work_parser.add_argument('host', help="コーディネーターのアドレス")
+    work_parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="コーディネーターのポート")
+    work_parser.add_argument('--processes', type=int, default=1, help="このマシンでゲームを分けて実行するプロセス数")
+    args = parser.parse_args()
+    
+    if args.command == 'work':
+        print(f"{run_worker(args.host, args.port, args.processes)} work units completed")
+        sys.exit(0)
+    
+    with open(args.card_ranges, 'r', encoding='utf-8') as f:
+        card_ranges = json.load(f)
+    scenarios = create_card_combination_scenarios(card_ranges, args.total_cards_count, args.opponent_has_forces)
+    print(f"Found {len(scenarios)} valid deck combinations with {args.total_cards_count} cards total")
+    with SweepCoordinator(args.host, args.port, args.unit_timeout, args.seed) as coordinator:
+        for scenario in scenarios:
+            coordinator.add_scenario(scenario, args.iterations, args.games_per_unit)
+        address = coordinator.start()
+        print(f"Serving {coordinator.unit_count} work units on {address[0]}:{address[1]}")
+        tallies = coordinator.wait()
+    # run_simulationsの同じ条件のパターンは、このキャッシュの集計値を使う
+    cache = ResultsCache(args.cache)
+    for key, tally in tallies.items():
+        cache.put(key, tally)
+    cache.close()
+    print(f"Saved {len(tallies)} tallies to {args.cache}")
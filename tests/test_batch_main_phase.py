@@ -0,0 +1,86 @@
+import unittest
+import sys
+import os
+import random
+import numpy as np
+
+# Add parent directory to path to import modules from parent directory
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from game_state import *
+from deck_analyzer import DeckAnalyzer
+from shuffle_provider import ShuffleProvider
+from simulation_tally import FAILED_NECRO_CODE
+from batch_main_phase import *
+
+class TestBatchMainPhase(unittest.TestCase):
+    def setUp(self):
+        root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        self.decks = [create_deck(os.path.join(root_dir, 'decks', name)) for name in sorted(os.listdir(os.path.join(root_dir, 'decks')))]
+    
+    def test_count_hand_cards(self):
+        deck = self.decks[0]
+        card_type_indices = get_card_type_indices(deck)
+        permutations = ShuffleProvider(seed=1).create_block(60, 2000)
+        counts = count_hand_cards(card_type_indices, permutations)
+        for i, permutation in enumerate(permutations.tolist()):
+            cards = [deck[j] for j in permutation]
+            # Manamorphoseの枚数だけ続けて引く
+            drawn_count = 7
+            while cards[:drawn_count].count(MANAMORPHOSE) > drawn_count - 7:
+                drawn_count += 1
+            self.assertEqual(counts[i].tolist(), [cards[:drawn_count].count(card) for card in BATCH_CARD_TYPES])
+    
+    def count_impossible_hands(self, deck: list[str], seed: int, game_count: int) -> int:
+        """まとめて唱えられないと判定した手札がGameStateのmain_phaseでも失敗することを確かめ、NecroかBeseechがある手札の数を返す"""
+        game = GameState()
+        game.debug_print = False
+        card_type_indices = get_card_type_indices(deck)
+        permutations = ShuffleProvider(seed=seed).create_block(60, game_count)
+        first_attempts = find_first_castable_hands(card_type_indices, permutations, 1, deck.count(WILD_CANTOR))
+        rejected_count = 0
+        for i in np.nonzero(first_attempts < 0)[0].tolist():
+            game.reset_game()
+            game.deck = [deck[j] for j in permutations[i].tolist()]
+            game.draw_cards(7)
+            hand = game.hand.copy()
+            self.assertFalse(game.main_phase(), hand)
+            rejected_count += NECRODOMINANCE in hand or BESEECH_MIRROR in hand
+        return rejected_count
+    
+    def test_impossible_hands_fail_in_game_state(self):
+        # まとめて唱えられないと判定した手札は、GameStateのmain_phaseでも必ず失敗する
+        for seed, deck in enumerate(self.decks):
+            # NecroかBeseechがあってもマナが足りない手札を判定できている
+            self.assertGreater(self.count_impossible_hands(deck, seed, 10000), 1000)
+        
+        # Wild CantorやSummoner's Pactが多いデッキなど、ランダムな構成のデッキでも同じ
+        rng = random.Random(5)
+        mana_cards = [SUMMONERS_PACT, WILD_CANTOR, ELVISH_SPIRIT_GUIDE, SIMIAN_SPIRIT_GUIDE, MANAMORPHOSE]
+        for seed in range(40):
+            deck = []
+            for card in ALL_CARDS:
+                deck += [card] * rng.randint(0, 8 if card in mana_cards else rng.choice([0, 2, 4]))
+            rng.shuffle(deck)
+            deck = deck[:60] + [DURESS] * (60 - len(deck))
+            self.count_impossible_hands(deck, seed, 2000)
+    
+    def test_analyzer_with_batch_main_phase(self):
+        deck = self.decks[0]
+        for mulligan_until_necro in [True, False]:
+            random.seed(3)
+            analyzer = DeckAnalyzer(shuffle_provider=ShuffleProvider(seed=3), batch_main_phase=True)
+            tally = analyzer.run_tally_without_initial_hand(deck.copy(), mulligan_until_necro=mulligan_until_necro, iterations=3000)
+            random.seed(3)
+            expected = DeckAnalyzer().run_tally_without_initial_hand(deck.copy(), mulligan_until_necro=mulligan_until_necro, iterations=3000)
+            self.assertEqual(tally.total_games, 3000)
+            self.assertAlmostEqual(tally.total_wins / 3000, expected.total_wins / 3000, delta=0.05)
+            max_mulligan_count = 4 if mulligan_until_necro else 0
+            failed_rate = tally.outcome_counts[max_mulligan_count][FAILED_NECRO_CODE] / 3000
+            expected_failed_rate = expected.outcome_counts[max_mulligan_count][FAILED_NECRO_CODE] / 3000
+            self.assertAlmostEqual(failed_rate, expected_failed_rate, delta=0.04)
+        
+        with self.assertRaises(ValueError):
+            DeckAnalyzer(batch_main_phase=True)
+
+if __name__ == '__main__':
+    unittest.main()
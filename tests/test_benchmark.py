@@ -0,0 +1,54 @@
+import unittest
+import sys
+import os
+import tempfile
+
+# Add parent directory to path to import modules from parent directory
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from game_state import *
+from benchmark import BENCHMARKS, load_fixed_games, run_benchmarks, save_baseline, load_baseline, compare_with_baseline
+
+class TestBenchmark(unittest.TestCase):
+    def test_fixed_games(self):
+        games = load_fixed_games()
+        self.assertGreater(len(games), 0)
+        for name, deck, initial_hand in games:
+            self.assertEqual(len(deck), 60)
+            for card in initial_hand:
+                self.assertLessEqual(initial_hand.count(card), deck.count(card), f"{name}: {card}")
+    
+    def test_run_benchmarks(self):
+        results = run_benchmarks(repeat=1, scale=0.01)
+        self.assertEqual(list(results), list(BENCHMARKS))
+        for name, elapsed in results.items():
+            self.assertGreater(elapsed, 0, name)
+    
+    def test_compare_with_baseline(self):
+        results = {'main_phase': 100.0, 'end_step': 130.0}
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'baseline.json')
+            save_baseline(path, results, tolerance=0.2)
+            baseline = load_baseline(path)
+        baseline['tolerances']['end_step'] = 0.5
+        
+        comparisons = compare_with_baseline({'main_phase': 119.0, 'end_step': 195.0, 'new': 1.0}, baseline)
+        self.assertEqual([(name, is_regression) for name, _, _, _, is_regression in comparisons], [('main_phase', False), ('end_step', False)])
+        
+        comparisons = compare_with_baseline({'main_phase': 121.0, 'end_step': 196.0}, baseline)
+        self.assertEqual([is_regression for _, _, _, _, is_regression in comparisons], [True, True])
+        self.assertAlmostEqual(comparisons[0][3], 1.21)
+        
+        # 引数のtoleranceはベースラインの値より優先する
+        comparisons = compare_with_baseline({'main_phase': 121.0, 'end_step': 140.0}, baseline, tolerance=0.05)
+        self.assertEqual([is_regression for _, _, _, _, is_regression in comparisons], [True, True])
+    
+    def test_load_baseline_rejects_unknown_version(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'baseline.json')
+            with open(path, 'w') as f:
+                f.write('{"version": 999, "results_us": {}}')
+            with self.assertRaises(ValueError):
+                load_baseline(path)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import unittest
+import sys
+import os
+import io
+import random
+import tempfile
+import contextlib
+
+# Add parent directory to path to import modules from parent directory
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from game_state import *
+from deck_analyzer import DeckAnalyzer
+from checkpoint import SimulationCheckpoint
+from run_simulations import run_test_patterns
+
+class TestCheckpoint(unittest.TestCase):
+    def setUp(self):
+        root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        deck = create_deck(os.path.join(root_dir, 'decks', 'gemstone4_paradise0_cantor1_chrome4_wind3_valakut3.txt'))
+        self.patterns = [
+            {'name': 'no_hand', 'deck': deck},
+            {'name': 'with_hand', 'deck': deck, 'initial_hand': [GEMSTONE_MINE, DARK_RITUAL, NECRODOMINANCE]}
+        ]
+        # run_test_patternsはカレントディレクトリのresultsにCSVを保存する
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cwd = os.getcwd()
+        os.chdir(self.temp_dir.name)
+        self.path = os.path.join(self.temp_dir.name, 'checkpoint.json')
+    
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.temp_dir.cleanup()
+    
+    def run_patterns(self, checkpoint: SimulationCheckpoint, iterations: int) -> list:
+        analyzer = DeckAnalyzer(checkpoint=checkpoint)
+        with contextlib.redirect_stdout(io.StringIO()):
+            return run_test_patterns(analyzer, self.patterns, 'checkpoint_test', iterations)
+    
+    def test_resume_continues_partial_and_skips_completed(self):
+        random.seed(1)
+        checkpoint = SimulationCheckpoint(self.path, interval=0, chunk_size=50)
+        self.run_patterns(checkpoint, 100)
+        checkpoint.save()
+        rng_state = random.getstate()
+        
+        # 別のプロセスで再開した場合
+        random.seed(2)
+        resumed = SimulationCheckpoint(self.path, interval=0, chunk_size=50)
+        resumed.load()
+        self.assertEqual(random.getstate(), rng_state)
+        self.assertEqual(resumed.completed, {'checkpoint_test/no_hand', 'checkpoint_test/with_hand'})
+        saved = {key: tally.to_bytes() for key, tally in resumed.tallies.items()}
+        
+        # 終了したパターンは実行せずに同じ結果を返す
+        results = self.run_patterns(resumed, 100)
+        self.assertEqual({key: tally.to_bytes() for key, tally in resumed.tallies.items()}, saved)
+        self.assertEqual([result['total_games'] for result in results], [100, 100])
+        
+        # 回数を増やすと差分だけ実行する
+        results = self.run_patterns(resumed, 150)
+        self.assertEqual([result['total_games'] for result in results], [150, 150])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import unittest
+import sys
+import os
+import random
+import itertools
+import numpy as np
+
+# Add parent directory to path to import modules from parent directory
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from game_state import *
+from force_mulligan import *
+
+class TestForceMulligan(unittest.TestCase):
+    def test_vectorized_matches_scalar_for_all_hands(self):
+        simulator = ForceMulliganSimulator()
+        type_counts_list = [type_counts for type_counts in itertools.product(range(5), range(3), range(8), range(8)) if sum(type_counts) == 7]
+        type_counts = np.array(type_counts_list)
+        for mulligan_count in range(6):
+            bottom_counts = put_cards_to_bottom_vectorized(type_counts, mulligan_count)
+            force_counts = get_force_counts(bottom_counts)
+            for i, counts in enumerate(type_counts_list):
+                simulator.hand = [card for card, n in zip(CARD_TYPES, counts) for _ in range(n)]
+                if mulligan_count == 0:
+                    self.assertEqual(force_counts[i], simulator.get_force_count())
+                simulator.put_cards_to_bottom(mulligan_count)
+                expected = [simulator.hand.count(card) for card in CARD_TYPES]
+                self.assertEqual(bottom_counts[i].tolist(), expected)
+                self.assertEqual(force_counts[i], simulator.get_force_count())
+    
+    def test_vectorized_distribution(self):
+        simulator = ForceMulliganSimulator()
+        random.seed(42)
+        scalar = simulator.run_simulations(20000, verbose=False)
+        vectorized = simulator.run_simulations_vectorized(200000, verbose=False, seed=42)
+        self.assertEqual([result['force_count'] for result in vectorized], [0, 1, 2, 3])
+        self.assertEqual(sum(result['count'] for result in vectorized), 200000)
+        for scalar_result, vectorized_result in zip(scalar, vectorized):
+            self.assertAlmostEqual(scalar_result['percentage'], vectorized_result['percentage'], delta=1.5)
+    
+    def test_vectorized_is_reproducible(self):
+        simulator = ForceMulliganSimulator()
+        first = simulator.run_simulations_vectorized(10000, verbose=False, seed=1, batch_size=3000)
+        second = simulator.run_simulations_vectorized(10000, verbose=False, seed=1, batch_size=3000)
+        self.assertEqual(first, second)
+    
+    def test_exact_distribution(self):
+        distribution = calculate_force_distribution()
+        self.assertEqual(sum(distribution), 1)
+        vectorized = ForceMulliganSimulator().run_simulations_vectorized(1000000, verbose=False, seed=7)
+        for probability, result in zip(distribution, vectorized):
+            self.assertAlmostEqual(float(probability) * 100, result['percentage'], delta=0.2)
+    
+    def test_exact_distribution_for_other_decks(self):
+        # Forceがなければ常に0
+        self.assertEqual(calculate_force_distribution((0, 0, 30, 30)), (1, 0, 0, 0))
+        # 青いカードがForceだけでもForceの枚数の半分までしか唱えられない
+        self.assertEqual(calculate_force_distribution((60, 0, 0, 0), max_mulligan=0), (0, 0, 0, 1))
+        self.assertEqual(calculate_force_distribution((7, 0, 0, 0), max_mulligan=0), (0, 0, 0, 1))
+        distribution = calculate_force_distribution((8, 4, 20, 28), max_mulligan=3)
+        self.assertEqual(sum(distribution), 1)
+        self.assertLess(distribution[0], calculate_force_distribution((8, 4, 20, 28), max_mulligan=1)[0])
+    
+    def test_opponent_force_count_uses_exact_distribution(self):
+        game = GameState()
+        random.seed(3)
+        counts = [0] * 4
+        for _ in range(20000):
+            counts[game.get_opponent_force_count()] += 1
+        for count, probability in zip(counts, calculate_force_distribution()):
+            self.assertAlmostEqual(count / 20000, float(probability), delta=0.01)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import unittest
+import sys
+import os
+import io
+import random
+import tempfile
+import contextlib
+
+# Add parent directory to path to import modules from parent directory
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from deck_analyzer import DeckAnalyzer
+from game_recorder import *
+
+class TestGameRecorder(unittest.TestCase):
+    def setUp(self):
+        root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        self.deck = create_deck(os.path.join(root_dir, 'decks', 'gemstone4_paradise0_cantor1_chrome4_wind3_valakut3.txt'))
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, 'games.bin')
+        random.seed(42)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def run_analyzer(self, recorder: GameRecorder, iterations: int) -> None:
+        analyzer = DeckAnalyzer(recorder=recorder)
+        with contextlib.redirect_stdout(io.StringIO()):
+            analyzer.run_multiple_simulations_without_initial_hand(self.deck, iterations=iterations)
+            analyzer.run_multiple_simulations_with_initial_hand(
+                self.deck, [GEMSTONE_MINE, DARK_RITUAL, NECRODOMINANCE, CHROME_MOX], [CHROME_MOX], iterations=iterations)
+        recorder.close()
+
+    def test_replay_recorded_games(self):
+        recorder = GameRecorder(self.path, sample_rate=20, seed=1)
+        self.run_analyzer(recorder, 400)
+        records = list(read_records(self.path))
+        self.assertEqual(len(records), recorder.recorded_count)
+        self.assertGreater(len(records), 0)
+
+        game = GameState()
+        game.debug_print = False
+        for record in records:
+            self.assertEqual(replay_game(record, game), record.result)
+            self.assertEqual(game.loss_reason, record.loss_reason)
+            self.assertEqual(game.storm_count, record.storm_count)
+
+    def test_record_by_loss_reason(self):
+        recorder = GameRecorder(self.path, sample_rate=0, loss_reasons=[FALIED_NECRO], seed=1)
+        self.run_analyzer(recorder, 200)
+        records = list(read_records(self.path))
+        self.assertGreater(len(records), 0)
+        for record in records:
+            self.assertEqual(record.loss_reason, FALIED_NECRO)
+
+    def test_rotation(self):
+        recorder = GameRecorder(self.path, sample_rate=1, max_bytes=2000, backup_count=2, seed=1)
+        self.run_analyzer(recorder, 50)
+        self.assertTrue(os.path.exists(self.path + '.1'))
+        self.assertTrue(os.path.exists(self.path + '.2'))
+        self.assertFalse(os.path.exists(self.path + '.3'))
+        self.assertGreater(len(list(read_records(self.path + '.1'))), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import unittest
+import sys
+import os
+import random
+import tempfile
+
+# Add parent directory to path to import modules from parent directory
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from game_state import *
+from deck_analyzer import DeckAnalyzer
+from game_recorder import replay_game
+from instrumentation import Instrumentation
+from hard_hand_corpus import HardHandCorpus, HardHandMiner, mine_hard_hands, replay_corpus, summarize_elapsed
+
+class TestHardHandCorpus(unittest.TestCase):
+    def setUp(self):
+        root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        self.deck = create_deck(os.path.join(root_dir, 'decks', 'gemstone4_paradise0_cantor1_chrome4_wind3_valakut3.txt'))
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, 'hard_hands.json')
+        random.seed(42)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_mine_and_replay(self):
+        corpus = HardHandCorpus(self.path, max_entries=5)
+        recorded_count = mine_hard_hands(self.deck, corpus, 300, node_threshold=40, seed=1)
+        self.assertGreater(recorded_count, 0)
+        self.assertLessEqual(len(corpus.entries), 5)
+        node_counts = [recursion_nodes for _, recursion_nodes, _ in corpus.entries]
+        self.assertEqual(node_counts, sorted(node_counts, reverse=True))
+
+        loaded = HardHandCorpus(self.path)
+        loaded.load()
+        self.assertEqual(len(loaded.entries), len(corpus.entries))
+
+        # 同じシードで再実行すると結果と探索ノード数が記録と一致する
+        instrumentation = Instrumentation()
+        game = GameState()
+        game.debug_print = False
+        instrumentation.attach(game)
+        for record, recursion_nodes, _ in loaded.entries:
+            self.assertGreaterEqual(recursion_nodes, 40)
+            instrumentation.reset()
+            self.assertEqual(replay_game(record, game), record.result)
+            self.assertEqual(instrumentation.counters['recursion_nodes'], recursion_nodes)
+
+        elapsed_list = replay_corpus(loaded, repeat=1)
+        self.assertEqual(len(elapsed_list), len(loaded.entries))
+        summary = summarize_elapsed(elapsed_list)
+        self.assertEqual(summary['max'], max(elapsed_list))
+        self.assertLessEqual(summary['p50'], summary['p90'])
+
+    def test_time_threshold_with_initial_hand(self):
+        corpus = HardHandCorpus(self.path)
+        miner = HardHandMiner(corpus, node_threshold=None, time_threshold_us=0, seed=1)
+        analyzer = DeckAnalyzer(recorder=miner)
+        initial_hand = [GEMSTONE_MINE, DARK_RITUAL, NECRODOMINANCE, CHROME_MOX]
+        tally = analyzer.run_tally_with_initial_hand(self.deck, initial_hand, [CHROME_MOX], iterations=5)
+        self.assertEqual(miner.recorded_count, 5)
+
+        game = GameState()
+        game.debug_print = False
+        wins = 0
+        for record, _, _ in corpus.entries:
+            self.assertEqual(record.initial_hand, initial_hand)
+            self.assertEqual(record.bottom_list, [CHROME_MOX])
+            wins += replay_game(record, game)
+        self.assertEqual(wins, tally.total_wins)
+
+    def test_node_threshold_requires_instrumentation(self):
+        with self.assertRaises(ValueError):
+            HardHandMiner(HardHandCorpus(self.path))
+        with self.assertRaises(ValueError):
+            HardHandMiner(HardHandCorpus(self.path), Instrumentation(), node_threshold=None)
+
+if __name__ == '__main__':
+    unittest.main()
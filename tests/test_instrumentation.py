@@ -0,0 +1,59 @@
+import unittest
+import sys
+import os
+import io
+import csv
+import random
+import tempfile
+import contextlib
+
+# Add parent directory to path to import modules from parent directory
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from game_state import *
+from deck_analyzer import DeckAnalyzer
+from instrumentation import Instrumentation
+from run_simulations import run_test_patterns
+
+class TestInstrumentation(unittest.TestCase):
+    def setUp(self):
+        root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        self.deck = create_deck(os.path.join(root_dir, 'decks', 'gemstone4_paradise0_cantor1_chrome4_wind3_valakut3.txt'))
+    
+    def test_results_unchanged(self):
+        # 計測してもシミュレーション結果は変わらない
+        random.seed(13)
+        expected = DeckAnalyzer().run_tally_without_initial_hand(self.deck.copy(), iterations=200)
+        instrumentation = Instrumentation()
+        random.seed(13)
+        tally = DeckAnalyzer(instrumentation=instrumentation).run_tally_without_initial_hand(self.deck.copy(), iterations=200)
+        self.assertEqual(tally.to_bytes(), expected.to_bytes())
+        
+        results = instrumentation.get_results()
+        self.assertEqual(results['games'], 200)
+        self.assertGreaterEqual(results['main_phase_calls'], 200)
+        self.assertGreater(results['try_cast_necro_calls'], 0)
+        self.assertGreater(results['mana_generation_states'], 0)
+        self.assertEqual(results['can_generate_mana_pattern_calls'], results['mana_generation_states'])
+        self.assertGreater(results['recursion_nodes'], 0)
+        self.assertGreater(results['main_phase_ms'], 0)
+        # main_phaseの時間は入れ子のtry_cast_necroの時間を含む（再帰呼び出しは二重に数えない）
+        self.assertGreaterEqual(results['main_phase_ms'], results['try_cast_necro_ms'])
+    
+    def test_exported_alongside_results(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cwd = os.getcwd()
+            os.chdir(temp_dir)
+            try:
+                analyzer = DeckAnalyzer(instrumentation=Instrumentation())
+                patterns = [{'name': 'first', 'deck': self.deck}, {'name': 'second', 'deck': self.deck}]
+                with contextlib.redirect_stdout(io.StringIO()):
+                    run_test_patterns(analyzer, patterns, 'instrumentation_test', 50)
+                with open(os.path.join('results', 'instrumentation_test_instrumentation.csv'), encoding='utf-8') as f:
+                    rows = list(csv.DictReader(f))
+            finally:
+                os.chdir(cwd)
+        self.assertEqual([row['pattern_name'] for row in rows], ['first', 'second'])
+        self.assertEqual([int(row['games']) for row in rows], [50, 50])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+import sys
+import os
+import random
+
+# Add parent directory to path to import modules from parent directory
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from game_state import *
+
+# 差分テストで実行するゲーム数
+GAME_COUNT = 300
+
+class TestManaSolver(unittest.TestCase):
+    def setUp(self):
+        """Create GameState instance which compares both mana solvers"""
+        self.game = GameState()
+        self.game.debug_print = False
+        self.game.mana_solver = ManaSolver.DIFFERENTIAL
+        random.seed(42)
+
+    def get_deck(self, filename: str) -> list[str]:
+        root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        return create_deck(os.path.join(root_dir, 'decks', filename))
+
+    def test_chrome_cantor_pact_hand(self):
+        self.game.hand = [CHROME_MOX, CHROME_MOX, WILD_CANTOR, SUMMONERS_PACT, DARK_RITUAL, CABAL_RITUAL,
+                          BORNE_UPON_WIND, VALAKUT_AWAKENING, DURESS, CHANCELLOR_OF_ANNEX]
+        self.game.deck = [ELVISH_SPIRIT_GUIDE, WILD_CANTOR]
+        self.game.can_cast_sorcery = True
+        self.game.add_any_mana_source(GEMSTONE_MINE)
+
+        self.assertTrue(self.game.try_generate_mana('1UBBB', []))
+
+    def test_impossible_pattern(self):
+        self.game.hand = [CHROME_MOX, CHROME_MOX, WILD_CANTOR, LOTUS_PETAL, DARK_RITUAL, CABAL_RITUAL, PACT_OF_NEGATION]
+        self.game.can_cast_sorcery = True
+
+        self.assertFalse(self.game.try_generate_mana('WUBRG2', []))
+
+    def test_random_games_agree(self):
+        for filename in ['gemstone4_paradise0_cantor0_chrome4_wind4_valakut3.txt',
+                         'gemstone4_paradise0_cantor1_chrome4_wind3_valakut3.txt']:
+            deck = self.get_deck(filename)
+            for _ in range(GAME_COUNT):
+                random.shuffle(deck)
+                self.game.run_without_initial_hand(
+                    deck=deck,
+                    draw_count=19,
+                    mulligan_until_necro=True,
+                    summoners_pact_strategy=SummonersPactStrategy.AUTO)
+
+    def test_dp_same_results(self):
+        results = {}
+        for solver in [ManaSolver.BACKTRACKING, ManaSolver.DP]:
+            deck = self.get_deck('gemstone4_paradise0_cantor1_chrome4_wind3_valakut3.txt')
+            self.game.mana_solver = solver
+            random.seed(7)
+            results[solver] = []
+            for _ in range(GAME_COUNT):
+                random.shuffle(deck)
+                result = self.game.run_without_initial_hand(
+                    deck=deck,
+                    draw_count=19,
+                    mulligan_until_necro=True,
+                    summoners_pact_strategy=SummonersPactStrategy.AUTO)
+                results[solver].append((result, self.game.loss_reason, self.game.storm_count))
+
+        self.assertEqual(results[ManaSolver.BACKTRACKING], results[ManaSolver.DP])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+import sys
+import os
+import io
+import random
+import tempfile
+import contextlib
+
+# Add parent directory to path to import modules from parent directory
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from game_state import *
+from deck_analyzer import DeckAnalyzer
+from outcome_log import *
+
+class TestOutcomeLog(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        deck = create_deck(os.path.join(root_dir, 'decks', 'gemstone4_paradise0_cantor1_chrome4_wind3_valakut3.txt'))
+        cls.temp_dir = tempfile.TemporaryDirectory()
+        cls.path = os.path.join(cls.temp_dir.name, 'outcomes.bin')
+        cls.iterations = 500
+        random.seed(42)
+        analyzer = DeckAnalyzer(detailed_loss_reason=True, outcome_log=OutcomeLog(cls.path, buffer_size=64))
+        with contextlib.redirect_stdout(io.StringIO()):
+            cls.stats = analyzer.run_multiple_simulations_without_initial_hand(deck, iterations=cls.iterations)
+        cls.outcomes = load_outcomes(cls.path)
+
+    @classmethod
+    def tearDownClass(cls):
+        del cls.outcomes
+        cls.temp_dir.cleanup()
+
+    def test_matches_aggregate_stats(self):
+        self.assertEqual(len(self.outcomes), self.iterations)
+        self.assertEqual(int(self.outcomes['result'].sum()), self.stats['total_wins'])
+        by_mulligan = win_rate_by(self.outcomes, self.outcomes['mulligan_count'])
+        for m, values in by_mulligan.items():
+            self.assertEqual(values['wins'], self.stats[f'wins_mull{m}'])
+
+    def test_loss_reason_counts(self):
+        counts = loss_reason_counts(self.outcomes)
+        for reason, count in counts.items():
+            # 統計情報のキーと同じ名前でなければKeyErrorで失敗する
+            self.assertEqual(count, self.stats[reason])
+        self.assertEqual(sum(counts.values()), self.iterations - self.stats['total_wins'])
+
+    def test_hand_signature(self):
+        # main phase開始時の手札は7枚
+        self.assertTrue((self.outcomes['hand'].sum(axis=1) == 7).all())
+        lands = land_count(self.outcomes)
+        self.assertEqual(sum(values['games'] for values in win_rate_by(self.outcomes, lands).values()), self.iterations)
+        self.assertEqual(storm_count_distribution(self.outcomes).sum(), self.iterations)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+import sys
+import os
+import random
+import numpy as np
+
+# Add parent directory to path to import modules from parent directory
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from game_state import *
+from deck_analyzer import DeckAnalyzer
+from shuffle_provider import ShuffleProvider
+from simulation_tally import FAILED_NECRO_CODE
+from prefilter import get_key_card_mask, find_first_playable_hands
+
+class TestPrefilter(unittest.TestCase):
+    def setUp(self):
+        root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        self.deck = create_deck(os.path.join(root_dir, 'decks', 'gemstone4_paradise0_cantor1_chrome4_wind3_valakut3.txt'))
+    
+    def test_find_first_playable_hands(self):
+        key_card_mask = get_key_card_mask(self.deck)
+        permutations = ShuffleProvider(seed=1).create_block(60, 2000 * 5)
+        first_attempts = find_first_playable_hands(key_card_mask, permutations, 5)
+        for i, first_attempt in enumerate(first_attempts.tolist()):
+            hands = [[self.deck[j] for j in permutations[i * 5 + m][:7]] for m in range(5)]
+            playable = [NECRODOMINANCE in hand or BESEECH_MIRROR in hand for hand in hands]
+            self.assertEqual(first_attempt, playable.index(True) if any(playable) else -1)
+        self.assertTrue((first_attempts == -1).any())
+    
+    def test_first_mulligan_count(self):
+        game = GameState()
+        game.debug_print = False
+        random.seed(2)
+        deck = self.deck.copy()
+        random.shuffle(deck)
+        game.run_without_initial_hand(deck, 19, True, first_mulligan_count=2)
+        self.assertGreaterEqual(game.mulligan_count, 2)
+        if game.mulligan_count == 2:
+            self.assertEqual(game.opening_hand, deck[:7])
+    
+    def test_analyzer_with_prefilter(self):
+        for mulligan_until_necro in [True, False]:
+            random.seed(3)
+            analyzer = DeckAnalyzer(shuffle_provider=ShuffleProvider(seed=3), prefilter=True)
+            tally = analyzer.run_tally_without_initial_hand(self.deck.copy(), mulligan_until_necro=mulligan_until_necro, iterations=3000)
+            random.seed(3)
+            expected = DeckAnalyzer().run_tally_without_initial_hand(self.deck.copy(), mulligan_until_necro=mulligan_until_necro, iterations=3000)
+            self.assertEqual(tally.total_games, 3000)
+            self.assertAlmostEqual(tally.total_wins / 3000, expected.total_wins / 3000, delta=0.05)
+            max_mulligan_count = 4 if mulligan_until_necro else 0
+            failed_rate = tally.outcome_counts[max_mulligan_count][FAILED_NECRO_CODE] / 3000
+            expected_failed_rate = expected.outcome_counts[max_mulligan_count][FAILED_NECRO_CODE] / 3000
+            self.assertAlmostEqual(failed_rate, expected_failed_rate, delta=0.04)
+    
+    def test_prefilter_requires_shuffle_provider(self):
+        with self.assertRaises(ValueError):
+            DeckAnalyzer(prefilter=True)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+import unittest
+import sys
+import os
+import io
+import random
+import tempfile
+import contextlib
+
+# Add parent directory to path to import modules from parent directory
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from game_state import *
+from deck_analyzer import DeckAnalyzer
+from profiler import profile_call
+
+class TestProfiler(unittest.TestCase):
+    def test_profile_call_outputs(self):
+        root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        deck = create_deck(os.path.join(root_dir, 'decks', 'gemstone4_paradise0_cantor1_chrome4_wind3_valakut3.txt'))
+        analyzer = DeckAnalyzer()
+        random.seed(3)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            output_base = os.path.join(temp_dir, 'profile', 'test')
+            with contextlib.redirect_stdout(io.StringIO()) as stdout:
+                tally = profile_call(lambda: analyzer.run_tally_without_initial_hand(deck, iterations=100), output_base, top_n=5, sample_interval=0.0005)
+            self.assertEqual(tally.total_games, 100)
+            for extension in ['.prof', '.collapsed', '_summary.txt']:
+                self.assertTrue(os.path.exists(output_base + extension))
+            with open(output_base + '.collapsed', encoding='utf-8') as f:
+                lines = f.read().splitlines()
+            with open(output_base + '_summary.txt', encoding='utf-8') as f:
+                summary = f.read()
+        # collapsed形式は"a;b;c 回数"
+        self.assertTrue(all(line.rsplit(' ', 1)[1].isdigit() for line in lines))
+        self.assertTrue(any('game_state:main_phase' in line for line in lines))
+        self.assertIn("game_state", summary)
+        self.assertIn("Top 5 functions by self time:", summary)
+        self.assertIn("Top 5 functions by self time:", stdout.getvalue())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+import sys
+import os
+import io
+import random
+import tempfile
+import contextlib
+
+# Add parent directory to path to import modules from parent directory
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from game_state import *
+from deck_analyzer import DeckAnalyzer
+from progress import ProgressReporter, get_confidence_interval
+from run_simulations import run_test_patterns
+
+class TestProgressReporter(unittest.TestCase):
+    def setUp(self):
+        root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        self.deck = create_deck(os.path.join(root_dir, 'decks', 'gemstone4_paradise0_cantor1_chrome4_wind3_valakut3.txt'))
+    
+    def test_confidence_interval(self):
+        lower, upper = get_confidence_interval(500, 1000)
+        self.assertAlmostEqual((lower + upper) / 2, 50.0)
+        self.assertAlmostEqual(upper - lower, 6.2, delta=0.1)
+        lower, upper = get_confidence_interval(0, 100)
+        self.assertEqual(lower, 0.0)
+        self.assertGreater(upper, 0.0)
+    
+    def test_reports_every_check_interval(self):
+        stream = io.StringIO()
+        analyzer = DeckAnalyzer(progress=ProgressReporter(check_interval=50, stream=stream))
+        random.seed(5)
+        tally = analyzer.run_tally_without_initial_hand(self.deck, iterations=200)
+        lines = stream.getvalue().splitlines()
+        self.assertEqual(len(lines), 4)
+        self.assertTrue(lines[-1].startswith("200 games,"))
+        self.assertIn(f"win rate {tally.total_wins / 2:.2f}%", lines[-1])
+    
+    def test_status_file_with_experiment_eta(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cwd = os.getcwd()
+            os.chdir(temp_dir)
+            try:
+                status_path = os.path.join(temp_dir, 'status.txt')
+                analyzer = DeckAnalyzer(progress=ProgressReporter(check_interval=50, status_path=status_path))
+                patterns = [{'name': 'first', 'deck': self.deck}, {'name': 'second', 'deck': self.deck}]
+                with contextlib.redirect_stdout(io.StringIO()):
+                    run_test_patterns(analyzer, patterns, 'progress_test', 100)
+                with open(status_path, encoding='utf-8') as f:
+                    lines = f.read().splitlines()
+            finally:
+                os.chdir(cwd)
+        self.assertEqual(len(lines), 4)
+        self.assertTrue(lines[0].startswith("[progress_test 1/2] first: 50/100 games (50.0%)"))
+        self.assertIn("(experiment ", lines[0])
+        self.assertTrue(lines[-1].startswith("[progress_test 2/2] second: 100/100 games"))
+
+if __name__ == '__main__':
+    unittest.main()
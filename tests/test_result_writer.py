@@ -0,0 +1,78 @@
+import unittest
+import sys
+import os
+import io
+import tempfile
+import contextlib
+
+# Add parent directory to path to import modules from parent directory
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from game_state import *
+from result_writer import *
+from deck_analyzer import DeckAnalyzer
+import run_simulations
+
+class TestStreamingResultWriter(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.writer = StreamingResultWriter('stream_test', folder_path=self.temp_dir.name, parquet=False)
+    
+    def tearDown(self):
+        self.writer.close()
+        self.temp_dir.cleanup()
+    
+    def test_rows_readable_while_writing(self):
+        self.assertEqual(read_results(self.writer.path), [])
+        self.writer.write({'pattern_name': 'a', 'total_games': 100, 'win_rate': 50.0,
+                           'summoners_pact_strategy': SummonersPactStrategy.AUTO})
+        self.writer.write({'pattern_name': 'b', 'total_games': 200, 'win_rate': 25.5, FALIED_NECRO: 3})
+        # closeする前でも読める
+        results = read_results(self.writer.path)
+        self.assertEqual([result['pattern_name'] for result in results], ['a', 'b'])
+        self.assertEqual(results[1]['total_games'], 200)
+        self.assertEqual(results[1]['win_rate'], 25.5)
+        self.assertEqual(results[1][FALIED_NECRO], 3)
+        self.assertIsNone(results[0][FALIED_NECRO])
+        self.assertEqual(results[0]['summoners_pact_strategy'], str(SummonersPactStrategy.AUTO))
+    
+    def test_partial_last_line_is_ignored(self):
+        self.writer.write({'pattern_name': 'a', 'total_games': 100, 'win_rate': 50.0})
+        with open(self.writer.path, 'a') as f:
+            f.write('b,,,,19,2')
+        self.assertEqual(len(read_results(self.writer.path)), 1)
+    
+    def test_unknown_field_raises(self):
+        with self.assertRaises(ValueError):
+            self.writer.write({'pattern_name': 'a', 'unknown': 1})
+    
+    def test_closed_when_pattern_raises(self):
+        writers = []
+        folder_path = self.temp_dir.name
+        
+        class TrackingWriter(StreamingResultWriter):
+            def __init__(self, filename):
+                super().__init__(filename, folder_path=folder_path, parquet=False)
+                writers.append(self)
+        
+        class FailingAnalyzer(DeckAnalyzer):
+            def run_multiple_simulations_without_initial_hand(self, *args, **kwargs):
+                # 1つ目のパターンの結果を書いた後で止まる
+                if read_results(writers[0].path):
+                    raise RuntimeError("interrupted")
+                return super().run_multiple_simulations_without_initial_hand(*args, **kwargs)
+        
+        deck = create_deck(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'decks', 'gemstone4_paradise0_cantor1_chrome4_wind3_valakut3.txt'))
+        patterns = [{'name': 'first', 'deck': deck}, {'name': 'second', 'deck': deck}]
+        run_simulations.StreamingResultWriter = TrackingWriter
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                with self.assertRaises(RuntimeError):
+                    run_simulations.run_test_patterns(FailingAnalyzer(), patterns, 'interrupted_test', 20)
+        finally:
+            run_simulations.StreamingResultWriter = StreamingResultWriter
+        # 2つ目のパターンで止まっても、ファイルを閉じて1つ目の結果を残す
+        self.assertIsNone(writers[0].file)
+        self.assertEqual([result['pattern_name'] for result in read_results(writers[0].path)], ['first'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+import unittest
+import sys
+import os
+import io
+import random
+import csv
+import tempfile
+import contextlib
+
+# Add parent directory to path to import modules from parent directory
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from game_state import *
+from deck_analyzer import DeckAnalyzer
+from results_cache import ResultsCache, get_cache_key
+from simulation_tally import SimulationTally
+from checkpoint import SimulationCheckpoint
+from run_simulations import run_test_patterns
+
+class TestResultsCache(unittest.TestCase):
+    def setUp(self):
+        root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        self.deck = create_deck(os.path.join(root_dir, 'decks', 'gemstone4_paradise0_cantor1_chrome4_wind3_valakut3.txt'))
+        # run_test_patternsはカレントディレクトリのresultsにCSVを保存する
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cwd = os.getcwd()
+        os.chdir(self.temp_dir.name)
+        self.cache = ResultsCache(os.path.join(self.temp_dir.name, 'cache.sqlite'))
+    
+    def tearDown(self):
+        self.cache.close()
+        os.chdir(self.cwd)
+        self.temp_dir.cleanup()
+    
+    def test_cache_key(self):
+        shuffled = self.deck.copy()
+        random.shuffle(shuffled)
+        self.assertEqual(get_cache_key(self.deck), get_cache_key(shuffled))
+        self.assertNotEqual(get_cache_key(self.deck), get_cache_key(self.deck, draw_count=18))
+        self.assertNotEqual(get_cache_key(self.deck), get_cache_key(self.deck, opponent_has_forces=True))
+        self.assertNotEqual(get_cache_key(self.deck), get_cache_key(self.deck, summoners_pact_strategy=SummonersPactStrategy.AUTO))
+    
+    def test_put_keeps_larger_tally(self):
+        large = SimulationTally()
+        for _ in range(10):
+            large.add_game(0, OUTCOME_WIN, True)
+        small = SimulationTally()
+        small.add_game(0, OUTCOME_WIN, True)
+        self.cache.put('key', large)
+        self.cache.put('key', small)
+        self.assertEqual(self.cache.get('key').total_games, 10)
+        self.assertIsNone(self.cache.get('other'))
+    
+    def test_run_test_patterns_tops_up(self):
+        analyzer = DeckAnalyzer(cache=self.cache)
+        patterns = [{'name': 'deck', 'deck': self.deck, 'opponent_has_forces': True}]
+        with contextlib.redirect_stdout(io.StringIO()):
+            first = run_test_patterns(analyzer, patterns, 'cache_test', 100)
+            # 同じ条件はゲームを実行せずに同じ結果を返す
+            rng_state = random.getstate()
+            second = run_test_patterns(analyzer, patterns, 'cache_test', 100)
+            self.assertEqual(random.getstate(), rng_state)
+            self.assertEqual(first, second)
+            # 回数を増やすと差分だけ実行する
+            third = run_test_patterns(analyzer, patterns, 'cache_test', 150)
+        self.assertEqual(third[0]['total_games'], 150)
+        key = get_cache_key(self.deck, draw_count=19, opponent_has_forces=True)
+        self.assertEqual(self.cache.get(key).total_games, 150)
+    
+    def test_top_up_rewrites_csv(self):
+        analyzer = DeckAnalyzer(cache=self.cache)
+        patterns = [{'name': 'deck', 'deck': self.deck}]
+        with contextlib.redirect_stdout(io.StringIO()):
+            run_test_patterns(analyzer, patterns, 'top_up_test', 100)
+            results = run_test_patterns(analyzer, patterns, 'top_up_test', 60, top_up=True)
+        self.assertEqual(results[0]['total_games'], 160)
+        with open(os.path.join('results', 'top_up_test.csv'), encoding='utf-8') as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual(int(rows[0]['total_games']), 160)
+        self.assertAlmostEqual(float(rows[0]['win_rate']), results[0]['win_rate'], places=4)
+    
+    def test_top_up_completed_checkpoint(self):
+        patterns = [{'name': 'deck', 'deck': self.deck}]
+        checkpoint_path = os.path.join(self.temp_dir.name, 'checkpoint.json')
+        with contextlib.redirect_stdout(io.StringIO()):
+            run_test_patterns(DeckAnalyzer(cache=self.cache, checkpoint=SimulationCheckpoint(checkpoint_path, interval=0)), patterns, 'top_up_test', 100)
+        # 前回の実行で終了したパターンも、top_upなら指定した回数を追加する
+        checkpoint = SimulationCheckpoint(checkpoint_path)
+        checkpoint.load()
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = run_test_patterns(DeckAnalyzer(cache=self.cache, checkpoint=checkpoint), patterns, 'top_up_test', 60, top_up=True)
+        self.assertEqual(results[0]['total_games'], 160)
+        
+        # キャッシュにない条件のtop_upは警告して最初から実行する
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            results = run_test_patterns(DeckAnalyzer(cache=self.cache), [{'name': 'deck', 'deck': self.deck, 'draw_count': 18}], 'top_up_test', 30, top_up=True)
+        self.assertEqual(results[0]['total_games'], 30)
+        self.assertIn("Warning: no cached games to top up", output.getvalue())
+    
+    def test_resume_top_up(self):
+        patterns = [{'name': 'first', 'deck': self.deck}, {'name': 'second', 'deck': self.deck, 'draw_count': 18}]
+        checkpoint_path = os.path.join(self.temp_dir.name, 'checkpoint.json')
+        with contextlib.redirect_stdout(io.StringIO()):
+            run_test_patterns(DeckAnalyzer(cache=self.cache), patterns, 'top_up_test', 100)
+            # 最初のパターンが終わったところで止まったtop_up
+            run_test_patterns(DeckAnalyzer(cache=self.cache, checkpoint=SimulationCheckpoint(checkpoint_path, interval=0)), patterns[:1], 'top_up_test', 60, top_up=True)
+        # 再開しても、終わったパターンにもう一度追加しない
+        checkpoint = SimulationCheckpoint(checkpoint_path)
+        checkpoint.load()
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = run_test_patterns(DeckAnalyzer(cache=self.cache, checkpoint=checkpoint), patterns, 'top_up_test', 60, top_up=True)
+        self.assertEqual([result['total_games'] for result in results], [160, 160])
+        self.assertEqual(self.cache.get(get_cache_key(self.deck)).total_games, 160)
+    
+    def test_top_up_requires_cache(self):
+        with self.assertRaises(ValueError):
+            run_test_patterns(DeckAnalyzer(), [{'name': 'deck', 'deck': self.deck}], 'top_up_test', 10, top_up=True)
+
+if __name__ == '__main__':
+    unittest.main()
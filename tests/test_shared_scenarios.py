@@ -0,0 +1,107 @@
+import unittest
+import sys
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+# Add parent directory to path to import modules from parent directory
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from game_state import *
+from deck_analyzer import DeckAnalyzer, run_shared_scenario
+from shuffle_provider import ShuffleProvider
+from simulation_tally import SimulationTally
+from shared_scenarios import SharedScenarioArea, DECK_SIZE
+
+class TestSharedScenarios(unittest.TestCase):
+    def setUp(self):
+        root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        self.deck = create_deck(os.path.join(root_dir, 'decks', 'gemstone4_paradise0_cantor1_chrome4_wind3_valakut3.txt'))
+    
+    def test_area_round_trip(self):
+        scenarios = [
+            {'deck': self.deck, 'draw_count': 18, 'summoners_pact_strategy': SummonersPactStrategy.AUTO, 'opponent_has_forces': True},
+            {'deck': self.deck, 'initial_hand': [GEMSTONE_MINE, DARK_RITUAL, NECRODOMINANCE], 'bottom_list': [CHROME_MOX],
+             'summoners_pact_strategy': SummonersPactStrategy.NEVER_CAST}
+        ]
+        with SharedScenarioArea.create(scenarios, 500, seed=1) as area:
+            attached = SharedScenarioArea.attach(area.name, area.layout)
+            for i, scenario in enumerate(scenarios):
+                result = attached.read_scenario(i)
+                self.assertEqual(result['deck'], self.deck)
+                self.assertEqual(result['initial_hand'], scenario.get('initial_hand', []))
+                self.assertEqual(result['bottom_list'], scenario.get('bottom_list', []))
+                self.assertEqual(result['summoners_pact_strategy'], scenario['summoners_pact_strategy'])
+            self.assertEqual(attached.read_scenario(0)['draw_count'], 18)
+            self.assertTrue(attached.read_scenario(0)['opponent_has_forces'])
+            # 並べ替えは0..59の並べ替えで、ワーカーからも同じ内容が見える
+            for row in attached.permutations[:50]:
+                self.assertEqual(sorted(row.tolist()), list(range(DECK_SIZE)))
+            self.assertTrue((attached.permutations == area.permutations).all())
+            attached.close()
+        
+        with self.assertRaises(ValueError):
+            SharedScenarioArea.create([{'deck': self.deck[:40]}], 10)
+    
+    def test_run_shared_scenario(self):
+        with SharedScenarioArea.create([{'deck': self.deck, 'opponent_has_forces': True}], 300, seed=2) as area:
+            first = run_shared_scenario(area.name, area.layout, 0, 100, 200, 3, ManaSolver.BACKTRACKING)
+            second = run_shared_scenario(area.name, area.layout, 0, 100, 200, 3, ManaSolver.BACKTRACKING)
+        # 同じ行とシードなら同じ集計値になる
+        self.assertEqual(first, second)
+        tally = SimulationTally.from_bytes(first)
+        self.assertEqual(tally.total_games, 200)
+        self.assertTrue(tally.opponent_has_forces)
+    
+    def test_shared_permutations_arrange_opening_hands(self):
+        with SharedScenarioArea.create([{'deck': self.deck}], 1000, seed=5) as area:
+            analyzer = DeckAnalyzer(shuffle_provider=ShuffleProvider(seed=5))
+            analyzer.shared_permutations = area.permutations
+            hands = []
+            original_run = analyzer.game.run_without_initial_hand
+            def run_without_initial_hand(deck, *args, **kwargs):
+                hands.append(deck[:7])
+                return original_run(deck, *args, **kwargs)
+            analyzer.game.run_without_initial_hand = run_without_initial_hand
+            tally = analyzer.run_tally_without_initial_hand(self.deck.copy(), mulligan_until_necro=False, iterations=1000)
+            # 1ゲームに1行ずつ、並べ替えの順に並べたデッキから最初の手札を引く
+            self.assertEqual(hands, [[self.deck[j] for j in row[:7]] for row in area.permutations.tolist()])
+            analyzer.shared_permutations = None
+        self.assertEqual(tally.total_games, 1000)
+        # 60枚の並べ替えをワーカーで作り直していない
+        self.assertNotIn(60, analyzer.shuffle_provider.blocks)
+    
+    def test_processes(self):
+        analyzer = DeckAnalyzer(process_count=2, seed=4)
+        try:
+            tally = analyzer.run_tally_without_initial_hand(self.deck.copy(), iterations=3000)
+            self.assertEqual(tally.total_games, 3000)
+            expected = DeckAnalyzer().run_tally_without_initial_hand(self.deck.copy(), iterations=3000)
+            self.assertAlmostEqual(tally.total_wins / 3000, expected.total_wins / 3000, delta=0.05)
+            # 既存の集計値に足す
+            tally = analyzer.run_tally_with_initial_hand(self.deck.copy(), [GEMSTONE_MINE, DARK_RITUAL, NECRODOMINANCE], iterations=200)
+            tally = analyzer.run_tally_with_initial_hand(self.deck.copy(), [GEMSTONE_MINE, DARK_RITUAL, NECRODOMINANCE], iterations=100, tally=tally)
+            self.assertEqual(tally.total_games, 300)
+        finally:
+            analyzer.close()
+        
+        # チェックポイントのチャンクと同じ10000ゲームでも、すべてのプロセスに分ける
+        submitted = []
+        
+        class CountingExecutor(ProcessPoolExecutor):
+            def submit(self, fn, *args, **kwargs):
+                submitted.append(args[4])
+                return super().submit(fn, *args, **kwargs)
+        
+        analyzer = DeckAnalyzer(process_count=4, seed=6)
+        analyzer.executor = CountingExecutor(max_workers=4)
+        try:
+            tally = analyzer.run_tally_with_initial_hand(self.deck.copy(), [GEMSTONE_MINE, DARK_RITUAL, NECRODOMINANCE], iterations=10000)
+        finally:
+            analyzer.close()
+        self.assertEqual(tally.total_games, 10000)
+        self.assertEqual(submitted, [2500] * 4)
+        
+        with self.assertRaises(ValueError):
+            DeckAnalyzer(process_count=2, thread_count=2)
+
+if __name__ == '__main__':
+    unittest.main()
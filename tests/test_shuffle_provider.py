@@ -0,0 +1,67 @@
+import unittest
+import sys
+import os
+import random
+import tempfile
+
+# Add parent directory to path to import modules from parent directory
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from game_state import *
+from deck_analyzer import DeckAnalyzer
+from game_recorder import GameRecorder
+from shuffle_provider import ShuffleProvider, INITIAL_BLOCK_SIZE
+
+class TestShuffleProvider(unittest.TestCase):
+    def test_permutations(self):
+        provider = ShuffleProvider(seed=1, block_size=4096)
+        for length in [60, 53, 60, 2]:
+            for _ in range(3000):
+                self.assertEqual(sorted(provider.get_permutation(length)), list(range(length)))
+        # 初めて使う長さは小さいブロックから始め、block_sizeまで増やす
+        self.assertEqual(len(provider.blocks[53]), INITIAL_BLOCK_SIZE * 2)
+        self.assertEqual(len(provider.blocks[60]), 4096)
+    
+    def test_shuffle_is_uniform_and_reproducible(self):
+        cards = list(range(10))
+        provider = ShuffleProvider(seed=2)
+        first_positions = [0] * 10
+        for _ in range(20000):
+            shuffled = cards.copy()
+            provider.shuffle(shuffled)
+            self.assertEqual(sorted(shuffled), cards)
+            first_positions[shuffled[0]] += 1
+        for count in first_positions:
+            self.assertAlmostEqual(count / 20000, 0.1, delta=0.01)
+        
+        first = list(range(60))
+        second = list(range(60))
+        ShuffleProvider(seed=3).shuffle(first)
+        ShuffleProvider(seed=3).shuffle(second)
+        self.assertEqual(first, second)
+    
+    def test_analyzer_with_shuffle_provider(self):
+        root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        deck = create_deck(os.path.join(root_dir, 'decks', 'gemstone4_paradise0_cantor1_chrome4_wind3_valakut3.txt'))
+        random.seed(4)
+        analyzer = DeckAnalyzer(shuffle_provider=ShuffleProvider(seed=4))
+        self.assertIs(analyzer.game.copy().shuffle_provider, analyzer.shuffle_provider)
+        tally = analyzer.run_tally_without_initial_hand(deck, iterations=2000)
+        self.assertEqual(tally.total_games, 2000)
+        # random.shuffleのときと同じくらいの勝率になる
+        self.assertGreater(tally.total_wins / tally.total_games, 0.6)
+        self.assertLess(tally.total_wins / tally.total_games, 0.8)
+        
+        random.seed(4)
+        first = DeckAnalyzer(shuffle_provider=ShuffleProvider(seed=5)).run_tally_with_initial_hand(deck.copy(), [GEMSTONE_MINE, DARK_RITUAL, NECRODOMINANCE], [], iterations=300)
+        random.seed(4)
+        second = DeckAnalyzer(shuffle_provider=ShuffleProvider(seed=5)).run_tally_with_initial_hand(deck.copy(), [GEMSTONE_MINE, DARK_RITUAL, NECRODOMINANCE], [], iterations=300)
+        self.assertEqual(first.to_bytes(), second.to_bytes())
+    
+    def test_recorder_cannot_be_used(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            recorder = GameRecorder(os.path.join(temp_dir, 'games.bin'))
+            with self.assertRaises(ValueError):
+                DeckAnalyzer(recorder=recorder, shuffle_provider=ShuffleProvider())
+
+if __name__ == '__main__':
+    unittest.main()
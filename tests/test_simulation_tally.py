@@ -0,0 +1,58 @@
+import unittest
+import sys
+import os
+import io
+import random
+import contextlib
+
+# Add parent directory to path to import modules from parent directory
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from game_state import *
+from deck_analyzer import DeckAnalyzer
+from simulation_tally import SimulationTally
+
+class TestSimulationTally(unittest.TestCase):
+    def setUp(self):
+        root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        self.deck = create_deck(os.path.join(root_dir, 'decks', 'gemstone4_paradise0_cantor1_chrome4_wind3_valakut3.txt'))
+        self.analyzer = DeckAnalyzer()
+
+    def test_merged_chunks_match_single_run(self):
+        # 同じ乱数列を1回で実行した場合と3つに分けて実行した場合
+        # デッキはその場でシャッフルされるので、それぞれ同じ並びのコピーから始める
+        random.seed(7)
+        single = self.analyzer.run_tally_without_initial_hand(self.deck.copy(), opponent_has_forces=True, iterations=300)
+        random.seed(7)
+        deck = self.deck.copy()
+        merged = SimulationTally(opponent_has_forces=True)
+        for _ in range(3):
+            merged.merge(self.analyzer.run_tally_without_initial_hand(deck, opponent_has_forces=True, iterations=100))
+        self.assertEqual(merged.total_games, 300)
+        self.assertEqual(merged.finalize(), single.finalize())
+        self.assertEqual(merged.finalize(detailed_loss_reason=True), single.finalize(detailed_loss_reason=True))
+
+    def test_finalize_matches_run_multiple_simulations(self):
+        initial_hand = [NECRODOMINANCE, VAULT_OF_WHISPERS, CHROME_MOX, DARK_RITUAL, ELVISH_SPIRIT_GUIDE, BESEECH_MIRROR, PACT_OF_NEGATION]
+        random.seed(11)
+        with contextlib.redirect_stdout(io.StringIO()):
+            stats = self.analyzer.run_multiple_simulations_with_initial_hand(self.deck.copy(), initial_hand, iterations=200)
+        random.seed(11)
+        tally = self.analyzer.run_tally_with_initial_hand(self.deck.copy(), initial_hand, iterations=200)
+        self.assertEqual(tally.finalize(), stats)
+
+    def test_bytes_roundtrip(self):
+        random.seed(3)
+        tally = self.analyzer.run_tally_without_initial_hand(self.deck, draw_count=18, mulligan_until_necro=False, iterations=200)
+        restored = SimulationTally.from_bytes(tally.to_bytes())
+        self.assertEqual(restored.get_settings(), tally.get_settings())
+        self.assertEqual(restored.outcome_counts, tally.outcome_counts)
+        self.assertEqual(restored.cast_necro_counts, tally.cast_necro_counts)
+        # 0でない集計値だけを書き出すので小さい
+        self.assertLess(len(tally.to_bytes()), 1024)
+
+    def test_merge_different_settings(self):
+        with self.assertRaises(ValueError):
+            SimulationTally(draw_count=19).merge(SimulationTally(draw_count=18))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import unittest
+import sys
+import os
+import time
+import socket
+import threading
+
+# Add parent directory to path to import modules from parent directory
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from game_state import *
+from deck_analyzer import DeckAnalyzer
+from sweep_coordinator import SweepCoordinator, run_worker, run_unit, send_message, receive_message
+
+class TestSweepCoordinator(unittest.TestCase):
+    def setUp(self):
+        root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        self.deck = create_deck(os.path.join(root_dir, 'decks', 'gemstone4_paradise0_cantor1_chrome4_wind3_valakut3.txt'))
+        self.scenarios = [
+            {'deck': self.deck, 'opponent_has_forces': True},
+            {'deck': self.deck, 'initial_hand': [GEMSTONE_MINE, DARK_RITUAL, NECRODOMINANCE], 'summoners_pact_strategy': SummonersPactStrategy.NEVER_CAST}
+        ]
+    
+    def run_sweep(self, worker_count: int, unit_timeout: float = 60.0, before_workers=None) -> list:
+        with SweepCoordinator(port=0, unit_timeout=unit_timeout, seed=1) as coordinator:
+            keys = [coordinator.add_scenario(scenario, 300, games_per_unit=50) for scenario in self.scenarios]
+            host, port = coordinator.start()
+            if before_workers is not None:
+                before_workers(host, port)
+            workers = [threading.Thread(target=run_worker, args=(host, port), kwargs={'poll_interval': 0.05}) for _ in range(worker_count)]
+            for worker in workers:
+                worker.start()
+            tallies = coordinator.wait(timeout=60)
+            for worker in workers:
+                worker.join()
+        return [tallies[key] for key in keys]
+    
+    def test_localhost_workers(self):
+        tallies = self.run_sweep(worker_count=3)
+        self.assertEqual([tally.total_games for tally in tallies], [300, 300])
+        self.assertTrue(tallies[0].opponent_has_forces)
+        self.assertTrue(tallies[1].with_initial_hand)
+        # ワークユニットのシードで実行するので、ワーカーの数によらず同じ集計値になる
+        expected = self.run_sweep(worker_count=1)
+        self.assertEqual([tally.to_bytes() for tally in tallies], [tally.to_bytes() for tally in expected])
+    
+    def test_requeue_units_from_dead_workers(self):
+        stalled = []
+        
+        def start_dead_workers(host, port):
+            # ワークユニットを受け取ったまま接続を切るワーカー
+            with socket.create_connection((host, port)) as sock:
+                send_message(sock, {'type': 'request'})
+                self.assertEqual(receive_message(sock)[0]['type'], 'unit')
+            # ワークユニットを受け取ったまま結果を返さないワーカー
+            sock = socket.create_connection((host, port))
+            send_message(sock, {'type': 'request'})
+            stalled.append((sock, receive_message(sock)[0]))
+            time.sleep(0.3)
+        
+        tallies = self.run_sweep(worker_count=2, unit_timeout=0.2, before_workers=start_dead_workers)
+        self.assertEqual([tally.total_games for tally in tallies], [300, 300])
+        stalled[0][0].close()
+        expected = self.run_sweep(worker_count=1)
+        self.assertEqual([tally.to_bytes() for tally in tallies], [tally.to_bytes() for tally in expected])
+    
+    def test_duplicate_results_are_ignored(self):
+        coordinator = SweepCoordinator(port=0, unit_timeout=0, seed=2)
+        key = coordinator.add_scenario(self.scenarios[0], 100, games_per_unit=100)
+        first = coordinator.assign_unit(1)
+        time.sleep(0.01)
+        # 期限が切れたので別のワーカーにも割り当てる
+        second = coordinator.assign_unit(2)
+        self.assertEqual(first['unit_id'], second['unit_id'])
+        data = run_unit(DeckAnalyzer(), first).to_bytes()
+        self.assertEqual(run_unit(DeckAnalyzer(), second).to_bytes(), data)
+        coordinator.complete_unit(first['unit_id'], data)
+        coordinator.complete_unit(second['unit_id'], data)
+        self.assertEqual(coordinator.wait(timeout=0)[key].total_games, 100)
+        self.assertEqual(coordinator.assign_unit(1)['type'], 'done')
+    
+    def test_units_do_not_depend_on_process_count(self):
+        coordinator = SweepCoordinator(port=0, seed=4)
+        coordinator.add_scenario(self.scenarios[0], 200, games_per_unit=200)
+        unit = coordinator.assign_unit(1)
+        # 割り当て直したワークユニットが--processesの違うワーカーで実行されても同じ集計値になる
+        expected = run_unit(DeckAnalyzer(), unit).to_bytes()
+        analyzer = DeckAnalyzer(process_count=2)
+        try:
+            self.assertEqual(run_unit(analyzer, unit).to_bytes(), expected)
+        finally:
+            analyzer.close()
+    
+    def test_invalid_results_are_requeued(self):
+        coordinator = SweepCoordinator(port=0, unit_timeout=60, seed=3)
+        key = coordinator.add_scenario(self.scenarios[0], 100, games_per_unit=100)
+        unit = coordinator.assign_unit(1)
+        # ゲーム数が足りない結果は捨てて、同じワークユニットを割り当て直す
+        short = run_unit(DeckAnalyzer(), dict(unit, game_count=50)).to_bytes()
+        with self.assertRaises(ValueError):
+            coordinator.complete_unit(unit['unit_id'], short)
+        retry = coordinator.assign_unit(2)
+        self.assertEqual(retry['unit_id'], unit['unit_id'])
+        coordinator.complete_unit(retry['unit_id'], run_unit(DeckAnalyzer(), retry).to_bytes())
+        self.assertEqual(coordinator.wait(timeout=0)[key].total_games, 100)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+import sys
+import os
+import random
+import tempfile
+
+# Add parent directory to path to import modules from parent directory
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from game_state import *
+from deck_analyzer import DeckAnalyzer
+from game_recorder import GameRecorder
+from shuffle_provider import ShuffleProvider
+
+class TestThreadPool(unittest.TestCase):
+    def setUp(self):
+        root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        self.deck = create_deck(os.path.join(root_dir, 'decks', 'gemstone4_paradise0_cantor1_chrome4_wind3_valakut3.txt'))
+    
+    def test_game_state_uses_own_random(self):
+        results = []
+        for global_seed in [1, 2]:
+            random.seed(global_seed)
+            game = GameState(rng=random.Random(3))
+            game.debug_print = False
+            deck = self.deck.copy()
+            game.random.shuffle(deck)
+            result = game.run_without_initial_hand(deck, 19, True, opponent_has_forces=True)
+            results.append((result, game.loss_reason, game.mulligan_count, game.storm_count))
+            # コピーも同じ乱数を使う
+            self.assertIs(game.copy().random, game.random)
+        # グローバルな乱数のシードによらず同じ結果になる
+        self.assertEqual(results[0], results[1])
+    
+    def test_threads_are_reproducible(self):
+        random.seed(4)
+        random_state = random.getstate()
+        tallies = []
+        for _ in range(2):
+            analyzer = DeckAnalyzer(thread_count=3, seed=5)
+            tallies.append(analyzer.run_tally_without_initial_hand(self.deck.copy(), opponent_has_forces=True, iterations=1000))
+        self.assertEqual(tallies[0].total_games, 1000)
+        self.assertEqual(tallies[0].to_bytes(), tallies[1].to_bytes())
+        # ワーカーはグローバルな乱数を使わない
+        self.assertEqual(random.getstate(), random_state)
+        
+        expected = DeckAnalyzer().run_tally_without_initial_hand(self.deck.copy(), opponent_has_forces=True, iterations=1000)
+        self.assertAlmostEqual(tallies[0].total_wins / 1000, expected.total_wins / 1000, delta=0.07)
+    
+    def test_threads_with_initial_hand_and_prefilter(self):
+        initial_hand = [GEMSTONE_MINE, DARK_RITUAL, NECRODOMINANCE, CHROME_MOX]
+        analyzer = DeckAnalyzer(thread_count=2, seed=6, shuffle_provider=ShuffleProvider(seed=6))
+        tally = analyzer.run_tally_with_initial_hand(self.deck.copy(), initial_hand, [CHROME_MOX], iterations=301)
+        self.assertEqual(tally.total_games, 301)
+        # 既存の集計値に足す
+        tally = analyzer.run_tally_with_initial_hand(self.deck.copy(), initial_hand, [CHROME_MOX], iterations=100, tally=tally)
+        self.assertEqual(tally.total_games, 401)
+        
+        analyzer = DeckAnalyzer(thread_count=4, seed=7, shuffle_provider=ShuffleProvider(seed=7), batch_main_phase=True)
+        tally = analyzer.run_tally_without_initial_hand(self.deck.copy(), iterations=2)
+        self.assertEqual(tally.total_games, 2)
+    
+    def test_threads_cannot_record(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with self.assertRaises(ValueError):
+                DeckAnalyzer(recorder=GameRecorder(os.path.join(temp_dir, 'games.bin')), thread_count=2)
+
+if __name__ == '__main__':
+    unittest.main()
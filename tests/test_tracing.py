@@ -0,0 +1,43 @@
+import unittest
+import sys
+import os
+import io
+import json
+
+# Add parent directory to path to import modules from parent directory
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from game_state import *
+from tracing import Tracer, TraceLevel, JsonLinesSink
+
+class TestTracing(unittest.TestCase):
+    def setUp(self):
+        """Create GameState instance for testing"""
+        self.game = GameState()
+        self.game.hand = [GEMSTONE_MINE, DARK_RITUAL]
+        self.game.deck = [LOTUS_PETAL, CHROME_MOX, WILD_CANTOR]
+
+    def test_json_lines_sink(self):
+        output = io.StringIO()
+        self.game.tracer = Tracer(JsonLinesSink(output))
+        self.game.draw_cards(2)
+        self.game.cast_dark_ritual()
+
+        records = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertEqual(records[0], {'level': 'DEBUG', 'event': 'draw', 'count': 2, 'card_word': 'cards',
+                                      'cards': [LOTUS_PETAL, CHROME_MOX]})
+        self.assertEqual(records[1], {'level': 'DEBUG', 'event': 'cast', 'card': DARK_RITUAL})
+
+    def test_level_filter(self):
+        output = io.StringIO()
+        self.game.tracer = Tracer(JsonLinesSink(output), TraceLevel.INFO)
+        self.game.draw_cards(1)
+        self.assertEqual(output.getvalue(), '')
+
+    def test_debug_print_flag(self):
+        self.game.debug_print = False
+        self.assertIsNone(self.game.tracer)
+        self.game.debug_print = True
+        self.assertTrue(self.game.debug_print)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+import sys
+import os
+
+# Add parent directory to path to import modules from parent directory
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from game_state import *
+
+class TestUndoJournal(unittest.TestCase):
+    def setUp(self):
+        """Create GameState instance for testing"""
+        self.game = GameState()
+        self.game.debug_print = False
+        self.game.hand = [GEMSTONE_MINE, DARK_RITUAL, CABAL_RITUAL, NECRODOMINANCE]
+        self.game.deck = [LOTUS_PETAL, ELVISH_SPIRIT_GUIDE, WILD_CANTOR]
+
+    def test_rollback_restores_state(self):
+        hand = self.game.hand.copy()
+        deck = self.game.deck.copy()
+        self.game.begin()
+        self.game.set_land(GEMSTONE_MINE)
+        self.game.draw_cards(2)
+        self.game.mana_pool.B += 3
+        self.game.storm_count = 2
+        self.game.rollback()
+
+        self.assertEqual(self.game.hand, hand)
+        self.assertEqual(self.game.deck, deck)
+        self.assertEqual(self.game.battlefield, [])
+        self.assertEqual(self.game.mana_pool.B, 0)
+        self.assertEqual(self.game.storm_count, 0)
+        self.assertFalse(self.game.journal.is_active())
+
+    def test_nested_commit_then_rollback(self):
+        hand = self.game.hand.copy()
+        self.game.begin()
+        self.game.hand.remove(DARK_RITUAL)
+        self.game.begin()
+        self.game.hand.append(LOTUS_PETAL)
+        self.game.commit()
+        self.assertEqual(self.game.hand[-1], LOTUS_PETAL)
+        self.game.rollback()
+
+        self.assertEqual(self.game.hand, hand)
+
+    def test_commit_keeps_changes(self):
+        self.game.begin()
+        self.game.draw_cards(1)
+        self.game.commit()
+
+        self.assertIn(LOTUS_PETAL, self.game.hand)
+        self.assertEqual(type(self.game.hand), list)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import json
+import string
+from enum import IntEnum
+
+class TraceLevel(IntEnum):
+    DEBUG = 10    # 詳細な処理の流れ
+    INFO = 20     # ゲームの結果など
+    WARNING = 30  # 処理は続行できる問題
+    ERROR = 40    # 入力の誤りなど
+
+class TraceFormatter(string.Formatter):
+    """
+    トレースのメッセージを整形するフォーマッタ
+
+    通常のstr.formatに加えて、リストを連結する変換を使える
+        {cards!j}: ', 'で連結
+        {cards!n}: 改行で連結
+    """
+    def convert_field(self, value, conversion):
+        if conversion == 'j':
+            return ', '.join(map(str, value))
+        if conversion == 'n':
+            return '\n'.join(map(str, value))
+        return super().convert_field(value, conversion)
+
+class PrintSink:
+    """イベントを整形して標準出力に表示する"""
+
+    def __init__(self):
+        self.formatter = TraceFormatter()
+
+    def write(self, level: TraceLevel, event: str, message: str, fields: dict) -> None:
+        print(self.formatter.vformat(message, (), fields))
+
+class JsonLinesSink:
+    """イベントを1行1つのJSONとしてファイルに書き出す"""
+
+    def __init__(self, file):
+        """
+        Args:
+            file: 書き込み用に開いたテキストファイル
+        """
+        self.file = file
+
+    def write(self, level: TraceLevel, event: str, message: str, fields: dict) -> None:
+        record = {'level': level.name, 'event': event}
+        record.update(fields)
+        # ManaPoolなどJSONにできない値は文字列にする
+        self.file.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+
+class Tracer:
+    """
+    レベル付きの構造化トレース
+
+    メッセージはsinkに渡されるまで整形されない。
+    GameStateではトレースが無効のときtracerがNoneになるので、
+    呼び出し側で `if self.tracer:` を確認すれば引数の評価も含めて何も実行されない。
+    """
+
+    def __init__(self, sink=None, level: TraceLevel = TraceLevel.DEBUG):
+        """
+        Args:
+            sink: write(level, event, message, fields)を持つ出力先（省略時はPrintSink）
+            level: 出力する最低レベル
+        """
+        self.sink = sink if sink is not None else PrintSink()
+        self.level = level
+
+    def is_enabled(self, level: TraceLevel) -> bool:
+        return self.level <= level
+
+    def emit(self, level: TraceLevel, event: str, message: str, fields: dict) -> None:
+        """
+        イベントを出力する
+
+        Args:
+            level: イベントのレベル
+            event: イベント名（JSONのeventキー）
+            message: str.format形式のメッセージ（fieldsで整形される）
+            fields: イベントの値
+        """
+        if self.level <= level:
+            self.sink.write(level, event, message, fields)
+
+    def debug(self, event: str, message: str, **fields) -> None:
+        self.emit(TraceLevel.DEBUG, event, message, fields)
+
+    def info(self, event: str, message: str, **fields) -> None:
+        self.emit(TraceLevel.INFO, event, message, fields)
+
+    def warning(self, event: str, message: str, **fields) -> None:
+        self.emit(TraceLevel.WARNING, event, message, fields)
+
+    def error(self, event: str, message: str, **fields) -> None:
+        self.emit(TraceLevel.ERROR, event, message, fields)
@@ -0,0 +1,97 @@
+class UndoJournal:
+    """GameStateの変更を取り消すための操作を記録するジャーナル"""
+
+    def __init__(self):
+        self.entries = []     # (取り消し関数, 引数) のリスト
+        self.savepoints = []  # (entriesの長さ, スカラー値のスナップショット) のスタック
+
+    def is_active(self) -> bool:
+        return len(self.savepoints) > 0
+
+    def begin(self, snapshot) -> None:
+        """セーブポイントを作成する（入れ子にできる）"""
+        self.savepoints.append((len(self.entries), snapshot))
+
+    def rollback(self):
+        """
+        直前のセーブポイント以降の操作を新しい順に取り消す
+
+        Returns:
+            begin()で渡されたスナップショット
+        """
+        index, snapshot = self.savepoints.pop()
+        entries = self.entries
+        while len(entries) > index:
+            undo, args = entries.pop()
+            undo(*args)
+        return snapshot
+
+    def commit(self) -> None:
+        """直前のセーブポイントを破棄する（記録は外側のトランザクションに引き継ぐ）"""
+        self.savepoints.pop()
+        if not self.savepoints:
+            self.entries.clear()
+
+
+class JournaledList(list):
+    """
+    変更のたびに逆操作をUndoJournalに記録するリスト
+
+    トランザクション中の領域だけがこのリストに置き換えられるので、記録の要否は確認しない
+    """
+
+    def __init__(self, iterable=(), journal: UndoJournal = None):
+        super().__init__(iterable)
+        self.entries = journal.entries
+
+    def append(self, item) -> None:
+        list.append(self, item)
+        self.entries.append((list.pop, (self,)))
+
+    def extend(self, items) -> None:
+        start = len(self)
+        list.extend(self, items)
+        self.entries.append((list.__delitem__, (self, slice(start, None))))
+
+    def insert(self, index: int, item) -> None:
+        index = min(index if index >= 0 else max(len(self) + index, 0), len(self))
+        list.insert(self, index, item)
+        self.entries.append((list.pop, (self, index)))
+
+    def remove(self, item) -> None:
+        index = self.index(item)
+        list.__delitem__(self, index)
+        self.entries.append((list.insert, (self, index, item)))
+
+    def pop(self, index: int = -1):
+        if index < 0:
+            index += len(self)
+        item = list.pop(self, index)
+        self.entries.append((list.insert, (self, index, item)))
+        return item
+
+    def clear(self) -> None:
+        if self:
+            self.entries.append((list.__setitem__, (self, slice(None), list(self))))
+        list.clear(self)
+
+    def __setitem__(self, index, value) -> None:
+        if isinstance(index, slice):
+            self.entries.append((list.__setitem__, (self, slice(None), list(self))))
+        else:
+            self.entries.append((list.__setitem__, (self, index, list.__getitem__(self, index))))
+        list.__setitem__(self, index, value)
+
+    def __delitem__(self, index) -> None:
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step == 1:
+                removed = list.__getitem__(self, index)
+                self.entries.append((list.__setitem__, (self, slice(start, start), removed)))
+            else:
+                self.entries.append((list.__setitem__, (self, slice(None), list(self))))
+        else:
+            if index < 0:
+                index += len(self)
+            self.entries.append((list.insert, (self, index, list.__getitem__(self, index))))
+        list.__delitem__(self, index)